@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+# Name:         bench_convert.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.18-21:20:00-JST>
+
+# bench_convert.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# python3 benchmark/bench_convert.py [-s 1,10,100] [-n REPEAT]
+#                                    [-b BASELINE.json] [-w]
+#                                    [-o RESULT.json] [SAMPLE ...]
+#
+# Runs makdo_md2docx and makdo_docx2md on sample/*.md and sample/*.docx,
+# and on versions scaled by repeating their paragraphs, each in a fresh
+# process.  Wall time, peak RSS and per-stage timings are written as
+# JSON, and compared against a stored baseline.
+
+
+import sys
+import os
+import argparse
+import re
+import time
+import json
+import tempfile
+import importlib.util
+import inspect
+import subprocess
+import platform
+import contextlib
+import io
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAKDO_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'makdo')
+SAMPLE_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'sample')
+SAMPLES = ['example', 'kisoku', 'minpo', 'shoko', 'sojo', 'wakai']
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# THE RATIO TO THE BASELINE REPORTED AS A REGRESSION
+REGRESSION_RATIO = 1.10
+
+STAGES = {
+    'md2docx': [
+        # (CLASS, METHOD, STAGE)
+        ('SubstitutePhrase', 'assign', 'SubstitutePhrase'),
+        ('Document', 'unfold', 'unfold'),
+        ('Script', 'execute', 'Script'),
+        ('Document', 'get_raw_paragraphs', 'get_raw_paragraphs'),
+        ('Document', 'get_paragraphs', 'get_paragraphs'),
+        ('Document', 'modify_paragraphs', 'modify_paragraphs'),
+        ('Document', 'write_document', 'write_document'),
+        ('IO', 'save_docx_file', 'save'),
+    ],
+    'docx2md': [
+        ('IO', 'unpack_docx_file', 'unpack'),
+        ('Form', 'configure', 'configure'),
+        ('Document', 'get_raw_paragraphs', 'get_raw_paragraphs'),
+        ('Document', 'get_paragraphs', 'get_paragraphs'),
+        ('Document', 'modify_paragraphs', 'modify_paragraphs'),
+        ('Document', 'generate_document', 'get_document'),
+        ('IO', 'write_md_file', 'save'),
+        ('IO', 'save_images', 'save'),
+    ],
+}
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(
+        description='サンプルの変換時間とメモリー使用量を測定します')
+    parser.add_argument(
+        '-s', '--scales',
+        type=str,
+        default='1,10,100',
+        metavar='NUMBERS',
+        help='サンプルを繰り返す回数（カンマ区切り）')
+    parser.add_argument(
+        '-n', '--repeat',
+        type=int,
+        default=1,
+        metavar='NUMBER',
+        help='測定の回数（最小値を採ります）')
+    parser.add_argument(
+        '-b', '--baseline',
+        type=str,
+        default=DEFAULT_BASELINE,
+        metavar='BASELINE.json',
+        help='比較する基準の結果')
+    parser.add_argument(
+        '-w', '--write-baseline',
+        action='store_true',
+        help='結果を基準として保存')
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        metavar='RESULT.json',
+        help='結果の出力先（標準出力）')
+    parser.add_argument(
+        '--child',
+        nargs=3,
+        metavar=('DIRECTION', 'INPUT', 'OUTPUT'),
+        help=argparse.SUPPRESS)
+    parser.add_argument(
+        'samples',
+        nargs='*',
+        default=SAMPLES,
+        help='サンプルの名前')
+    return parser.parse_args()
+
+
+def load_module(name):
+    path = os.path.join(MAKDO_DIR, name + '.py')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_stage(module, class_name, method_name, stage, timings, depth):
+    cls = getattr(module, class_name)
+    raw = cls.__dict__[method_name]
+    is_static = isinstance(raw, staticmethod)
+    func = raw.__func__ if is_static else raw
+
+    def timed(*args, **kwargs):
+        # NESTED CALLS ARE COUNTED ONLY ONCE
+        depth[stage] = depth.get(stage, 0) + 1
+        t = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            depth[stage] -= 1
+            if depth[stage] == 0:
+                dt = time.perf_counter() - t
+                timings[stage] = timings.get(stage, 0.0) + dt
+
+    def timed_generator(*args, **kwargs):
+        # ONLY THE TIME IN THE GENERATOR IS COUNTED (NOT IN ITS CONSUMER)
+        generator = func(*args, **kwargs)
+        while True:
+            t = time.perf_counter()
+            try:
+                value = next(generator)
+            except StopIteration:
+                return
+            finally:
+                dt = time.perf_counter() - t
+                timings[stage] = timings.get(stage, 0.0) + dt
+            yield value
+
+    if inspect.isgeneratorfunction(func):
+        timed = timed_generator
+    setattr(cls, method_name, staticmethod(timed) if is_static else timed)
+
+
+def run_child(direction, input_file, output_file):
+    sys.path.insert(0, MAKDO_DIR)
+    module = load_module('makdo_' + direction)
+    timings, depth = {}, {}
+    for class_name, method_name, stage in STAGES[direction]:
+        time_stage(module, class_name, method_name, stage, timings, depth)
+    with contextlib.redirect_stderr(io.StringIO()), \
+         contextlib.redirect_stdout(io.StringIO()):
+        t = time.perf_counter()
+        if direction == 'md2docx':
+            module.Md2Docx(input_file).save(output_file)
+        else:
+            module.Docx2Md(input_file).save(output_file)
+        wall = time.perf_counter() - t
+    rss = 0
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if platform.system() != 'Darwin':
+            rss *= 1024  # KB -> B
+    result = {'wall': wall, 'peak_rss': rss, 'stages': timings}
+    print(json.dumps(result))
+
+
+def scale_md_file(md_file, scale, tmp):
+    with open(md_file, 'r', encoding='utf-8') as f:
+        md_text = f.read()
+    # THE CONFIGURATIONS ARE WRITTEN ONLY ONCE
+    res = '^(<!--\n(?:.*\n)*?-->\n)((?:.|\n)*)$'
+    m = re.match(res, md_text)
+    if m:
+        header, body = m.group(1), m.group(2)
+    else:
+        header, body = '', md_text
+    body = re.sub('\n*$', '\n', body)
+    scaled_md_file \
+        = os.path.join(tmp, os.path.basename(md_file)[:-3] + '-' + str(scale)
+                       + '.md')
+    with open(scaled_md_file, 'w', encoding='utf-8') as f:
+        f.write(header + '\n'.join([body] * scale))
+    return scaled_md_file
+
+
+def run_parent(direction, input_file, output_file, repeat):
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__),
+                               '--child', direction, input_file, output_file],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              encoding='utf-8')
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            return None
+        result = json.loads(proc.stdout.splitlines()[-1])
+        if best is None or result['wall'] < best['wall']:
+            best = result
+    return best
+
+
+def run_all(samples, scales, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for sample in samples:
+            md_file = os.path.join(SAMPLE_DIR, sample + '.md')
+            docx_file = os.path.join(SAMPLE_DIR, sample + '.docx')
+            for scale in scales:
+                key = sample + '-x' + str(scale)
+                sys.stderr.write(key + '\n')
+                if scale == 1:
+                    src_md = md_file
+                else:
+                    src_md = scale_md_file(md_file, scale, tmp)
+                dst_docx = os.path.join(tmp, key + '.docx')
+                r = run_parent('md2docx', src_md, dst_docx, repeat)
+                if r is not None:
+                    results['md2docx/' + key] = r
+                # SCALED DOCX FILES ARE MADE FROM SCALED MD FILES
+                if scale == 1 and os.path.exists(docx_file):
+                    src_docx = docx_file
+                elif scale != 1 and os.path.exists(dst_docx):
+                    src_docx = dst_docx
+                else:
+                    continue
+                dst_md = os.path.join(tmp, key + '.md')
+                r = run_parent('docx2md', src_docx, dst_md, repeat)
+                if r is not None:
+                    results['docx2md/' + key] = r
+    return results
+
+
+def compare(results, baseline):
+    regressions = []
+    for key in results:
+        if key not in baseline:
+            continue
+        res, bas = results[key], baseline[key]
+        ratio = res['wall'] / bas['wall'] if bas['wall'] > 0 else 1.0
+        res['baseline_ratio'] = ratio
+        if ratio > REGRESSION_RATIO:
+            regressions.append(key)
+        msg = '%-32s %9.3f s %9.3f s %6.2f' \
+            % (key, bas['wall'], res['wall'], ratio)
+        if key in regressions:
+            msg += ' !'
+        sys.stderr.write(msg + '\n')
+    return regressions
+
+
+def main():
+    args = get_arguments()
+    if args.child is not None:
+        run_child(*args.child)
+        return
+    scales = [int(s) for s in args.scales.split(',') if s != '']
+    results = run_all(args.samples, scales, args.repeat)
+    output = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    if os.path.exists(args.baseline) and not args.write_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        output['regressions'] = compare(results, baseline)
+    json_text = json.dumps(output, indent=2, ensure_ascii=False) + '\n'
+    if args.write_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(json_text)
+    if args.output is None:
+        sys.stdout.write(json_text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(json_text)
+    if 'regressions' in output and len(output['regressions']) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+# Name:         bench_regex.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.18-20:55:00-JST>
+
+# bench_regex.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# python3 benchmark/bench_regex.py [-n REPEAT] [SAMPLE ...]
+#
+# Converts sample/*.md with makdo_md2docx and sample/*.docx with
+# makdo_docx2md, once with the shared "Re" registry and once with plain
+# "re", and prints the registry hit rate and the time saved.
+
+
+import sys
+import os
+import argparse
+import re
+import time
+import tempfile
+import importlib.util
+import contextlib
+import io
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAKDO_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'makdo')
+SAMPLE_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'sample')
+SAMPLES = ['example', 'kisoku', 'minpo', 'shoko', 'sojo', 'wakai']
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(
+        description='正規表現の共有キャッシュの効果を測定します')
+    parser.add_argument(
+        '-n', '--repeat',
+        type=int,
+        default=3,
+        metavar='NUMBER',
+        help='測定の回数（最小値を採ります）')
+    parser.add_argument(
+        'samples',
+        nargs='*',
+        default=SAMPLES,
+        help='サンプルの名前')
+    return parser.parse_args()
+
+
+def load_module(name):
+    # A FRESH MODULE FOR EACH RUN (THE CONVERTERS KEEP CLASS-LEVEL STATE)
+    sys.modules.pop('makdo_re', None)
+    path = os.path.join(MAKDO_DIR, name + '.py')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def use_plain_re(module):
+    module.Re.match = staticmethod(re.match)
+    module.Re.sub = staticmethod(re.sub)
+
+
+def count_calls(module, counter):
+    match, sub, compile = module.Re.match, module.Re.sub, module.Re.compile
+
+    def counted_match(*args, **kwargs):
+        counter['calls'] += 1
+        return match(*args, **kwargs)
+
+    def counted_sub(*args, **kwargs):
+        counter['calls'] += 1
+        return sub(*args, **kwargs)
+
+    def counted_compile(*args, **kwargs):
+        counter['misses'] += 1
+        return compile(*args, **kwargs)
+
+    module.Re.match = staticmethod(counted_match)
+    module.Re.sub = staticmethod(counted_sub)
+    module.Re.compile = staticmethod(counted_compile)
+
+
+def convert(name, input_file, mode, counter=None):
+    module = load_module(name)
+    if mode == 're':
+        use_plain_re(module)
+    elif mode == 'count':
+        count_calls(module, counter)
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stderr(io.StringIO()), \
+             contextlib.redirect_stdout(io.StringIO()):
+            t = time.perf_counter()
+            if name == 'makdo_md2docx':
+                m2d = module.Md2Docx(input_file)
+                m2d.save(os.path.join(tmp, 'output.docx'))
+            else:
+                d2m = module.Docx2Md(input_file)
+                d2m.save(os.path.join(tmp, 'output.md'))
+            return time.perf_counter() - t
+
+
+def main():
+    args = get_arguments()
+    sys.path.insert(0, MAKDO_DIR)
+    print('%-28s %9s %9s %7s %9s %7s' %
+          ('conversion', 're(s)', 'Re(s)', 'saved', 'calls', 'hits'))
+    for sample in args.samples:
+        for name, ext in (('makdo_md2docx', '.md'),
+                          ('makdo_docx2md', '.docx')):
+            input_file = os.path.join(SAMPLE_DIR, sample + ext)
+            if not os.path.exists(input_file):
+                continue
+            t_re = min(convert(name, input_file, 're')
+                       for _ in range(args.repeat))
+            t_rg = min(convert(name, input_file, 'registry')
+                       for _ in range(args.repeat))
+            counter = {'calls': 0, 'misses': 0}
+            convert(name, input_file, 'count', counter)
+            hits = 0.0
+            if counter['calls'] > 0:
+                hits = 1 - counter['misses'] / counter['calls']
+            print('%-28s %9.3f %9.3f %6.1f%% %9d %6.2f%%' %
+                  (sample + ext + ' (' + name[6:] + ')', t_re, t_rg,
+                   (t_re - t_rg) / t_re * 100, counter['calls'],
+                   hits * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# Name:         bench_scanner.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.18-22:10:00-JST>
+
+# bench_scanner.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# python3 benchmark/bench_scanner.py [-l 500,1000,2000,4000] [-n REPEAT]
+#
+# Separates comments from long lines character by character, and erases
+# font decorators from long paragraphs, once with "NOT_ESCAPED" regular
+# expressions and once with "Scanner", and prints the time of both.
+
+
+import sys
+import os
+import argparse
+import re
+import time
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAKDO_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'makdo')
+
+NOT_ESCAPED = '^((?:(?:.|\n)*?[^\\\\])??(?:\\\\\\\\)*?)?'
+
+# A LINE WITH ESCAPED AND NOT ESCAPED DECORATORS
+PIECE = 'あいう\\**えお**か\\\\**きくけこ'
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(
+        description='エスケープを考慮したスキャナの効果を測定します')
+    parser.add_argument(
+        '-l', '--lengths',
+        type=str,
+        default='500,1000,2000,4000',
+        metavar='NUMBER,NUMBER,...',
+        help='行の長さ（文字数）')
+    parser.add_argument(
+        '-n', '--repeat',
+        type=int,
+        default=3,
+        metavar='NUMBER',
+        help='測定の回数（最小値を採ります）')
+    return parser.parse_args()
+
+
+def separate_comment_by_re(raw_text):
+    spaced_text, tmp, is_in_comment = '', '', False
+    for c in raw_text:
+        tmp += c
+        if not is_in_comment:
+            if re.match(NOT_ESCAPED + '<!--$', tmp):
+                spaced_text += re.sub('<!--$', '', tmp)
+                tmp, is_in_comment = '', True
+        else:
+            if re.match(NOT_ESCAPED + '-->$', tmp):
+                tmp, is_in_comment = '', False
+    return spaced_text + tmp
+
+
+def separate_comment_by_scanner(raw_text):
+    spaced_text, tmp, is_in_comment = '', '', False
+    for c in raw_text:
+        tmp += c
+        if not is_in_comment:
+            if Scanner.endswith(tmp, '<!--'):
+                spaced_text += re.sub('<!--$', '', tmp)
+                tmp, is_in_comment = '', True
+        else:
+            if Scanner.endswith(tmp, '-->'):
+                tmp, is_in_comment = '', False
+    return spaced_text + tmp
+
+
+def erase_decorator_by_re(text):
+    while re.match(NOT_ESCAPED + '\\*\\*', text):
+        text = re.sub(NOT_ESCAPED + '\\*\\*', '\\1X', text)
+    return text
+
+
+def erase_decorator_by_scanner(text):
+    return Scanner(text).replace('**', 'X')
+
+
+def measure(func, text, repeat):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func(text)
+        t = time.perf_counter() - t
+        if best is None or t < best:
+            best = t
+    return best
+
+
+def main():
+    args = get_arguments()
+    sys.path.insert(0, MAKDO_DIR)
+    global Scanner
+    from makdo_scanner import Scanner
+    print('%-22s %7s %9s %9s %8s' %
+          ('function', 'length', 're(s)', 'scan(s)', 'speedup'))
+    for length in [int(x) for x in args.lengths.split(',')]:
+        # NO COMMENT IN THE LONG LINE, SO "tmp" GROWS TO THE END
+        line = (PIECE * (length // len(PIECE) + 1))[:length]
+        for name, by_re, by_scanner in (
+                ('separate_comment',
+                 separate_comment_by_re, separate_comment_by_scanner),
+                ('erase_font_decorator',
+                 erase_decorator_by_re, erase_decorator_by_scanner)):
+            if by_re(line) != by_scanner(line):
+                sys.exit('error: "' + name + '" gives different results')
+            t_re = measure(by_re, line, args.repeat)
+            t_sc = measure(by_scanner, line, args.repeat)
+            print('%-22s %7d %9.4f %9.4f %7.1fx' %
+                  (name, length, t_re, t_sc, t_re / t_sc))
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,7 @@
 
 import argparse
 from makdo import Makdo
+from makdo.makdo_profile import StartupProfile
 
 
 __version__ = 'v08 Omachi'
@@ -51,6 +52,10 @@ def get_arguments():
         action='version',
         version=('%(prog)s ' + __version__),
         help='バージョン番号を表示します')
+    parser.add_argument(
+        '--profile-startup',
+        action=StartupProfile,
+        help='起動時間の内訳を表示します')
     parser.add_argument(
         'input_file',
         default='',
@@ -59,9 +64,9 @@ def get_arguments():
     return parser.parse_args()
 
 
-args = get_arguments()
-
-
-if args.input_file != '':
-    Makdo.args_input_file = args.input_file
-Makdo()
+if __name__ == '__main__':
+    # "multiprocessing" ("spawn") IMPORTS THIS FILE AGAIN AS "__mp_main__"
+    args = get_arguments()
+    if args.input_file != '':
+        Makdo.args_input_file = args.input_file
+    Makdo()
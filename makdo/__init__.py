@@ -1,5 +1,16 @@
-from makdo.makdo_md2docx import Md2Docx
-from makdo.makdo_docx2md import Docx2Md
-from makdo.makdo_editor import Makdo
+import importlib
 
 __version__ = '08.19'
+
+# IMPORTED WHEN FIRST USED
+_modules = {
+    'Md2Docx': 'makdo.makdo_md2docx',
+    'Docx2Md': 'makdo.makdo_docx2md',
+    'Makdo': 'makdo.makdo_editor',
+}
+
+
+def __getattr__(name):
+    if name in _modules:
+        return getattr(importlib.import_module(_modules[name]), name)
+    raise AttributeError('module \'makdo\' has no attribute \'' + name + '\'')
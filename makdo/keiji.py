@@ -1,7 +1,7 @@
 #!/usr/bin/python3
 # Name:         keiji.py
 # Version:      v02
-# Time-stamp:   <2025.08.11-16:53:12-JST>
+# Time-stamp:   <2026.10.18-23:10:00-JST>
 
 # keiji.py
 # Copyright (C) 2017-2025  Seiichiro HATA
@@ -30,6 +30,7 @@ import getopt
 import re
 import datetime
 import locale
+import bisect
 from decimal import Decimal
 
 
@@ -54,6 +55,15 @@ RESTRICTED_RATE = [['20',       '0'],
                    ['15', '1000000']]
 
 
+# LOOKUP TABLES (SORTED FOR "bisect")
+GENGO_DATES = [g[1] for g in GENGO]
+GENGO_FIRST_YEARS = {g[0]: g[1].year for g in GENGO}
+STATUTORY_RATE_DATES = [s[1] for s in STATUTORY_RATE]
+STATUTORY_RATE_VALUES = [Decimal(s[0]) for s in STATUTORY_RATE]
+RESTRICTED_RATE_AMOUNTS = [Decimal(r[1]) for r in RESTRICTED_RATE]
+RESTRICTED_RATE_VALUES = [Decimal(r[0]) for r in RESTRICTED_RATE]
+
+
 TABLE_HEADER = ['日付',
                 '借入',
                 '返済',
@@ -81,6 +91,7 @@ TABLE_WIDTH = [9, 9, 8, 4, 4, 8, 9, 9, 10]
 
 HELP_MESSAGE = '''\
 Usage: keiji [オプション]... [ファイル]
+       keiji --batch=出力先 [オプション]... ディレクトリ
 
 取引履歴から利息等を計算します
 
@@ -99,11 +110,18 @@ Usage: keiji [オプション]... [ファイル]
   -w, --web          HTML形式で出力します
   -m, --md           Markdown形式で出力します
   -M, --math         数式形式で出力します
+  -j, --jobs=数      一括処理を並列に行うプロセスの数です（0はCPUの数）
+      --batch=出力先 ディレクトリ内の全ての取引履歴を計算して出力先に書きます
       --sample       サンプルデータを出力します
       --debug        デバッグのためのメッセージを出力します
 
 ファイルの指定がなかったり、"-"であった場合、標準入力から読み込みます
 
+一括処理の場合、取引履歴ごとに、出力形式に応じた拡張子のファイルを書き込み、
+最後に、取引履歴ごとの合計を"summary.csv"に書き込みます
+各取引履歴の設定は、他の取引履歴に引き継がれません
+拡張子を除いた名前が他と重なる場合は、拡張子を含めた名前を使います
+
 入力データの仕様は、次のとおりです
   日付 借入額 返済額 年利 設定
     日付：    年月日の区切りは、"-"を使います
@@ -237,13 +255,10 @@ def to_date(date):
     [sgy, sm, sd] = date.replace('.', '-').split('-')
     if(re.match('^[A-Z]', sgy)):
         # JAPANESE CALENDER
-        for i in range(len(GENGO)):
-            if(re.match(GENGO[i][0], sgy)):
-                ny = int(re.sub(GENGO[i][0], '', sgy)) + \
-                     GENGO[i][1].year - 1
-        if(not ('ny' in locals())):
+        if(sgy[0] not in GENGO_FIRST_YEARS):
             sys.stderr.write('no gengo "' + str(date) + '"\n')
             return None
+        ny = int(sgy[1:]) + GENGO_FIRST_YEARS[sgy[0]] - 1
     else:
         # WESTERN CALENDER
         if(int(sgy) < 70):        # 20XX
@@ -268,13 +283,12 @@ def to_str(date, style='3jc'):
     ny = date.year
     if(style == '3jc'):
         # JAPANESE CALENDER
-        for i in range(len(GENGO)):
-            if(date >= GENGO[i][1]):
-                sg = GENGO[i][0]
-                ny = date.year - GENGO[i][1].year + 1
-        if(sg == ''):
+        i = bisect.bisect_right(GENGO_DATES, date) - 1
+        if(i < 0):
             sys.stderr.write('no gengo "' + str(date) + '"\n')
             return None
+        sg = GENGO[i][0]
+        ny = date.year - GENGO[i][1].year + 1
     elif(style == '2wc'):
         # WESTERN CALENDER (2digit)
         if(ny >= 1970):
@@ -289,15 +303,26 @@ def to_str(date, style='3jc'):
 def count_years_and_days(first_day, last_day,
                          has_to_include_first_day=False,
                          has_to_include_last_day=True):
+    fd = to_date(first_day)
+    ld = to_date(last_day)
+    ds, ys, dn, dl = count_years_and_days_of_dates(fd, ld,
+                                                   has_to_include_first_day,
+                                                   has_to_include_last_day)
+    return str(ds), str(ys), str(dn), str(dl)
+
+
+def count_years_and_days_of_dates(first_date, last_date,
+                                  has_to_include_first_day=False,
+                                  has_to_include_last_day=True):
     # PREPARE
     if(has_to_include_first_day):
-        fo = to_date(first_day) - datetime.timedelta(days=1)
+        fo = first_date - datetime.timedelta(days=1)
     else:
-        fo = to_date(first_day)
+        fo = first_date
     if(has_to_include_last_day):
-        lo = to_date(last_day)
+        lo = last_date
     else:
-        lo = to_date(last_day) - datetime.timedelta(days=1)
+        lo = last_date - datetime.timedelta(days=1)
     fy = fo.year
     fm = fo.month
     fd = fo.day
@@ -305,37 +330,37 @@ def count_years_and_days(first_day, last_day,
     lm = lo.month
     ld = lo.day
     # COUNT
-    ds = str((lo - fo).days)  # days
+    ds = (lo - fo).days  # days
     if((lm * 100 + ld) - (fm * 100 + fd) >= 0):
         # SAME YEAR
         if((fm == 2) and (fd == 29) and (not is_leap_year(ly))):
             bi = datetime.date(ly, 2, 28)
         else:
             bi = datetime.date(ly, fm, fd)
-        ys = str(ly - fy)  # years
+        ys = ly - fy  # years
         if(is_leap_year(ly)):
-            dn = '0'                  # days in normal year
-            dl = str((lo - bi).days)  # days in leap year
+            dn = 0                    # days in normal year
+            dl = (lo - bi).days       # days in leap year
         else:
-            dn = str((lo - bi).days)  # days in normal year
-            dl = '0'                  # days in leap year
+            dn = (lo - bi).days       # days in normal year
+            dl = 0                    # days in leap year
     else:
         # OVER YEAR
         if((fm == 2) and (fd == 29) and (not is_leap_year(ly - 1))):
             bi = datetime.date(ly - 1, 2, 28)
         else:
             bi = datetime.date(ly - 1, fm, fd)
-        ys = str(ly - fy - 1)  # years
+        ys = ly - fy - 1  # years
         ei = datetime.date(ly - 1, 12, 31)
         if(is_leap_year(ly - 1)):
-            dn = str((lo - ei).days)  # days in normal year
-            dl = str((ei - bi).days)  # days in leap year
+            dn = (lo - ei).days       # days in normal year
+            dl = (ei - bi).days       # days in leap year
         elif(is_leap_year(ly)):
-            dn = str((ei - bi).days)  # days in normal year
-            dl = str((lo - ei).days)  # days in leap year
+            dn = (ei - bi).days       # days in normal year
+            dl = (lo - ei).days       # days in leap year
         else:
-            dn = str((lo - bi).days)  # days in normal year
-            dl = '0'                  # days in leap year
+            dn = (lo - bi).days       # days in normal year
+            dl = 0                    # days in leap year
     # RETURN
     return ds, ys, dn, dl
 
@@ -356,13 +381,25 @@ def get_statutory_rate(this_principal, prev_principal='0',
     # CHECK
     if((this_standard != '=') and (this_standard != '*')):
         sys.stderr.write('bad standard "' + str(this_standard) + '"\n')
-        if __name__ == '__main__':
+        if must_exit_on_error:
             sys.exit(1)
+    # CALCULATE
+    tr = get_statutory_rate_by_decimal(Decimal(this_principal),
+                                       Decimal(prev_principal),
+                                       Decimal(prev_rate),
+                                       to_date(date),
+                                       this_standard, prev_standard)
+    return str(tr)
+
+
+def get_statutory_rate_by_decimal(this_principal, prev_principal,
+                                  prev_rate, date,
+                                  this_standard='=', prev_standard='='):
     # PREPARE
-    tp = Decimal(this_principal)
-    pp = Decimal(prev_principal)
-    pr = Decimal(prev_rate)
-    da = to_date(date)
+    tp = this_principal
+    pp = prev_principal
+    pr = prev_rate
+    da = date
     ts = this_standard
     ps = prev_standard
     ch = True
@@ -370,9 +407,8 @@ def get_statutory_rate(this_principal, prev_principal='0',
     if(tp < 0):
         # OVERPAYMENT CASE
         if(((ps != '=') and (ps != '*')) or (pp >= 0)):
-            for i in STATUTORY_RATE:
-                if(da >= i[1]):
-                    tr = Decimal(i[0])
+            i = bisect.bisect_right(STATUTORY_RATE_DATES, da) - 1
+            tr = STATUTORY_RATE_VALUES[i]
         else:
             tr = pr
             ch = False
@@ -381,12 +417,12 @@ def get_statutory_rate(this_principal, prev_principal='0',
         tr = Decimal('0')
     else:
         # NORMAL CASE
-        for i in reversed(RESTRICTED_RATE):
-            am = Decimal(i[1])
-            if((tp >= am) and
-               (((ps != '=') and (ps != '*')) or ((pp == 0) or (pp < am)))):
-                tr = Decimal(i[0])
-                break  # Do not remove
+        # (IF THE HIGHEST AMOUNT NOT OVER "tp" IS NOT NEWLY REACHED,
+        #  NEITHER ARE THE LOWER ONES)
+        i = bisect.bisect_right(RESTRICTED_RATE_AMOUNTS, tp) - 1
+        am = RESTRICTED_RATE_AMOUNTS[i]
+        if(((ps != '=') and (ps != '*')) or ((pp == 0) or (pp < am))):
+            tr = RESTRICTED_RATE_VALUES[i]
         else:
             tr = pr
             ch = False
@@ -399,18 +435,32 @@ def get_statutory_rate(this_principal, prev_principal='0',
     sr = str(tr)
     if('.' in sr):
         sr = sr.rstrip('0').rstrip('.')
-    return sr
+    return Decimal(sr)
 
 
 def calculate_interest(principal, interest_rate,
                        days, years, days_in_normal_year, days_in_leap_year,
                        calculating_unit='yearly'):
-    pr = Decimal(principal)
-    ir = Decimal(interest_rate)
-    da = Decimal(days)
-    yr = Decimal(years)
-    dn = Decimal(days_in_normal_year)
-    dl = Decimal(days_in_leap_year)
+    it = calculate_interest_by_decimal(Decimal(principal),
+                                       Decimal(interest_rate),
+                                       Decimal(days),
+                                       Decimal(years),
+                                       Decimal(days_in_normal_year),
+                                       Decimal(days_in_leap_year),
+                                       calculating_unit)
+    return str(it)
+
+
+def calculate_interest_by_decimal(principal, interest_rate,
+                                  days, years,
+                                  days_in_normal_year, days_in_leap_year,
+                                  calculating_unit='yearly'):
+    pr = principal
+    ir = interest_rate
+    da = days
+    yr = years
+    dn = days_in_normal_year
+    dl = days_in_leap_year
     if(calculating_unit == 'daily'):
         # DAILY TOTAL
         ny = da / Decimal(365)
@@ -421,7 +471,7 @@ def calculate_interest(principal, interest_rate,
         # YEAR
         ny = yr + dn / Decimal(365) + dl / Decimal(366)
     it = pr * ir * ny / Decimal(100)
-    return str(int(it))
+    return int(it)
 
 
 ############################################################
@@ -440,7 +490,7 @@ class Trade:
     @classmethod
     def _error(cls, _message):
         sys.stderr.write(_message + '\n')
-        if __name__ == '__main__':
+        if must_exit_on_error:
             sys.exit(1)
 
     ####################################
@@ -679,7 +729,7 @@ class Trade:
     @classmethod
     def get_footer(cls):
         of = cls.get_output_style()
-        tf = TABLE_FOOTER
+        tf = list(TABLE_FOOTER)
         tw = TABLE_WIDTH
         fa = cls.get_total_amount()
         if(cls.should_insert_comma()):
@@ -903,10 +953,9 @@ class Trade:
         return self._prev_interest_rate_standard
 
     def check_and_set_this_interest_rate_standard(self):
-        ts = self.get_this_interest_rate_standard()
-        if(ts == ''):
-            ps = self.get_prev_interest_rate_standard()
-            self.set_this_interest_rate_standard(ps)
+        if(self._this_interest_rate_standard == ''):
+            ps = self._prev_interest_rate_standard
+            self._this_interest_rate_standard = ps
 
     def set_this_interest_rate(self, rate):
         mw = r'^((=)|(\*)|(((=)|(\*))?[0-9]+(\.[0-9]+)?%?))?$'
@@ -931,20 +980,20 @@ class Trade:
         return str(self._prev_interest_rate)
 
     def calc_and_set_this_interest_rate(self):
-        ts = self.get_this_interest_rate_standard()
-        ps = self.get_prev_interest_rate_standard()
+        ts = self._this_interest_rate_standard
+        ps = self._prev_interest_rate_standard
         if(ts == ''):
             ts = ps
-            self.set_this_interest_rate_standard(ts)
+            self._this_interest_rate_standard = ts
         if((ts == '=') or (ts == '*')):
-            tp = self.get_this_remaining_principal()
-            pp = self.get_prev_remaining_principal()
-            pr = self.get_prev_interest_rate()
-            td = self.get_this_date('4wc')
-            tr = get_statutory_rate(tp, pp, pr, td, ts, ps)
+            tp = self._this_remaining_principal
+            pp = self._prev_remaining_principal
+            pr = self._prev_interest_rate
+            td = self._this_date
+            tr = get_statutory_rate_by_decimal(tp, pp, pr, td, ts, ps)
+            self._this_interest_rate = tr
         else:
-            tr = ts
-        self.set_this_interest_rate(tr)
+            self.set_this_interest_rate(ts)
 
     ####################################
     # DAYS
@@ -1011,15 +1060,15 @@ class Trade:
         return str(self._days_in_leap_year)
 
     def calc_and_set_years_and_days(self):
-        pd = self.get_prev_date('4wc')
-        td = self.get_this_date('4wc')
-        ph = self.has_to_include_prev_day()
-        th = self.has_to_include_this_day()
-        dy, yr, nd, ld = count_years_and_days(pd, td, ph, th)
-        self.set_days(dy)
-        self.set_years(yr)
-        self.set_days_in_normal_year(nd)
-        self.set_days_in_leap_year(ld)
+        pd = self._prev_date
+        td = self._this_date
+        ph = self._has_to_include_prev_day
+        th = self._has_to_include_this_day
+        dy, yr, nd, ld = count_years_and_days_of_dates(pd, td, ph, th)
+        self._days = Decimal(dy)
+        self._years = Decimal(yr)
+        self._days_in_normal_year = Decimal(nd)
+        self._days_in_leap_year = Decimal(ld)
 
     ####################################
     # INTEREST
@@ -1033,15 +1082,15 @@ class Trade:
         return str(self._interest)
 
     def calc_and_set_interest(self):
-        pp = self.get_prev_remaining_principal()
-        pr = self.get_prev_interest_rate()
-        da = self.get_days()
-        yr = self.get_years()
-        dn = self.get_days_in_normal_year()
-        dl = self.get_days_in_leap_year()
+        pp = self._prev_remaining_principal
+        pr = self._prev_interest_rate
+        da = self._days
+        yr = self._years
+        dn = self._days_in_normal_year
+        dl = self._days_in_leap_year
         cu = self.get_calculating_unit()
-        it = calculate_interest(pp, pr, da, yr, dn, dl, cu)
-        self.set_interest(it)
+        it = calculate_interest_by_decimal(pp, pr, da, yr, dn, dl, cu)
+        self._interest = Decimal(it)
 
     ####################################
     # CHANGE OF PRINCIPLE
@@ -1098,13 +1147,13 @@ class Trade:
     # CALC AND SET CHANGE AND REMAINING
 
     def calc_and_set_change_and_remaining(self):
-        pp = Decimal(self.get_prev_remaining_principal())
+        pp = self._prev_remaining_principal
         rp = pp
-        pi = Decimal(self.get_prev_remaining_interest())
-        ti = Decimal(self.get_interest())
+        pi = self._prev_remaining_interest
+        ti = self._interest
         ri = pi + ti
-        ba = Decimal(self.get_this_borrowing_amount())
-        ra = Decimal(self.get_this_repayment_amount())
+        ba = self._this_borrowing_amount
+        ra = self._this_repayment_amount
         di = ba - ra
         if(rp > 0):
             # NARMAL CASE
@@ -1140,9 +1189,9 @@ class Trade:
             if(ri > 0):
                 rp += ri
                 ri = Decimal(0)
-        self.set_change_of_principal(str(rp - pp))
-        self.set_this_remaining_interest(str(ri))
-        self.set_this_remaining_principal(str(rp))
+        self._change_of_principal = rp - pp
+        self._this_remaining_interest = ri
+        self._this_remaining_principal = rp
 
     ####################################
     # REMARKS
@@ -1173,9 +1222,9 @@ class Trade:
         return self._has_to_include_prev_day
 
     def calc_and_set_has_to_include_this_day(self):
-        pp = Decimal(self.get_prev_remaining_principal())
-        ba = Decimal(self.get_this_borrowing_amount())
-        ra = Decimal(self.get_this_repayment_amount())
+        pp = self._prev_remaining_principal
+        ba = self._this_borrowing_amount
+        ra = self._this_repayment_amount
         di = ba - ra
         if(self.should_include_first_day()):
             th = (not self.judge_has_to_include_first_day(pp, di))
@@ -1184,9 +1233,9 @@ class Trade:
         self.set_has_to_include_this_day(th)
 
     def calc_and_set_has_to_include_prev_day(self):
-        pp = Decimal(self.get_prev_remaining_principal())
-        ba = Decimal(self.get_prev_borrowing_amount())
-        ra = Decimal(self.get_prev_repayment_amount())
+        pp = self._prev_remaining_principal
+        ba = self._prev_borrowing_amount
+        ra = self._prev_repayment_amount
         di = ba - ra
         if(self.should_include_first_day()):
             ph = self.judge_has_to_include_first_day(pp, di)
@@ -1493,7 +1542,7 @@ class Trade:
 
     def inherit_prev_data_for_first_trade(self):
         # DATE
-        self.set_prev_date(self.get_this_date())
+        self._prev_date = self._this_date
         # BORROWING AMOUNT
         self.set_prev_borrowing_amount('-')
         # REPAYMENT AMOUNT
@@ -1510,31 +1559,59 @@ class Trade:
         self.set_has_to_include_prev_day(True)  # False causes an error
 
     def inherit_prev_data_for_second_and_subsequent_trade(self, prev):
+        # (THE VALUES ARE ALREADY CHECKED, SO THEY ARE COPIED AS THEY ARE)
         # DATE
-        pd = prev.get_this_date()
-        self.set_prev_date(pd)
+        self._prev_date = prev._this_date
         # BORROWING AMOUNT
-        ba = prev.get_this_borrowing_amount()
-        self.set_prev_borrowing_amount(ba)
+        self._prev_borrowing_amount = prev._this_borrowing_amount
         # REPAYMENT AMOUNT
-        ra = prev.get_this_repayment_amount()
-        self.set_prev_repayment_amount(ra)
+        self._prev_repayment_amount = prev._this_repayment_amount
         # INTEREST RATE STANDARD
-        ps = prev.get_this_interest_rate_standard()
-        self.set_prev_interest_rate_standard(ps)
+        ps = prev._this_interest_rate_standard
+        self._prev_interest_rate_standard = ps
         # INTEREST RATE
-        pr = prev.get_this_interest_rate()
-        self.set_prev_interest_rate(pr)
+        self._prev_interest_rate = prev._this_interest_rate
         # REMAINING INTEREST
-        pi = prev.get_this_remaining_interest()
-        self.set_prev_remaining_interest(pi)
+        self._prev_remaining_interest = prev._this_remaining_interest
         # REMAINING PRINCIPAL
-        pp = prev.get_this_remaining_principal()
-        self.set_prev_remaining_principal(pp)
+        self._prev_remaining_principal = prev._this_remaining_principal
         # HAS TO INCLUDE PREV DAY
         ph = not prev.has_to_include_this_day()
         self.set_has_to_include_prev_day((ph))
 
+    ####################################
+    # CALCULATE
+
+    def calc_and_set_all(self, prev=None, is_last=False):
+        # INHERIT DATA
+        if(prev is None):
+            self.reset_options()
+            self.inherit_prev_data_for_first_trade()
+        else:
+            self.inherit_prev_data_for_second_and_subsequent_trade(prev)
+        # THIS INTEREST RATE STANDARD
+        self.check_and_set_this_interest_rate_standard()
+        # HAS TO INCLUDE PREV DAY AND THIS DAY
+        self.calc_and_set_has_to_include_prev_day()
+        self.calc_and_set_has_to_include_this_day()
+        if(is_last):
+            self.set_has_to_include_this_day(True)  # include last day
+        # YEARS AND DAYS
+        self.calc_and_set_years_and_days()
+        # INTEREST
+        self.calc_and_set_interest()
+        # CHANGE AND REMAINING
+        self.calc_and_set_change_and_remaining()
+        # INTEREST RATE
+        self.calc_and_set_this_interest_rate()
+        # CHECK CONSISTENCY
+        # self.check_consistency()
+
+    def set_total_amount_as_last(self):
+        ti = self._this_remaining_interest
+        tp = self._this_remaining_principal
+        Trade._total_amount = str(tp + ti)
+
     ####################################
     # CHECK CONSISTENCY
 
@@ -1543,13 +1620,13 @@ class Trade:
         if(ds == ''):
             ds = self.get_input_date_style()
         td = self.get_this_date(ds)
-        ba = Decimal(self.get_this_borrowing_amount())
-        ra = Decimal(self.get_this_repayment_amount())
-        it = Decimal(self.get_interest())
-        pi = Decimal(self.get_prev_remaining_interest())
-        ti = Decimal(self.get_this_remaining_interest())
-        pp = Decimal(self.get_prev_remaining_principal())
-        tp = Decimal(self.get_this_remaining_principal())
+        ba = self._this_borrowing_amount
+        ra = self._this_repayment_amount
+        it = self._interest
+        pi = self._prev_remaining_interest
+        ti = self._this_remaining_interest
+        pp = self._prev_remaining_principal
+        tp = self._this_remaining_principal
         if(((ba - ra + it) - (tp - pp) - (ti - pi)) != 0):
             self._error('inconsistent "' + td + '"')
 
@@ -1558,6 +1635,10 @@ class Trade:
 
 
 debug_mode = False
+# ALSO IN THE WORKERS OF THE BATCH ("__mp_main__" WITH "spawn")
+must_exit_on_error = __name__ == '__main__'
+batch_dir = None
+jobs = 1
 
 if __name__ == '__main__':
     options = ['help', 'version',
@@ -1566,9 +1647,10 @@ if __name__ == '__main__':
                '3jc', '2wc', '4wc',
                'no-comma'
                'tex', 'csv', 'web', 'markdown', 'math',
+               'jobs=', 'batch=',
                'sample', 'debug']
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 'hvdDe324ntcwmM', options)
+        opts, args = getopt.getopt(sys.argv[1:], 'hvdDe324ntcwmMj:', options)
     except getopt.GetoptError:
         sys.exit(1)
     for opt, arg in opts:
@@ -1602,6 +1684,15 @@ if __name__ == '__main__':
             Trade.set_output_style('markdown')
         elif opt in ('-M', '--math'):
             Trade.set_output_style('math')
+        elif opt in ('-j', '--jobs'):
+            if not re.match('^[0-9]+$', arg):
+                sys.stderr.write('bad number of jobs "' + arg + '"\n')
+                sys.exit(1)
+            jobs = int(arg)
+            if jobs == 0:
+                jobs = os.cpu_count() or 1
+        elif opt in ('--batch'):
+            batch_dir = arg
         elif opt in ('--sample'):
             print(SAMPLE_DATA)
             sys.exit(0)
@@ -1643,76 +1734,293 @@ def is_data_line(line):
     return True
 
 
+def get_line_kind(line):
+    line = line.rstrip()
+    if is_data_line(line):
+        return 'trade'
+    if line != '' and \
+       ('日付' not in line) and ('合計' not in line) and \
+       ('---:' not in line) and not re.match('^=+$', line):
+        return 'bad'
+    return ''
+
+
+def get_trade_state():
+    # OPTIONS AND TOTAL AMOUNT ARE CLASS VARIABLES
+    state = {}
+    for name in vars(Trade):
+        value = getattr(Trade, name)
+        if re.match('^_[a-z]', name) and not callable(value):
+            state[name] = value
+    return state
+
+
+def set_trade_state(state):
+    for name in state:
+        setattr(Trade, name, state[name])
+
+
+class TradeHistory:
+    """A class of a trade history recalculated from the changed row"""
+
+    def __init__(self):
+        self.lines = []
+        self.line_kinds = []  # 'trade', 'bad' OR ''
+        self.trades = []
+        self.rows = []
+        self.options_state = None
+
+    @staticmethod
+    def _get_options_state():
+        state = get_trade_state()
+        state.pop('_total_amount', None)
+        return state
+
+    def calculate(self, raw_data):
+        lines = raw_data.split('\n')
+        # THE FIRST CHANGED LINE (ONLY IF THE OPTIONS ARE THE SAME)
+        m = 0
+        if self._get_options_state() == self.options_state:
+            n = min(len(lines), len(self.lines))
+            while m < n and lines[m] == self.lines[m]:
+                m += 1
+        line_kinds = self.line_kinds[:m]
+        nt = line_kinds.count('trade')
+        # READ THE LINES AFTER IT
+        new_trades = []
+        for i in range(m, len(lines)):
+            # MESSAGE FOR DEBUGGING
+            if debug_mode:
+                sys.stderr.write('reading line ' + str(i) + '\n')
+            # ACCEPT DATA
+            kind = get_line_kind(lines[i])
+            line_kinds.append(kind)
+            if kind == 'trade':
+                new_trades.append(Trade(lines[i].rstrip()))
+        # THE FIRST TRADE TO CALCULATE (THE LAST ONE IS SPECIAL)
+        k = nt
+        if nt + len(new_trades) != len(self.trades):
+            k = min(k, len(self.trades) - 1, nt + len(new_trades) - 1)
+        k = max(k, 0)
+        trades = self.trades[:k] \
+            + [Trade(t.line) for t in self.trades[k:nt]] + new_trades
+        self.calculate_trades(trades, k)
+        # MAKE OUTPUT
+        rows = self.rows[:k]
+        for i in range(k, len(trades)):
+            # MESSAGE FOR DEBUGGING
+            if debug_mode:
+                sys.stderr.write('printing line ' + str(i) + '\n')
+            rows.append(trades[i].get_trade(i))
+        self.lines, self.line_kinds = lines, line_kinds
+        self.trades, self.rows = trades, rows
+        self.options_state = self._get_options_state()
+        return self.get_output()
+
+    @staticmethod
+    def calculate_trades(trades, first=0):
+        for i in range(first, len(trades)):
+            # MESSAGE FOR DEBUGGING
+            if(debug_mode):
+                sys.stderr.write('calculating line ' + str(i) + '\n')
+            prev = trades[i - 1] if i > 0 else None
+            trades[i].calc_and_set_all(prev, i == len(trades) - 1)
+        # TOTAL AMOUNT
+        if len(trades) > 0:
+            trades[-1].set_total_amount_as_last()
+
+    def get_total_amount(self):
+        return Trade.get_total_amount()
+
+    def get_output(self):
+        output = ''
+        output += Trade.get_header() + '\n'
+        for row in self.rows:
+            output += row + '\n'
+        output += Trade.get_footer() + '\n'
+        bad_lines = [line.rstrip()
+                     for line, kind in zip(self.lines, self.line_kinds)
+                     if kind == 'bad']
+        if len(bad_lines) > 0:
+            output += '次の行は除外しました。\n'
+            for line in bad_lines:
+                output += line + '\n'
+        return output
+
+
 def main(raw_data):
-    trades = []
+    return TradeHistory().calculate(raw_data)
+
+
+def generate_output(lines):
+    # YIELDS THE OUTPUT OF "main" PIECE BY PIECE, KEEPING ONLY TWO TRADES
+    # (THE HEADER WAITS FOR THE OPTIONS OF THE FIRST TRADE,
+    #  AND THE LAST TRADE IS CALCULATED DIFFERENTLY)
     bad_lines = []
-    lines = raw_data.split('\n')
-    for i, line in enumerate(lines):
+    prev, this, i = None, None, 0
+    for j, line in enumerate(lines):
         # MESSAGE FOR DEBUGGING
         if debug_mode:
-            sys.stderr.write('reading line ' + str(i) + '\n')
+            sys.stderr.write('reading line ' + str(j) + '\n')
         # ACCEPT DATA
-        line = line.rstrip()
-        if not is_data_line(line):
-            if line != '' and \
-               ('日付' not in line) and ('合計' not in line) and \
-               ('---:' not in line) and not re.match('^=+$', line):
-                bad_lines.append(line)
+        kind = get_line_kind(line)
+        if kind == 'bad':
+            bad_lines.append(line.rstrip())
+        if kind != 'trade':
             continue
-        trades.append(Trade(line))
-    # CALC AMOUNT
-    for i, this in enumerate(trades):
-        # MESSAGE FOR DEBUGGING
-        if(debug_mode):
-            sys.stderr.write('calculating line ' + str(i) + '\n')
-        # INHERIT DATA
-        if(i == 0):
-            this.reset_options()
-            this.inherit_prev_data_for_first_trade()
-        else:
-            prev = trades[i - 1]
-            this.inherit_prev_data_for_second_and_subsequent_trade(prev)
-        # THIS INTEREST RATE STANDARD
-        this.check_and_set_this_interest_rate_standard()
-        # HAS TO INCLUDE PREV DAY AND THIS DAY
-        this.calc_and_set_has_to_include_prev_day()
-        this.calc_and_set_has_to_include_this_day()
-        if i == (len(trades) - 1):
-            this.set_has_to_include_this_day(True)  # include last day
-        # YEARS AND DAYS
-        this.calc_and_set_years_and_days()
-        # INTEREST
-        this.calc_and_set_interest()
-        # CHANGE AND REMAINING
-        this.calc_and_set_change_and_remaining()
-        # INTEREST RATE
-        this.calc_and_set_this_interest_rate()
-        # TOTAL AMOUNT
-        ti = Decimal(this.get_this_remaining_interest())
-        tp = Decimal(this.get_this_remaining_principal())
-        Trade.set_total_amount(str(tp + ti))
-        # CHECK CONSISTENCY
-        # this.check_consistency()
-    # MAKE OUTPUT
-    output = ''
-    output += Trade.get_header() + '\n'
-    for i, tr in enumerate(trades):
-        # MESSAGE FOR DEBUGGING
-        if debug_mode:
-            sys.stderr.write('printing line ' + str(i) + '\n')
-        output += tr.get_trade(i) + '\n'
-    output += Trade.get_footer() + '\n'
+        if this is not None:
+            yield from _generate_trade(this, prev, i, False)
+            prev, i = this, i + 1
+        this = Trade(line.rstrip())
+    if this is not None:
+        yield from _generate_trade(this, prev, i, True)
+        this.set_total_amount_as_last()
+    else:
+        yield Trade.get_header() + '\n'
+    yield Trade.get_footer() + '\n'
     if len(bad_lines) > 0:
-        output += '次の行は除外しました。\n'
+        yield '次の行は除外しました。\n'
         for line in bad_lines:
-            output += line + '\n'
-    return output
+            yield line + '\n'
+
+
+def _generate_trade(this, prev, i, is_last):
+    # MESSAGE FOR DEBUGGING
+    if debug_mode:
+        sys.stderr.write('calculating line ' + str(i) + '\n')
+    this.calc_and_set_all(prev, is_last)
+    if prev is None:
+        yield Trade.get_header() + '\n'
+    # MESSAGE FOR DEBUGGING
+    if debug_mode:
+        sys.stderr.write('printing line ' + str(i) + '\n')
+    yield this.get_trade(i) + '\n'
+
+
+def write_output(lines, output_file):
+    for text in generate_output(lines):
+        output_file.write(text)
+
+
+############################################################
+# BATCH
+
+
+OUTPUT_EXTENSIONS = {'text': '.txt',
+                     'tex': '.tex',
+                     'csv': '.csv',
+                     'web': '.html',
+                     'markdown': '.md',
+                     'math': '.txt'}
+
+
+SUMMARY_FILE_NAME = 'summary.csv'
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def calculate_file(job):
+    # EACH HISTORY STARTS FROM THE STATE GIVEN BY THE COMMAND LINE
+    global debug_mode, must_exit_on_error
+    input_path, output_base, state, debug_mode = job
+    must_exit_on_error = True
+    set_trade_state(state)
+    # THE OUTPUT IS STREAMED INTO A TEMPORARY FILE AND RENAMED WHEN IT IS DONE
+    temp_path = os.path.join(os.path.dirname(output_base),
+                             '.' + os.path.basename(output_base) + '.tmp')
+    try:
+        with open(input_path, 'r') as f_in, open(temp_path, 'w') as f_out:
+            write_output(f_in, f_out)
+        # THE FIRST ROW OF THE HISTORY MAY CHANGE THE OUTPUT STYLE
+        ext = OUTPUT_EXTENSIONS[Trade.get_output_style()]
+        os.replace(temp_path, output_base + ext)
+    except SystemExit:
+        remove_file(temp_path)
+        return input_path, None, 'error'
+    except Exception as e:
+        remove_file(temp_path)
+        sys.stderr.write(str(e) + ' "' + input_path + '"\n')
+        return input_path, None, 'error'
+    return input_path, str(Trade.get_total_amount()), ''
+
+
+def calculate_directory(input_dir, output_dir, jobs=1):
+    if not os.path.isdir(input_dir):
+        sys.stderr.write('no such directory "' + input_dir + '"\n')
+        sys.exit(1)
+    if os.path.exists(output_dir) and \
+       os.path.samefile(input_dir, output_dir):
+        sys.stderr.write('output directory is input directory "'
+                         + output_dir + '"\n')
+        sys.exit(1)
+    os.makedirs(output_dir, exist_ok=True)
+    state = get_trade_state()
+    names = []
+    for name in sorted(os.listdir(input_dir)):
+        input_path = os.path.join(input_dir, name)
+        if re.match('^\\.', name) or not os.path.isfile(input_path):
+            continue
+        names.append(name)
+    # THE OUTPUT NAME IS THE INPUT NAME WITHOUT ITS EXTENSION ("a.txt" -> "a")
+    # OR WITH IT WHEN IT IS SHARED OR IS THE SUMMARY'S ("a.txt" -> "a.txt")
+    stems = [os.path.splitext(n)[0].lower() for n in names]
+    summary_stem = os.path.splitext(SUMMARY_FILE_NAME)[0]
+    bases = {}
+    job_list = []
+    conflicts = []
+    for name, stem in zip(names, stems):
+        input_path = os.path.join(input_dir, name)
+        base = os.path.splitext(name)[0]
+        if stems.count(stem) > 1 or stem == summary_stem:
+            base = name
+        if base.lower() in bases:
+            sys.stderr.write('output file name conflicts with "'
+                             + bases[base.lower()] + '" "'
+                             + input_path + '"\n')
+            conflicts.append((input_path, None, 'conflict'))
+            continue
+        bases[base.lower()] = name
+        output_base = os.path.join(output_dir, base)
+        job_list.append((input_path, output_base, state, debug_mode))
+    if jobs <= 1 or len(job_list) <= 1:
+        results = [calculate_file(j) for j in job_list]
+    else:
+        import multiprocessing
+        with multiprocessing.Pool(min(jobs, len(job_list))) as pool:
+            results = pool.map(calculate_file, job_list)
+    set_trade_state(state)
+    if len(conflicts) > 0:
+        results += conflicts
+        results.sort(key=lambda r: names.index(os.path.basename(r[0])))
+    # SUMMARY
+    summary = '"ファイル","合計","備考"\n'
+    total = Decimal(0)
+    for input_path, amount, remarks in results:
+        name = os.path.basename(input_path).replace('"', '""')
+        if amount is None:
+            amount = ''
+        else:
+            total += Decimal(amount)
+        summary += '"' + name + '","' + amount + '","' + remarks + '"\n'
+    summary += '"合計","' + str(total) + '",""\n'
+    with open(os.path.join(output_dir, SUMMARY_FILE_NAME), 'w') as f:
+        f.write(summary)
+    return results
 
 
 if __name__ == '__main__':
-    # IMPORT DATA
+    # BATCH
+    if batch_dir is not None:
+        if len(args) != 1:
+            sys.stderr.write('specify one input directory\n')
+            sys.exit(1)
+        results = calculate_directory(args[0], batch_dir, jobs)
+        if any(amount is None for _, amount, _ in results):
+            sys.exit(1)
+        sys.exit(0)
+    # CALCULATE AND PRINT
     input = open_input_source(args)
-    raw_data = input.read()
-    output = main(raw_data)
-    # PRINT
-    print(output, end='')
+    write_output(input, sys.stdout)
@@ -0,0 +1,487 @@
+#!/usr/bin/python3
+# Name:         daemon.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.19-09:00:00-JST>
+
+# daemon.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# python3 makdo_daemon.py serve [-s SOCKET] [-j JOBS]
+# python3 makdo_daemon.py md2docx [md2docx options] xxx.md xxx.docx
+# python3 makdo_daemon.py docx2md [docx2md options] xxx.docx xxx.md
+# python3 makdo_daemon.py mddiff [mddiff options] xxx.md yyy.md
+#
+# "serve" keeps the converters loaded in a pool of worker processes and
+# accepts requests on a Unix domain socket.  The other commands take the
+# same options as the original command lines, send them to the daemon,
+# and put out the same standard output, standard error and exit status.
+# If no daemon is running, they run the converter in their own process.
+#
+# The socket is made in "$XDG_RUNTIME_DIR" or in a directory "makdo-UID"
+# in the temporary directory, which the server makes with the mode 0700.
+# The client sends nothing unless the socket and its directory are owned
+# by the user and (on Linux) the server process is run by the user.
+
+
+__version__ = 'v08 Omachi'
+
+
+import sys
+import os
+import argparse     # Python Software Foundation License
+import io
+import json
+import base64
+import socket
+import socketserver
+import signal
+import tempfile
+import types
+import struct
+import traceback
+import concurrent.futures
+
+
+MAKDO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+COMMANDS = {
+    'md2docx': 'makdo_md2docx',
+    'docx2md': 'makdo_docx2md',
+    'mddiff': 'makdo_mddiff',
+}
+
+if sys.platform == 'win32':
+    DEFAULT_SOCKET = ''
+elif os.getenv('XDG_RUNTIME_DIR', '') != '':
+    DEFAULT_SOCKET = os.path.join(os.getenv('XDG_RUNTIME_DIR'), 'makdo.sock')
+else:
+    # A DIRECTORY ONLY FOR THE USER (A SHARED PATH CAN BE TAKEN BY OTHERS)
+    DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(),
+                                  'makdo-' + str(os.getuid()), 'makdo.sock')
+DEFAULT_SOCKET = os.getenv('MAKDO_SOCKET', DEFAULT_SOCKET)
+
+
+HELP_EPILOG = '''コマンド:
+  serve      変換サーバーを起動します
+  md2docx    makdo_md2docx.pyと同じです
+  docx2md    makdo_docx2md.pyと同じです
+  mddiff     makdo_mddiff.pyと同じです
+
+環境変数:
+  MAKDO_SOCKET  ソケットのパス
+'''
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description='変換器を常駐させて、ソケット経由で変換します',
+        add_help=False,
+        epilog=HELP_EPILOG)
+    parser.add_argument(
+        '-h', '--help',
+        action='help',
+        help='ヘルプメッセージを表示します')
+    parser.add_argument(
+        '-v', '--version',
+        action='version',
+        version=('%(prog)s ' + __version__),
+        help='バージョン番号を表示します')
+    parser.add_argument(
+        '-s', '--socket',
+        type=str,
+        default=DEFAULT_SOCKET,
+        metavar='SOCKET',
+        help='ソケットのパス')
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        metavar='NUMBER',
+        help='同時に変換する数（serve）')
+    parser.add_argument(
+        'command',
+        choices=['serve'] + list(COMMANDS),
+        help='コマンド')
+    parser.add_argument(
+        'arguments',
+        nargs=argparse.REMAINDER,
+        help='変換器の引数')
+    return parser.parse_args()
+
+
+############################################################
+# CONVERTER
+
+
+class Converter:
+
+    """A class to run a converter as its command line does"""
+
+    # COMPILED ONCE FOR EACH PROCESS
+    codes = {}
+    # SHARED BY ALL RUNS OF THE SAME CONVERTER
+    # ("Re" OF "makdo_re" IS IMPORTED ONCE AND KEEPS ITS BOUNDED REGISTRY)
+    documents = {}
+    expressions = {}
+
+    @classmethod
+    def load(cls, commands=COMMANDS):
+        for command in commands:
+            path = os.path.join(MAKDO_DIR, COMMANDS[command] + '.py')
+            with open(path, 'rb') as f:
+                cls.codes[command] = compile(f.read(), path, 'exec')
+            cls.documents[command] = {}
+            cls.expressions[command] = {}
+            # IMPORT THE DEPENDENCIES ("docx", "lxml", ...)
+            cls._get_module(command)
+
+    @classmethod
+    def _get_module(cls, command):
+        # A FRESH MODULE FOR EACH RUN (CLASSES KEEP THEIR STATES)
+        name = COMMANDS[command]
+        module = types.ModuleType(name)
+        module.__file__ = os.path.join(MAKDO_DIR, name + '.py')
+        sys.modules[name] = module  # for "multiprocessing"
+        exec(cls.codes[command], module.__dict__)
+        # KEEP THE STYLED BASE DOCUMENTS
+        if 'MsDocCache' in module.__dict__:
+            module.MsDocCache.documents = cls.documents[command]
+        # KEEP THE WRITTEN MATH EXPRESSIONS
+        if 'MathCache' in module.__dict__:
+            module.MathCache.expressions = cls.expressions[command]
+        return module
+
+    @classmethod
+    def run(cls, request):
+        command = request['command']
+        if command not in cls.codes:
+            cls.load([command])
+        stdin_data = base64.b64decode(request['stdin'])
+        stdin_file = tempfile.TemporaryFile()
+        stdin_file.write(stdin_data)
+        stdin_file.seek(0)
+        stdout_file = tempfile.TemporaryFile()
+        stderr = io.StringIO()
+        # "/dev/stdout" IS ALSO USED, SO THE DESCRIPTORS ARE REPLACED
+        sys.stdout.flush()
+        old_fds = os.dup(0), os.dup(1)
+        old_files = sys.argv, sys.stdin, sys.stdout, sys.stderr
+        old_cwd = os.getcwd()
+        status = 0
+        try:
+            os.dup2(stdin_file.fileno(), 0)
+            os.dup2(stdout_file.fileno(), 1)
+            sys.stdin = open(0, 'r', closefd=False)
+            sys.stdout = open(1, 'w', encoding=request['encoding'],
+                              closefd=False)
+            sys.stderr = stderr
+            sys.argv = [request['prog']] + request['arguments']
+            os.chdir(request['cwd'])
+            module = cls._get_module(command)
+            module.__name__ = '__main__'
+            module.main()
+        except SystemExit as e:
+            if e.code is None:
+                status = 0
+            elif isinstance(e.code, int):
+                status = e.code
+            else:
+                stderr.write(str(e.code) + '\n')
+                status = 1
+        except BaseException:
+            stderr.write(traceback.format_exc())
+            status = 1
+        finally:
+            sys.stdout.flush()
+            os.chdir(old_cwd)
+            sys.argv, sys.stdin, sys.stdout, sys.stderr = old_files
+            os.dup2(old_fds[0], 0)
+            os.dup2(old_fds[1], 1)
+            os.close(old_fds[0])
+            os.close(old_fds[1])
+            stdin_file.close()
+        stdout_file.seek(0)
+        stdout_data = stdout_file.read()
+        stdout_file.close()
+        stderr_text = stderr.getvalue()
+        warnings = []
+        for msg in stderr_text.split('\n\n'):
+            if msg.strip() != '':
+                warnings.append(msg.strip())
+        response = {
+            'status': status,
+            'stdout': base64.b64encode(stdout_data).decode('ascii'),
+            'stderr': stderr_text,
+            'warnings': warnings,
+        }
+        return response
+
+
+############################################################
+# PROTOCOL
+
+
+class Message:
+
+    """A class to send and receive a length-prefixed JSON message"""
+
+    @staticmethod
+    def send(sock, data):
+        b = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        sock.sendall(len(b).to_bytes(8, 'big') + b)
+
+    @staticmethod
+    def receive(sock):
+        head = Message._receive_exactly(sock, 8)
+        if head is None:
+            return None
+        b = Message._receive_exactly(sock, int.from_bytes(head, 'big'))
+        if b is None:
+            return None
+        return json.loads(b.decode('utf-8'))
+
+    @staticmethod
+    def _receive_exactly(sock, size):
+        chunks = []
+        while size > 0:
+            chunk = sock.recv(min(size, 1048576))
+            if chunk == b'':
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+
+############################################################
+# SOCKET
+
+
+class SocketPath:
+
+    """A class to check that the socket belongs to the user"""
+
+    @staticmethod
+    def make_directory(socket_path):
+        socket_dir = os.path.dirname(os.path.abspath(socket_path))
+        if not os.path.exists(socket_dir):
+            os.makedirs(socket_dir, mode=0o700)
+        if not SocketPath._is_private(socket_dir):
+            msg = '※ エラー: ' \
+                + 'ディレクトリ「' + socket_dir + '」は' \
+                + '他のユーザーも書き込めます'
+            # msg = 'error: ' \
+            #     + 'directory "' + socket_dir + '" is writable by others'
+            sys.stderr.write(msg + '\n\n')
+            sys.exit(1)
+
+    @staticmethod
+    def is_trusted(socket_path):
+        socket_dir = os.path.dirname(os.path.abspath(socket_path))
+        if not SocketPath._is_private(socket_dir):
+            return False
+        try:
+            st = os.lstat(socket_path)
+        except OSError:
+            return False
+        return st.st_uid == os.getuid()
+
+    @staticmethod
+    def is_peer_trusted(sock):
+        # "SO_PEERCRED" IS ONLY ON LINUX
+        if not hasattr(socket, 'SO_PEERCRED'):
+            return True
+        size = struct.calcsize('3i')
+        cred = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, size)
+        pid, uid, gid = struct.unpack('3i', cred)
+        return uid == os.getuid()
+
+    @staticmethod
+    def _is_private(socket_dir):
+        try:
+            st = os.stat(socket_dir)
+        except OSError:
+            return False
+        if st.st_uid != os.getuid():
+            return False
+        if st.st_mode & 0o022 != 0:
+            return False
+        return True
+
+
+############################################################
+# SERVER
+
+
+class RequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        request = Message.receive(self.request)
+        if request is None:
+            return
+        future = self.server.pool.submit(Converter.run, request)
+        try:
+            response = future.result()
+        except BaseException:
+            response = {'status': 1, 'stdout': '',
+                        'stderr': traceback.format_exc(), 'warnings': []}
+        Message.send(self.request, response)
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, jobs):
+        SocketPath.make_directory(socket_path)
+        if os.path.exists(socket_path):
+            if Client.is_alive(socket_path):
+                msg = '※ エラー: ' \
+                    + 'ソケット「' + socket_path + '」は使用中です'
+                # msg = 'error: ' \
+                #     + 'socket "' + socket_path + '" is in use'
+                sys.stderr.write(msg + '\n\n')
+                sys.exit(1)
+            os.remove(socket_path)
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=Converter.load)
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.socket_path = socket_path
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def serve(socket_path, jobs):
+    server = Server(socket_path, jobs)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+
+
+############################################################
+# CLIENT
+
+
+class Client:
+
+    """A class to send a command line to the daemon"""
+
+    @staticmethod
+    def is_alive(socket_path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+        except OSError:
+            return False
+        return True
+
+    @staticmethod
+    def make_request(command, arguments):
+        stdin_data = b''
+        if '-' in arguments and not sys.stdin.isatty():
+            stdin_data = sys.stdin.buffer.read()
+        encoding = sys.stdout.encoding
+        if encoding is None:
+            encoding = 'utf-8'
+        request = {
+            'command': command,
+            'prog': COMMANDS[command] + '.py',
+            'arguments': arguments,
+            'cwd': os.getcwd(),
+            'encoding': encoding,
+            'stdin': base64.b64encode(stdin_data).decode('ascii'),
+        }
+        return request
+
+    @staticmethod
+    def send_request(socket_path, request):
+        if socket_path == '' or not hasattr(socket, 'AF_UNIX'):
+            return None
+        if not os.path.exists(socket_path):
+            return None
+        if not SocketPath.is_trusted(socket_path):
+            msg = '※ 警告: ' \
+                + 'ソケット「' + socket_path + '」は信頼できないため、' \
+                + '使いません'
+            # msg = 'warning: ' \
+            #     + 'socket "' + socket_path + '" is not trusted'
+            sys.stderr.write(msg + '\n\n')
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+                if not SocketPath.is_peer_trusted(sock):
+                    msg = '※ 警告: ' \
+                        + 'ソケット「' + socket_path + '」のサーバーは' \
+                        + '他のユーザーのものです'
+                    # msg = 'warning: ' \
+                    #     + 'server of "' + socket_path + '" is not yours'
+                    sys.stderr.write(msg + '\n\n')
+                    return None
+                Message.send(sock, request)
+                return Message.receive(sock)
+        except OSError:
+            return None
+
+    @staticmethod
+    def put_out(response):
+        sys.stdout.flush()
+        sys.stdout.buffer.write(base64.b64decode(response['stdout']))
+        sys.stdout.buffer.flush()
+        sys.stderr.write(response['stderr'])
+        return response['status']
+
+
+############################################################
+# MAIN
+
+
+def main():
+    args = get_arguments()
+    if args.command == 'serve':
+        if not hasattr(socket, 'AF_UNIX'):
+            msg = '※ エラー: ' \
+                + 'この環境ではUnixドメインソケットが使えません'
+            # msg = 'error: ' \
+            #     + 'unix domain sockets are not available'
+            sys.stderr.write(msg + '\n\n')
+            sys.exit(1)
+        serve(args.socket, args.jobs)
+        sys.exit(0)
+    request = Client.make_request(args.command, args.arguments)
+    response = Client.send_request(args.socket, request)
+    if response is None:
+        # NO DAEMON
+        response = Converter.run(request)
+    sys.exit(Client.put_out(response))
+
+
+if __name__ == '__main__':
+    main()
@@ -56,6 +56,7 @@ __version__ = 'v08 Omachi'
 # d2m.set_version_number('rrr')
 # d2m.set_content_status('sss')
 # m2d.set_has_completed('ttt')
+# d2m.set_jobs('uuu')
 # d2m.save('xxx.md')
 
 
@@ -75,8 +76,18 @@ import shutil
 import argparse     # Python Software Foundation License
 import re
 import unicodedata
+import bisect
 import datetime     # Zope Public License
+import multiprocessing
 import tempfile
+try:
+    from makdo_re import Re
+    from makdo_scanner import Scanner
+    from makdo_profile import StartupProfile
+except ImportError:
+    from makdo.makdo_re import Re
+    from makdo.makdo_scanner import Scanner
+    from makdo.makdo_profile import StartupProfile
 
 
 def get_arguments():
@@ -198,6 +209,15 @@ def get_arguments():
         '-c', '--has-completed',
         action='store_true',
         help='備考書（コメント）などを消して完成させます')
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        metavar='NUMBER',
+        help='段落の解析を並列に行うプロセスの数（0はCPUの数）')
+    parser.add_argument(
+        '--profile-startup',
+        action=StartupProfile,
+        help='起動時間の内訳を表示します')
     parser.add_argument(
         'docx_file',
         help='MS Wordファイル')
@@ -299,6 +319,9 @@ DEFAULT_CONTENT_STATUS = ''
 
 DEFAULT_HAS_COMPLETED = False
 
+DEFAULT_JOBS = 1
+RAW_PARAGRAPHS_PER_JOB = 64
+
 BASIC_TABLE_CELL_HEIGHT = 1.5
 BASIC_TABLE_CELL_WIDTH = 1.5  # >= 1.1068
 
@@ -830,6 +853,21 @@ def get_ideal_width(s):
     return wid
 
 
+def get_ideal_widths(s):
+    # get_ideal_widths(s)[i] == get_ideal_width(s[:i])
+    wids = [0]
+    wid = 0
+    for c in s:
+        if c == '\t':
+            wid += (int(wid / TAB_WIDTH) + 1) * TAB_WIDTH
+        elif unicodedata.east_asian_width(c) in ('F', 'W'):
+            wid += 2
+        else:
+            wid += 1
+        wids.append(wid)
+    return wids
+
+
 def c2n_n_arab(s):
     n = 0
     for c in s:
@@ -1534,6 +1572,7 @@ class Form:
     version_number = DEFAULT_VERSION_NUMBER
     content_status = DEFAULT_CONTENT_STATUS
     has_completed = DEFAULT_HAS_COMPLETED
+    jobs = DEFAULT_JOBS
     created_time = ''
     modified_time = ''
 
@@ -1991,6 +2030,8 @@ class Form:
                 Form.set_content_status(args.content_status)
             if args.has_completed:
                 Form.set_has_completed(str(args.has_completed))
+            if args.jobs is not None:
+                Form.set_jobs(str(args.jobs))
 
     @staticmethod
     def set_document_title(value, item='document_title'):
@@ -2275,6 +2316,24 @@ class Form:
         #     + '"' + item + '" must be "True" or "False"'
         sys.stderr.write(msg + '\n\n')
 
+    @staticmethod
+    def set_jobs(value, item='jobs'):
+        if value is None:
+            return False
+        value = unicodedata.normalize('NFKC', value)
+        if re.match('^[0-9]+$', value):
+            Form.jobs = int(value)
+            if Form.jobs == 0:
+                Form.jobs = os.cpu_count() or 1
+            return True
+        msg = '※ 警告: ' \
+            + '「' + item + '」の値は' \
+            + '0以上の整数でなければなりません'
+        # msg = 'warning: ' \
+        #     + '"' + item + '" must be a non-negative integer'
+        sys.stderr.write(msg + '\n\n')
+        return False
+
     @classmethod
     def get_configurations(cls):
         return cls._get_configurations_in_japanese()
@@ -2586,8 +2645,8 @@ class Form:
                 tmp_num = int(re.sub(res_s2_num, '\\1', xl))
                 for s1_key in s1_styles:
                     res = '^' + str(tmp_num) + '-([0-9]+)$'
-                    if re.match(res, s1_key):
-                        s2_key = str(s2_num) + '-' + re.sub(res, '\\1', s1_key)
+                    if Re.match(res, s1_key):
+                        s2_key = str(s2_num) + '-' + Re.sub(res, '\\1', s1_key)
                         s2_styles[s2_key] = s1_styles[s1_key]
             elif re.match(res_s2_end, xl):
                 s2_num = -1
@@ -2607,6 +2666,48 @@ class Form:
                     footnotes[_fnid] += xl
         return footnotes
 
+    @staticmethod
+    def expand_compact_styles(document_xml_lines, styles_xml_lines):
+        # STYLES MADE BY "makdo_md2docx.py --compact-styles"
+        res_beg = '^<w:style .* w:styleId=[\'"](makdo-[cp][0-9]+)[\'"]>$'
+        res_end = '^</w:style>$'
+        res_prp_beg = '^<w:[rp]Pr>$'
+        res_prp_end = '^</w:[rp]Pr>$'
+        compact_styles = {}
+        stid, base, prps, is_in_prp = None, '', [], False
+        for xl in styles_xml_lines:
+            if re.match(res_beg, xl):
+                stid, base, prps = re.sub(res_beg, '\\1', xl), '', []
+            elif stid is None:
+                continue
+            elif re.match(res_end, xl):
+                compact_styles[stid] = (base, prps)
+                stid = None
+            elif re.match(res_prp_beg, xl):
+                is_in_prp = True
+            elif re.match(res_prp_end, xl):
+                is_in_prp = False
+            elif is_in_prp:
+                prps.append(xl)
+            else:
+                base = XML.get_value('w:basedOn', 'w:val', base, xl)
+        if len(compact_styles) == 0:
+            return document_xml_lines
+        res_ref = '^<w:[rp]Style w:val=[\'"](makdo-[cp][0-9]+)[\'"]/>$'
+        new_xml_lines = []
+        for xl in document_xml_lines:
+            if re.match(res_ref, xl):
+                stid = re.sub(res_ref, '\\1', xl)
+                if stid in compact_styles:
+                    base, prps = compact_styles[stid]
+                    if base != '':
+                        xl = '<w:pStyle w:val="' + base + '"/>'
+                        new_xml_lines.append(xl)
+                    new_xml_lines += prps
+                    continue
+            new_xml_lines.append(xl)
+        return new_xml_lines
+
 
 class AutoNumberingStyle:
 
@@ -3303,11 +3404,16 @@ class MathDatum:
             return None, None
         md_pre = math_data[-2]
         md_cur = math_data[-1]
+        # THE REGULAR EXPRESSIONS ARE TRIED ONLY FOR THE TAG NAME
+        tag = XML.get_tag_name(xl)
         # FONT NAME (NOT IMPLEMENTED)
         # FONT SIZE AND SCALE
-        v = XML.get_value('w:sz', 'w:val', -1.0, xl)
+        v = -1.0
+        if tag == 'w:sz':
+            v = XML.get_value('w:sz', 'w:val', v, xl)
         # (FOR COMPLEX SCRIPT)
-        v = XML.get_value('w:szCs', 'w:val', v, xl)
+        if tag == 'w:szCs':
+            v = XML.get_value('w:szCs', 'w:val', v, xl)
         if v > 0:
             s = round(v / 2, 1)
             if s < f_size * 0.3:
@@ -3332,7 +3438,9 @@ class MathDatum:
                 md_cur.append_fr_and_bk_fds('s+5', 's+5')  # Huge
             return math_data, None
         # FONT WIDTH
-        v = XML.get_value('w:w', 'w:val', -1.0, xl)
+        v = -1.0
+        if tag == 'w:w':
+            v = XML.get_value('w:w', 'w:val', v, xl)
         if v > 0:
             if v < 30:
                 md_cur.append_fr_and_bk_fds('w-4', 'w-4')
@@ -3356,7 +3464,9 @@ class MathDatum:
                 md_cur.append_fr_and_bk_fds('w+5', 'w+5')
             return math_data, None
         # BOLD OR ROMAN
-        v = XML.get_value('m:sty', 'm:val', '', xl)
+        v = ''
+        if tag == 'm:sty':
+            v = XML.get_value('m:sty', 'm:val', v, xl)
         if v != '':
             # ROMAN
             if v == 'p' or v == 'b':
@@ -3366,20 +3476,24 @@ class MathDatum:
                 md_cur.append_fr_and_bk_fds('b', 'b')
             return math_data, None
         # STRIKETHROUGH
-        if re.match('^<w:strike/?>$', xl):
+        if tag == 'w:strike' and re.match('^<w:strike/?>$', xl):
             md_cur.append_fr_and_bk_fds('s', 's')
             return math_data, None
         # FRAME
-        if re.match('^<w:bdr( .*)?/?>$', xl):
+        if tag == 'w:bdr' and re.match('^<w:bdr( .*)?/?>$', xl):
             md_cur.append_fr_and_bk_fds('f', 'f')
             return math_data, None
         # UNDERLINE
-        v = XML.get_value('w:u', 'w:val', '', xl)
+        v = ''
+        if tag == 'w:u':
+            v = XML.get_value('w:u', 'w:val', v, xl)
         if v != '':
             md_cur.append_fr_and_bk_fds('u', 'u')
             return math_data, None
         # FONT COLOR
-        v = XML.get_value('w:color', 'w:val', '', xl)
+        v = ''
+        if tag == 'w:color':
+            v = XML.get_value('w:color', 'w:val', v, xl)
         if v != '':
             if v == 'FFFFFF':
                 c = 'white'
@@ -3390,7 +3504,9 @@ class MathDatum:
             md_cur.append_fr_and_bk_fds('c=' + c, 'c=' + c)
             return math_data, None
         # HIGILIGHT COLOR
-        v = XML.get_value('w:highlight', 'w:val', '', xl)
+        v = ''
+        if tag == 'w:highlight':
+            v = XML.get_value('w:highlight', 'w:val', v, xl)
         if v != '':
             md_cur.append_fr_and_bk_fds('h=' + v, 'h=' + v)
             return math_data, None
@@ -3448,7 +3564,7 @@ class MathDatum:
             md_cur.chars += xl
             return math_data, None
         # LINE BREAK
-        if re.match('^<m:brk( .*)?/>$', xl):
+        if tag == 'm:brk' and re.match('^<m:brk( .*)?/>$', xl):
             md_cur.chars += '\\\\'
             return math_data, None
         # FUNCTION NAME
@@ -3530,7 +3646,8 @@ class MathDatum:
         # </m:acc>
         # = \vec{A}
         # --------------------------------------------------
-        if re.match('<m:chr m:val="(\u2192|\u20D7)"/>', xl):
+        if tag == 'm:chr' and \
+           re.match('<m:chr m:val="(\u2192|\u20D7)"/>', xl):
             md_cur.chars += '\\vec'
             return math_data, None
         # DOT
@@ -3546,13 +3663,13 @@ class MathDatum:
         # </m:acc>
         # = \dot{A}
         # --------------------------------------------------
-        if re.match('<m:chr m:val="(\u0307)"/>', xl):
+        if tag == 'm:chr' and re.match('<m:chr m:val="(\u0307)"/>', xl):
             md_cur.chars += '\\dot'
             return math_data, None
-        if re.match('<m:chr m:val="(\u0308)"/>', xl):
+        if tag == 'm:chr' and re.match('<m:chr m:val="(\u0308)"/>', xl):
             md_cur.chars += '\\ddot'
             return math_data, None
-        if re.match('<m:chr m:val="(\u20DB)"/>', xl):
+        if tag == 'm:chr' and re.match('<m:chr m:val="(\u20DB)"/>', xl):
             md_cur.chars += '\\dddot'
             return math_data, None
         # FRACTION, BINOMIAL
@@ -3824,12 +3941,14 @@ class MathDatum:
         if xl == '<m:d>':
             md_cur.chars += '(<()>'
             return math_data, None
-        if re.match('^<m:begChr m:val="(.?)"/>$', xl):
+        if tag == 'm:begChr' and \
+           re.match('^<m:begChr m:val="(.?)"/>$', xl):
             bc = re.sub('^<m:begChr m:val="(.?)"/>$', '\\1', xl)
             md_cur.chars = re.sub('\\(<(.)(.?)>$', '(<' + bc + '\\2>',
                                   md_cur.chars)
             return math_data, None
-        if re.match('<m:endChr m:val="(.?)"/>', xl):
+        if tag == 'm:endChr' and \
+           re.match('<m:endChr m:val="(.?)"/>', xl):
             ec = re.sub('^<m:endChr m:val="(.?)"/>$', '\\1', xl)
             md_cur.chars = re.sub('\\(<(.?)(.)>$', '(<\\g<1>' + ec + '>',
                                   md_cur.chars)
@@ -3908,10 +4027,10 @@ class MathDatum:
             for t in tlist:
                 beg_fr = '^(.*)' + t[0] + '({)\\\\Xbegin{matrix}(.*)$'
                 beg_to = '\\1\\2\\\\Xbegin{' + t[2] + 'matrix}\\3'
-                math_str = re.sub(beg_fr, beg_to, math_str)
+                math_str = Re.sub(beg_fr, beg_to, math_str)
                 end_fr = '^(.*)\\\\Xend{matrix}(})' + t[1] + '(.*)$'
                 end_to = '\\1\\\\Xend{' + t[2] + 'matrix}\\2\\3'
-                math_str = re.sub(end_fr, end_to, math_str)
+                math_str = Re.sub(end_fr, end_to, math_str)
         # SHAPE CELL
         res = '^(.*?){' + \
             '\\\\Xbegin({.?matrix})(.*?)\\\\Xend({.?matrix})' + \
@@ -3943,37 +4062,35 @@ class MathDatum:
     @staticmethod
     def shift_paren(com, cnt, res, math_str):
         res_com = NOT_ESCAPED + '(' + com + ')(}+)$'
+        res_com_braces = '(?:' + com + ')(}+)'
         tmp = ''
         while tmp != math_str:
             tmp = math_str
-            tj = -1
-            for j in range(len(math_str)):
-                if re.match(res_com, math_str[:j]) and math_str[j] != '}':
-                    tj = j
-                    break
+            tj = MathDatum.__find_com_and_braces(res_com_braces, math_str)
             if tj == -1:
                 break
             tk = -1
-            dep = []
+            zeros = 0
             d = 0
             for k in range(tj, len(math_str)):
                 if math_str[k] == '{':
                     d += 1
                 if math_str[k] == '}':
                     d -= 1
-                dep.append(d)
-                if cnt == -1 and re.match(res, math_str[tj:k]):
+                if d == 0:
+                    zeros += 1
+                if cnt == -1 and Re.match(res, math_str[tj:k]):
                     tk = k
                     break
-                if dep.count(0) == cnt and re.match(res, math_str[tj:k]):
+                if zeros == cnt and Re.match(res, math_str[tj:k]):
                     tk = k
                     break
             if tk == -1:
                 break
             pre_bpa_fds_com_epa = math_str[:tj]
-            pre_bpa_fds = re.sub(res_com, '\\1', pre_bpa_fds_com_epa)
-            com = re.sub(res_com, '\\2', pre_bpa_fds_com_epa)
-            epa = re.sub(res_com, '\\3', pre_bpa_fds_com_epa)
+            pre_bpa_fds = Re.sub(res_com, '\\1', pre_bpa_fds_com_epa)
+            com = Re.sub(res_com, '\\2', pre_bpa_fds_com_epa)
+            epa = Re.sub(res_com, '\\3', pre_bpa_fds_com_epa)
             arg = math_str[tj:tk]
             pos = math_str[tk:]
             ti = -1
@@ -3993,41 +4110,45 @@ class MathDatum:
             while re.match(r, bpa_fds):
                 f = re.sub(r, '\\2', bpa_fds)
                 f = '\\' + re.sub('{[^{}]*}', '{[^{}]*}', f)
-                arg = re.sub(f, '', arg)
+                arg = Re.sub(f, '', arg)
                 bpa_fds = re.sub(r, '\\1\\3', bpa_fds)
             math_str = pre_bpa_fds + com + arg + epa + pos
         return math_str
 
+    @staticmethod
+    def __find_com_and_braces(res_com_braces, math_str):
+        # THE FIRST "j" WHERE "NOT_ESCAPED + '(com)(}+)$'" MATCHES
+        # "math_str[:j]" AND "math_str[j]" IS NOT "}"
+        escaped = None
+        for m in Re.compile(res_com_braces).finditer(math_str):
+            j = m.end()
+            if j >= len(math_str):
+                break
+            if escaped is None:
+                escaped = Scanner.get_escaped(math_str)
+            if not escaped[m.start()]:
+                return j
+        return -1
+
     @staticmethod
     def cancel_multi_paren(math_str):
         # {{..}} -> {}
-        rm = []
-        for i in range(len(math_str) - 1):
-            if math_str[i] != '{' or math_str[i + 1] != '{':
-                continue
-            dep = [0]
-            d = 0
-            for j in range(i, len(math_str)):
-                if math_str[j] == '{':
-                    d += 1
-                if math_str[j] == '}':
-                    d -= 1
-                dep.append(d)
-                if d == 0:
-                    if math_str[j - 1] == '}' or math_str[j] == '}':
-                        dep.pop(0)
-                        dep.pop(0)
-                        dep.pop(-1)
-                        dep.pop(-1)
-                        if 1 not in dep:
-                            rm.append(i)
-                            rm.append(j)
-                    break
-        rm.sort()
-        rm.reverse()
-        u = list(math_str)
-        for r in rm:
-            u.pop(r)
+        # THE OUTER PAIR IS REMOVED IF THE INNER PAIR ENDS JUST BEFORE IT
+        pair = {}
+        stack = []
+        for i, c in enumerate(math_str):
+            if c == '{':
+                stack.append(i)
+            elif c == '}' and stack != []:
+                pair[stack.pop()] = i
+        rm = set()
+        for i in pair:
+            if i + 1 in pair and pair[i + 1] == pair[i] - 1:
+                rm.add(i)
+                rm.add(pair[i])
+        if len(rm) == 0:
+            return math_str
+        u = [c for i, c in enumerate(math_str) if i not in rm]
         math_str = ''.join(u)
         return math_str
 
@@ -4160,7 +4281,7 @@ class XML:
         xml_body = []
         is_in_body = False
         for xl in xml_lines:
-            if re.match('^</?' + tag_name + '( .*)?>$', xl):
+            if Re.match('^</?' + tag_name + '( .*)?>$', xl):
                 is_in_body = not is_in_body
                 continue
             if is_in_body:
@@ -4205,9 +4326,9 @@ class XML:
                 else:
                     # MOVE TO ABNORMAL STATE
                     xml_class = ''
-            elif re.match(res_class_tag, xl):
+            elif Re.match(res_class_tag, xl):
                 xml_depth += 1
-            elif re.match(res_end_tag, xl):
+            elif Re.match(res_end_tag, xl):
                 xml_depth -= 1
                 if xml_depth == 0:
                     # SAVE AND RESET
@@ -4225,12 +4346,19 @@ class XML:
             xml_depth = 0
         return xml_blocks
 
+    @staticmethod
+    def get_tag_name(tag):
+        # '<w:r w:rsidR="0">' -> 'w:r', '</w:r>' -> '/w:r', 'text' -> ''
+        if tag[:1] != '<' or tag[-1:] != '>':
+            return ''
+        return tag[1:-1].split(' ', 1)[0].rstrip('/')
+
     @staticmethod
     def get_value(tag_name, value_name, cur_value, tag):
-        if re.match('<' + tag_name + ' .+>', tag):
+        if Re.match('<' + tag_name + ' .+>', tag):
             res = '^.* ' + value_name + '=[\'"]([^\'"]*)[\'"].*$'
-            if re.match(res, tag):
-                new_value = re.sub(res, '\\1', tag)
+            if Re.match(res, tag):
+                new_value = Re.sub(res, '\\1', tag)
                 if type(cur_value) is int:
                     # INT
                     if re.match('^[-\\+]?[0-9]+$', new_value):
@@ -4262,10 +4390,10 @@ class XML:
 
     @staticmethod
     def count_values(tag_name, value_name, value_dict, tag):
-        if re.match('<' + tag_name + ' .+>', tag):
+        if Re.match('<' + tag_name + ' .+>', tag):
             res = '^.* ' + value_name + '=[\'"]([^\'"]*)[\'"].*$'
-            if re.match(res, tag):
-                value = re.sub(res, '\\1', tag)
+            if Re.match(res, tag):
+                value = Re.sub(res, '\\1', tag)
                 if value in value_dict:
                     value_dict[value] += 1
                 else:
@@ -4274,7 +4402,7 @@ class XML:
 
     @staticmethod
     def is_this_tag(tag_name, init_value, tag):
-        if re.match('<' + tag_name + '( .*)?/?>', tag):
+        if Re.match('<' + tag_name + '( .*)?/?>', tag):
             return True
         else:
             return init_value
@@ -4442,6 +4570,7 @@ class LineTruncation:
         @staticmethod
         def _get_parens(md_text):
             parens = []
+            last_left_parens = {}  # (paren code, depth) -> paren
             m = len(md_text) - 1
             for pos, cha in enumerate(md_text):
                 bef = md_text[pos - 1] if pos > 0 else ''
@@ -4450,15 +4579,13 @@ class LineTruncation:
                     p = LineTruncation.Paren(pos, cha, bef, aft)
                     p_cod = p.paren_code
                     p_dep = p.get_individual_depth()
+                    if p_cod > 0:
+                        last_left_parens[(p_cod, p_dep)] = p
                     if p_cod < 0:
-                        for q in parens[::-1]:
-                            q_cod = q.paren_code
-                            q_dep = q.get_individual_depth()
-                            if p_cod + q_cod == 0:
-                                if p_dep == q_dep:
-                                    p.partner = q.position
-                                    q.partner = p.position
-                                    break
+                        if (-p_cod, p_dep) in last_left_parens:
+                            q = last_left_parens[(-p_cod, p_dep)]
+                            p.partner = q.position
+                            q.partner = p.position
                     if p.is_inconsistent():
                         if len(parens) > 0:
                             for q in parens[::-1]:
@@ -4477,23 +4604,24 @@ class LineTruncation:
 
     @staticmethod
     def __save_one(phrases, res, tmp1):
-        m1 = re.sub(res, '\\1', tmp1)
-        m2 = re.sub(res, '\\2', tmp1)
+        m1 = Re.sub(res, '\\1', tmp1)
+        m2 = Re.sub(res, '\\2', tmp1)
         phrases.append(m1)
         return phrases, m2
 
     @staticmethod
     def __save_two(phrases, res, tmp1):
-        m1 = re.sub(res, '\\1', tmp1)
-        m2 = re.sub(res, '\\2', tmp1)
+        m1 = Re.sub(res, '\\1', tmp1)
+        m2 = Re.sub(res, '\\2', tmp1)
         phrases.append(m1)
         phrases.append(m2)
         return phrases, ''
 
     @staticmethod
     def __must_continue(res1, res2, tmp1, tmp2):
-        if re.match(NOT_ESCAPED + res1 + '$', tmp1):
-            if re.match('^' + res2 + '(?:.|\n)*$', tmp2):
+        # THE SHORT HEAD OF "tmp2" IS CHECKED BEFORE THE LONG "tmp1"
+        if Re.match('^' + res2, tmp2):
+            if Re.match(NOT_ESCAPED + res1 + '$', tmp1):
                 return True
         return False
 
@@ -4504,15 +4632,22 @@ class LineTruncation:
         tmp1 = ''
         closing_point = -1
         m = len(old_text) - 1
+        text = old_text + '\0'
+        wids = get_ideal_widths(old_text)
+        positioned_parens = {}
+        for p in parens:
+            positioned_parens[p.position] = p
         for i in range(len(old_text)):
             j = i + 1
-            c1 = (old_text + '\0')[i]
-            c2 = (old_text + '\0')[j]
+            c1 = text[i]
+            c2 = text[j]
             tmp1 += c1
-            tmp2 = (old_text + '\0')[j:]
+            tmp2 = text[j:]
+            # "...X$" NEEDS "X" IN THE LAST TWO ("$" CAN BE BEFORE "\n")
+            tail = tmp1[-2:]
             # FONT DECORATORS
             must_continue = False
-            if not must_continue:
+            if not must_continue and '`' in tail:
                 res = NOT_ESCAPED + '(`)$'
                 if re.match(res, tmp1):
                     # "`"
@@ -4522,10 +4657,12 @@ class LineTruncation:
                     must_continue = True
             if not must_continue:
                 for c in ['\\*', '\\-', '\\+', '>', '<', '~', '/']:
+                    if c[-1] not in tail:
+                        continue
                     res3 = NOT_ESCAPED + '(' + c * 3 + ')$'
                     res2 = NOT_ESCAPED + '(' + c * 2 + ')$'
                     res1 = NOT_ESCAPED + '(' + c * 1 + ')$'
-                    if re.match(res3, tmp1):
+                    if Re.match(res3, tmp1):
                         if c != '~' and c != '/':
                             # "***", "---", "+++", ">>>", "<<<"
                             phrases, m2 = cls.__save_one(phrases, res3, tmp1)
@@ -4533,7 +4670,7 @@ class LineTruncation:
                             tmp1 = ''
                             must_continue = True
                             break
-                    elif re.match(res2, tmp1):
+                    elif Re.match(res2, tmp1):
                         if c == '~' or c == '/':
                             # "~~", "//"
                             phrases, m2 = cls.__save_one(phrases, res2, tmp1)
@@ -4541,7 +4678,7 @@ class LineTruncation:
                             tmp1 = ''
                             must_continue = True
                             break
-                        elif re.match('^' + c, tmp2):
+                        elif Re.match('^' + c, tmp2):
                             must_continue = True
                             break
                         else:
@@ -4551,8 +4688,8 @@ class LineTruncation:
                             tmp1 = ''
                             must_continue = True
                             break
-                    elif re.match(res1, tmp1):
-                        if re.match('^' + c, tmp2):
+                    elif Re.match(res1, tmp1):
+                        if Re.match('^' + c, tmp2):
                             must_continue = True
                             break
                         elif c == '\\*':
@@ -4562,7 +4699,8 @@ class LineTruncation:
                             tmp1 = ''
                             must_continue = True
                             break
-            if not must_continue:
+            if not must_continue and \
+               ('@' in tmp1[-70:] or '^' in tmp1[-70:] or '_' in tmp1[-70:]):
                 for ress in [[NOT_ESCAPED + '(@[^@]{1,66}@)$',
                               NOT_ESCAPED + '@[^@]{,66}$',
                               '^([^@]{,66}@)'],
@@ -4575,14 +4713,14 @@ class LineTruncation:
                              [NOT_ESCAPED + '(_[\\$=\\.#\\-~\\+]{,4}_)$',
                               NOT_ESCAPED + '_[\\$=\\.#\\-~\\+]{,4}$',
                               '^[\\$=\\.#\\-~\\+]{,4}_']]:
-                    if re.match(ress[0], tmp1):
+                    if Re.match(ress[0], tmp1):
                         # @.+@, _.+_, ^.+^
                         phrases, m2 = cls.__save_one(phrases, ress[0], tmp1)
                         fds += m2
                         tmp1 = ''
                         must_continue = True
                         break
-                    elif re.match(ress[1], tmp1) and re.match(ress[2], tmp2):
+                    elif Re.match(ress[1], tmp1) and Re.match(ress[2], tmp2):
                         must_continue = True
                         break
             if (not must_continue) or (i == m):
@@ -4594,7 +4732,8 @@ class LineTruncation:
             # SPACE
             if re.match('^[ \t\u3000](?:.|\n)$', tmp2):
                 continue
-            if re.match('^(?:.|\n)*[\t\u3000]$', tmp1):
+            if ('\t' in tail or '\u3000' in tail) and \
+               re.match('^(?:.|\n)*[\t\u3000]$', tmp1):
                 continue
             # SUB OR SUP
             if re.match('^[_\\^]{[^{}]*}', tmp2):
@@ -4605,14 +4744,14 @@ class LineTruncation:
                 continue
             # LINE BREAK
             res = '^((?:.|\n)*)(\n)$'
-            if re.match(res, tmp1):
+            if '\n' in tail and re.match(res, tmp1):
                 phrases, tmp1 = cls.__save_one(phrases, res, tmp1)
                 phrases.append('<br>')
                 tmp1 = ''
                 continue
             # IMAGE
             res = NOT_ESCAPED + '(' + RES_IMAGE + ')$'
-            if re.match(res, tmp1):
+            if ')' in tail and re.match(res, tmp1):
                 phrases, tmp1 = cls.__save_two(phrases, res, tmp1)
                 continue
             if cls.__must_continue('!',
@@ -4632,12 +4771,13 @@ class LineTruncation:
                                    tmp1, tmp2):
                 continue  # ![....](.. + ..)
             # NUMBER
-            if re.match('^.*[0-9０-９]+[,\\.，．]$', tmp1):
+            if re.match('^[0-9０-９]', tmp2) and \
+               re.match('^.*[0-9０-９]+[,\\.，．]$', tmp1):
                 if re.match('^[0-9０-９]+.*$', tmp2):
                     continue
             # MATH
             res = NOT_ESCAPED + '(\\\\\\[)$'
-            if re.match(res, tmp1):
+            if '[' in tail and re.match(res, tmp1):
                 t, tex = old_text[j:], ''
                 res_tex = NOT_ESCAPED + '\\\\\\]((?:.|\n)*)'
                 if re.match(res_tex, t):
@@ -4649,7 +4789,7 @@ class LineTruncation:
                     phrases, tmp1 = cls.__save_two(phrases, res, tmp1)
                 continue
             res = NOT_ESCAPED + '(\\\\\\])$'
-            if re.match(res, tmp1):
+            if ']' in tail and re.match(res, tmp1):
                 t = old_text[:j]
                 res_tex = NOT_ESCAPED + '\\\\\\[((?:.|\n)*)'
                 while re.match(res_tex, t):
@@ -4665,11 +4805,11 @@ class LineTruncation:
                 continue
             # TRACK CHANGES
             res = NOT_ESCAPED + '([\\-\\+]>)$'
-            if re.match(res, tmp1):
+            if '>' in tail and re.match(res, tmp1):
                 phrases, tmp1 = cls.__save_two(phrases, res, tmp1)
                 continue
             res = NOT_ESCAPED + '(<[\\-\\+])$'
-            if re.match(res, tmp1):
+            if '<' in tail and re.match(res, tmp1):
                 phrases, tmp1 = cls.__save_two(phrases, res, tmp1)
                 continue
             if cls.__must_continue('[\\-\\+]', '>', tmp1, tmp2):
@@ -4679,10 +4819,8 @@ class LineTruncation:
             # PARENTHESES
             if cls.Paren.is_paren(c1):
                 par = None
-                for p in parens:
-                    if p.position == i:
-                        par = p
-                        break
+                if i in positioned_parens:
+                    par = positioned_parens[i]
                 if (par is not None) and (par.partner is not None):
                     t_not, t_par = cls.Paren.separate_parens(tmp1)
                     if par.paren_code > 0:
@@ -4690,7 +4828,10 @@ class LineTruncation:
                         b = par.position
                         e = par.partner
                         s = old_text[b:e + 1]
-                        w = get_ideal_width(s)
+                        if '\t' in s:
+                            w = get_ideal_width(s)
+                        else:
+                            w = wids[e + 1] - wids[b]
                         if closing_point < 0:
                             phrases.append(t_not)
                             if w <= int(MD_TEXT_WIDTH / 2):
@@ -4724,14 +4865,14 @@ class LineTruncation:
                 continue
             # PUNCTUATION
             res_pun = '[,\\.，、．。]'
-            if re.match('^(.|\n)*' + res_pun + '$', tmp1):
+            if re.match('^(.|\n)*' + res_pun + '$', tail):
                 if not re.match('^' + res_pun, tmp2) and \
                    not LineTruncation.Paren.is_right_paren(c2):
                     phrases.append(tmp1)
                     tmp1 = ''
                     continue
             # SPACE
-            if re.match('^(.|\n)* $', tmp1) and (not re.match('^ ', tmp1)):
+            if re.match('^(.|\n)* $', tail) and (not re.match('^ ', tmp1)):
                 if re.match('^@[^@]{1,66}$', tmp1):
                     continue  # font scale or name
                 phrases.append(tmp1)
@@ -4852,7 +4993,7 @@ class LineTruncation:
                     tmp = p
                     continue
             # FONT DECORATORS
-            if re.match('^' + RES_FONT_DECORATORS + '+$', p):
+            if Re.match('^' + RES_FONT_DECORATORS + '+$', p):
                 tex = __extend_tex(tmp)
                 tex = __extend_tex(p)
                 tmp = ''
@@ -4881,7 +5022,7 @@ class LineTruncation:
             # CONJUNCTIONS
             if re.match('^.*[,，、]$', tmp):
                 for c in CONJUNCTIONS:
-                    if re.match('^' + c + '[,，、]$', tmp):
+                    if Re.match('^' + c + '[,，、]$', tmp):
                         tex = __extend_tex(tmp)
                         tmp = ''
                         break
@@ -4906,12 +5047,13 @@ class LineTruncation:
             # CONCATENATE
             tmp += p
             # TOO LONG
-            while get_ideal_width(tmp) > md_text_width:
-                for i in range(len(tmp), -1, -1):
+            wids = get_ideal_widths(tmp)
+            while wids[-1] > md_text_width:
+                # THE LONGEST HEAD WHICH IS NOT TOO LONG
+                n = bisect.bisect_right(wids, md_text_width) - 1
+                for i in range(n, -1, -1):
                     s1 = tmp[:i]
                     s2 = tmp[i:]
-                    if get_ideal_width(s1) > md_text_width:
-                        continue
                     if re.match('^.*[０-９][，．]$', s1) and \
                        re.match('^[０-９].*$', s2):
                         continue
@@ -4927,7 +5069,7 @@ class LineTruncation:
                             tmp = s2
                             break
                 else:
-                    for i in range(len(tmp), -1, -1):
+                    for i in range(n, -1, -1):
                         s1 = tmp[:i]
                         s2 = tmp[i:]
                         # '\' +
@@ -4990,14 +5132,18 @@ class LineTruncation:
                         if re.match('^.*</?[0-9a-z]*$', s1) and \
                            re.match('^/?[0-9a-z]*>.*$', s2):
                             continue
-                        if get_ideal_width(s1) <= md_text_width:
-                            if s1 != '':
-                                tex += s1 + '\n'
-                                tmp = s2
-                                break
+                        if s1 != '':
+                            tex += s1 + '\n'
+                            tmp = s2
+                            break
                     else:
                         tex += tmp + '\n'
                         tmp = ''
+                if '\t' in tmp:
+                    wids = get_ideal_widths(tmp)
+                else:
+                    base = wids[-1 - len(tmp)]
+                    wids = [w - base for w in wids[-1 - len(tmp):]]
         if tmp != '':
             if is_in_deleted:
                 tex += '->' + tmp
@@ -5046,15 +5192,65 @@ class Document:
         self.paragraphs = None
 
     def get_raw_paragraphs(self, xml_lines):
-        raw_paragraphs = []
         xml_body = XML.get_body('w:body', xml_lines)
         xml_blocks = XML.get_blocks(xml_body)
-        for xb in xml_blocks:
-            rp = RawParagraph(xb)
-            raw_paragraphs.append(rp)
+        raw_paragraphs = self._parse_blocks(xml_blocks)
         # self.raw_paragraphs = raw_paragraphs
         return raw_paragraphs
 
+    @staticmethod
+    def _parse_blocks(blocks):
+        jobs = Form.jobs
+        # IMAGE FILE NAMES AND AUTO NUMBERS DEPEND ON THE PRECEDING BLOCKS
+        is_ordered = [Document._must_parse_in_order(b) for b in blocks]
+        n_parallel = is_ordered.count(False)
+        if jobs <= 1 or n_parallel < jobs * RAW_PARAGRAPHS_PER_JOB:
+            return [RawParagraph(b) for b in blocks]
+        # THE WORKERS ARE GIVEN THE CONFIGURATIONS (FOR "spawn")
+        state = Document._get_worker_state()
+        parallel_blocks = [b for b, o in zip(blocks, is_ordered) if not o]
+        chunksize = max(1, n_parallel // (jobs * 4))
+        number = RawParagraph.raw_paragraph_number
+        with multiprocessing.Pool(jobs, Document._set_worker_state,
+                                  (state,)) as pool:
+            result = pool.map_async(RawParagraph, parallel_blocks, chunksize)
+            # THE OTHERS ARE PARSED HERE IN ORDER WHILE THE WORKERS RUN
+            ordered = [RawParagraph(b) for b, o in zip(blocks, is_ordered)
+                       if o]
+            parallel = result.get()
+        ordered, parallel = iter(ordered), iter(parallel)
+        raw_paragraphs = [next(ordered) if o else next(parallel)
+                          for o in is_ordered]
+        for rp in raw_paragraphs:
+            number += 1
+            rp.raw_paragraph_number = number
+        RawParagraph.raw_paragraph_number = number
+        return raw_paragraphs
+
+    @staticmethod
+    def _must_parse_in_order(block):
+        for xl in block:
+            if xl == '</w:numPr>' or \
+               xl.startswith('<v:imagedata ') or xl.startswith('<a:blip '):
+                return True
+        return False
+
+    @staticmethod
+    def _get_worker_state():
+        form_state = {}
+        for name in vars(Form):
+            value = getattr(Form, name)
+            if not re.match('^_', name) and not callable(value):
+                form_state[name] = value
+        return form_state, IO.media_dir
+
+    @staticmethod
+    def _set_worker_state(state):
+        form_state, media_dir = state
+        for name in form_state:
+            setattr(Form, name, form_state[name])
+        IO.media_dir = media_dir
+
     def get_paragraphs(self, raw_paragraphs):
         paragraphs = []
         for rp in raw_paragraphs:
@@ -5095,6 +5291,9 @@ class Document:
         self.paragraphs = self._modpar_vertical_length()
         # ISOLATE FONT REVISERS
         self.paragraphs = self._modpar_isolate_revisers()
+        # RENEW TEXT TO WRITE WITH REVISERS (ONCE FOR EACH PARAGRAPH)
+        for p in self.paragraphs:
+            p.text_to_write_with_reviser = p._get_text_to_write_with_reviser()
         # RETURN
         return self.paragraphs
 
@@ -5121,8 +5320,8 @@ class Document:
                         p.md_text = mt
                         p.md_lines_text = p._get_md_lines_text(p.md_text)
                         p.text_to_write = p._get_text_to_write()
-                        p.text_to_write_with_reviser \
-                            = p._get_text_to_write_with_reviser()
+                        # p.text_to_write_with_reviser \
+                        #     = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_blank_paragraph_to_space_before(self):
@@ -5162,8 +5361,8 @@ class Document:
                 p.length_revisers = p._get_length_revisers(p.length_revi)
                 # p.md_lines_text = p._get_md_lines_text(p.md_text)
                 # p.text_to_write = p._get_text_to_write()
-                p.text_to_write_with_reviser \
-                    = p._get_text_to_write_with_reviser()
+                # p.text_to_write_with_reviser \
+                #     = p._get_text_to_write_with_reviser()
                 p_next.length_revi = p_next._get_length_revi()
                 p_next.length_revisers \
                     = p_next._get_length_revisers(p_next.length_revi)
@@ -5186,10 +5385,6 @@ class Document:
                         p_prev.tail_font_revisers.remove(tfr)
                         p_next.head_font_revisers.remove(hfr)
             p_prev = p_next
-        # REMAKE TEXT TO WRITE WITH REVISERS
-        for p_next in self.paragraphs:
-            p.text_to_write_with_reviser \
-                = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     # ARTICLE TITLE (MIMI=EAR)
@@ -5227,14 +5422,14 @@ class Document:
                 # p_prev.md_lines_text \
                 #     = p_prev._get_md_lines_text(p_prev.md_text)
                 # p_prev.text_to_write = p_prev._get_text_to_write()
-                p_prev.text_to_write_with_reviser \
-                    = p_prev._get_text_to_write_with_reviser()
+                # p_prev.text_to_write_with_reviser \
+                #     = p_prev._get_text_to_write_with_reviser()
                 p.length_revi = p._get_length_revi()
                 p.length_revisers = p._get_length_revisers(p.length_revi)
                 # p.md_lines_text = p._get_md_lines_text(p.md_text)
                 # p.text_to_write = p._get_text_to_write()
-                p.text_to_write_with_reviser \
-                    = p._get_text_to_write_with_reviser()
+                # p.text_to_write_with_reviser \
+                #     = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_section_space_before_and_after(self):
@@ -5318,15 +5513,15 @@ class Document:
                 # p_prev.md_lines_text \
                 #     = p_prev._get_md_lines_text(p_prev.md_text)
                 # p_prev.text_to_write = p_prev._get_text_to_write()
-                p_prev.text_to_write_with_reviser \
-                    = p_prev._get_text_to_write_with_reviser()
+                # p_prev.text_to_write_with_reviser \
+                #     = p_prev._get_text_to_write_with_reviser()
             if True:
                 p.length_revi = p._get_length_revi()
                 p.length_revisers = p._get_length_revisers(p.length_revi)
                 # p.md_lines_text = p._get_md_lines_text(p.md_text)
                 # p.text_to_write = p._get_text_to_write()
-                p.text_to_write_with_reviser \
-                    = p._get_text_to_write_with_reviser()
+                # p.text_to_write_with_reviser \
+                #     = p._get_text_to_write_with_reviser()
             if p_next is not None:
                 p_next.length_revi = p_next._get_length_revi()
                 p_next.length_revisers \
@@ -5334,8 +5529,8 @@ class Document:
                 # p_next.md_lines_text \
                 #     = p_next._get_md_lines_text(p_next.md_text)
                 # p_next.text_to_write = p_next._get_text_to_write()
-                p_next.text_to_write_with_reviser \
-                    = p_next._get_text_to_write_with_reviser()
+                # p_next.text_to_write_with_reviser \
+                #     = p_next._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_spaced_and_centered(self):
@@ -5384,7 +5579,8 @@ class Document:
             p.length_revisers = p._get_length_revisers(p.length_revi)
             # p.md_lines_text = p._get_md_lines_text(p.md_text)
             # p.text_to_write = p._get_text_to_write()
-            p.text_to_write_with_reviser = p._get_text_to_write_with_reviser()
+            # p.text_to_write_with_reviser \
+            #     = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_length_reviser_to_depth_setter(self):
@@ -5396,21 +5592,23 @@ class Document:
         # |               ->  |段落
         # |               ->  |
         # self.paragraphs = self._modpar_spaced_and_centered()
+        # DEPTH SETTERS OF THE SENTENCES AFTER THE LAST SECTION
+        depth_setters = []
         for i, p in enumerate(self.paragraphs):
             if i == 0:
                 continue
-            p_prev = self.__get_prev_paragraph(self.paragraphs, i)
+            if i > 1:
+                p_tmp = self.paragraphs[i - 1]
+                if p_tmp.paragraph_class == 'section':
+                    depth_setters = []
+                elif p_tmp.paragraph_class == 'sentence':
+                    if re.match('^#+\n$', p_tmp.pre_text_to_write):
+                        depth_setters.append(p_tmp.pre_text_to_write)
             if p.paragraph_class != 'sentence':
                 continue
             is_in_reviser = False
-            for j in range(i - 1, 0, -1):
-                p_tmp = self.paragraphs[j]
-                if p_tmp.paragraph_class == 'section':
-                    break
-                if p_tmp.paragraph_class == 'sentence':
-                    if re.match('^#+\n$', p_tmp.pre_text_to_write):
-                        is_in_reviser = True
-                        break
+            if len(depth_setters) > 0:
+                is_in_reviser = True
             left_indent = int(p.length_revi['left indent'])
             if not is_in_reviser:
                 if p.length_revi['space before'] != 0.0 or \
@@ -5433,14 +5631,8 @@ class Document:
             p.length_clas['left indent'] = p.head_section_depth
             p.pre_text_to_write = '#' * p.head_section_depth + ' \n'
             # REMOVE SAME AS BEFORE
-            for j in range(i - 1, 0, -1):
-                p_tmp = self.paragraphs[j]
-                if p_tmp.paragraph_class == 'section':
-                    break
-                if p_tmp.paragraph_class == 'sentence':
-                    if re.match('^#+\n$', p_tmp.pre_text_to_write):
-                        if p.pre_text_to_write == p_tmp.pre_text_to_write:
-                            p.pre_text_to_write = ''
+            if p.pre_text_to_write in depth_setters:
+                p.pre_text_to_write = ''
             # RENEW
             p.length_clas = p._get_length_clas()
             # p.length_conf = p._get_length_conf()
@@ -5450,7 +5642,8 @@ class Document:
             # ParagraphList.reset_states(p.paragraph_class)
             # p.md_lines_text = p._get_md_lines_text(p.md_text)
             # p.text_to_write = p._get_text_to_write()
-            p.text_to_write_with_reviser = p._get_text_to_write_with_reviser()
+            # p.text_to_write_with_reviser \
+            #     = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_one_line_paragraph(self):
@@ -5475,14 +5668,14 @@ class Document:
                     p.length_revisers = p._get_length_revisers(p.length_revi)
                     p.md_lines_text = p._get_md_lines_text(p.md_text)
                     # p.text_to_write = p._get_text_to_write()
-                    p.text_to_write_with_reviser \
-                        = p._get_text_to_write_with_reviser()
+                    # p.text_to_write_with_reviser \
+                    #     = p._get_text_to_write_with_reviser()
                 continue
             rt = p.raw_text
             for fd in FONT_DECORATORS:
                 res = NOT_ESCAPED + fd
-                while re.match(res, rt):
-                    rt = re.sub(res, '\\1', rt)
+                while Re.match(res, rt):
+                    rt = Re.sub(res, '\\1', rt)
             while re.match(NOT_ESCAPED + '\\\\', rt):
                 rt = re.sub(NOT_ESCAPED + '\\\\', '\\1', rt)
             unit = 12 * 2.54 / 72 / 2
@@ -5510,7 +5703,8 @@ class Document:
             p.length_revisers = p._get_length_revisers(p.length_revi)
             # p.md_lines_text = p._get_md_lines_text(p.md_text)
             # p.text_to_write = p._get_text_to_write()
-            p.text_to_write_with_reviser = p._get_text_to_write_with_reviser()
+            # p.text_to_write_with_reviser \
+            #     = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_cancel_first_indent(self):
@@ -5541,7 +5735,8 @@ class Document:
             p.length_revisers = p._get_length_revisers(p.length_revi)
             # p.md_lines_text = p._get_md_lines_text(p.md_text)
             p.text_to_write = p._get_text_to_write()
-            p.text_to_write_with_reviser = p._get_text_to_write_with_reviser()
+            # p.text_to_write_with_reviser \
+            #     = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_vertical_length(self):
@@ -5587,8 +5782,8 @@ class Document:
                         if lr in p.length_revisers:
                             p.length_revisers.remove(lr)
             # RENEW
-            p.text_to_write_with_reviser \
-                = p._get_text_to_write_with_reviser()
+            # p.text_to_write_with_reviser \
+            #     = p._get_text_to_write_with_reviser()
         return self.paragraphs
 
     def _modpar_isolate_revisers(self):
@@ -5629,11 +5824,11 @@ class Document:
                         efr = FontDecorator.escape_chars(hfr)
                         curr_ttw = p_curr.text_to_write
                         if ((hfr in curr_hfr) and (tfr in curr_tfr)) or \
-                           (not re.match(NOT_ESCAPED + efr, curr_ttw)):
+                           (not Re.match(NOT_ESCAPED + efr, curr_ttw)):
                             next_ttw = p_next.text_to_write
                             efr = FontDecorator.escape_chars(tfr)
                             if ((hfr in next_hfr) and (tfr in next_tfr)) or \
-                               (not re.match(NOT_ESCAPED + efr, next_ttw)):
+                               (not Re.match(NOT_ESCAPED + efr, next_ttw)):
                                 p_curr.tail_font_revisers.remove(tfr)
                                 p_next.head_font_revisers.remove(hfr)
             # ISOLATE HEAD FONT REVISERS
@@ -5644,7 +5839,7 @@ class Document:
                     efr = FontDecorator.escape_chars(tfr)
                     ttw = self.__erase_font_decorator(tfr, p.text_to_write)
                     if (tfr in curr_tfr) or \
-                       (not re.match(NOT_ESCAPED + efr, ttw)):
+                       (not Re.match(NOT_ESCAPED + efr, ttw)):
                         if tfr not in p.tail_font_revisers:
                             pttw += hfr
                             p.head_font_revisers.remove(hfr)
@@ -5660,7 +5855,7 @@ class Document:
                     efr = FontDecorator.escape_chars(hfr)
                     ttw = self.__erase_font_decorator(hfr, p.text_to_write)
                     if (hfr in curr_hfr) or \
-                       (not re.match(NOT_ESCAPED + efr, ttw)):
+                       (not Re.match(NOT_ESCAPED + efr, ttw)):
                         if hfr not in p.head_font_revisers:
                             pttw += tfr
                             p.tail_font_revisers.remove(tfr)
@@ -5669,55 +5864,40 @@ class Document:
                     = re.sub('^\n', ' ', p.post_text_to_write)
                 p.post_text_to_write += '\n' + pttw
             # RENEW
-            if True:
-                p_curr.text_to_write_with_reviser \
-                    = p_curr._get_text_to_write_with_reviser()
-            if p_next is not None:
-                p_next.text_to_write_with_reviser \
-                    = p_next._get_text_to_write_with_reviser()
+            # if True:
+            #     p_curr.text_to_write_with_reviser \
+            #         = p_curr._get_text_to_write_with_reviser()
+            # if p_next is not None:
+            #     p_next.text_to_write_with_reviser \
+            #         = p_next._get_text_to_write_with_reviser()
         return self.paragraphs
 
     @staticmethod
     def __erase_font_decorator(fd: str, text: str) -> str:
         if fd == '*':
-            while re.match(NOT_ESCAPED + '\\*\\*', text):
-                text = re.sub(NOT_ESCAPED + '\\*\\*', '\\1X', text)
+            text = Scanner(text).replace('**', 'X')
         elif fd == '--':
-            while re.match(NOT_ESCAPED + '<\\-', text):
-                text = re.sub(NOT_ESCAPED + '<\\-', '\\1X', text)
-            while re.match(NOT_ESCAPED + '\\-\\-\\-', text):
-                text = re.sub(NOT_ESCAPED + '\\-\\-\\-', '\\1X', text)
+            text = Scanner(text).replace('<-', 'X')
+            text = Scanner(text).replace('---', 'X')
         elif fd == '++':
-            while re.match(NOT_ESCAPED + '<\\+', text):
-                text = re.sub(NOT_ESCAPED + '<\\+', '\\1X', text)
-            while re.match(NOT_ESCAPED + '\\+\\+\\+', text):
-                text = re.sub(NOT_ESCAPED + '\\+\\+\\+', '\\1X', text)
+            text = Scanner(text).replace('<+', 'X')
+            text = Scanner(text).replace('+++', 'X')
         elif fd == '>>':
-            while re.match(NOT_ESCAPED + '>>>', text):
-                text = re.sub(NOT_ESCAPED + '>>>', '\\1X', text)
+            text = Scanner(text).replace('>>>', 'X')
         elif fd == '<<':
-            while re.match(NOT_ESCAPED + '<<<', text):
-                text = re.sub(NOT_ESCAPED + '<<<', '\\1X', text)
+            text = Scanner(text).replace('<<<', 'X')
         elif fd == '->':
-            while re.match(NOT_ESCAPED + '\\-\\-\\-', text):
-                text = re.sub(NOT_ESCAPED + '\\-\\-\\-', '\\1X', text)
-            while re.match(NOT_ESCAPED + '\\-\\-', text):
-                text = re.sub(NOT_ESCAPED + '\\-\\-', '\\1X', text)
+            text = Scanner(text).replace('---', 'X')
+            text = Scanner(text).replace('--', 'X')
         elif fd == '<-':
-            while re.match(NOT_ESCAPED + '<<<', text):
-                text = re.sub(NOT_ESCAPED + '<<<', '\\1X', text)
-            while re.match(NOT_ESCAPED + '<<', text):
-                text = re.sub(NOT_ESCAPED + '<<', '\\1X', text)
+            text = Scanner(text).replace('<<<', 'X')
+            text = Scanner(text).replace('<<', 'X')
         elif fd == '+>':
-            while re.match(NOT_ESCAPED + '\\+\\+\\+', text):
-                text = re.sub(NOT_ESCAPED + '\\+\\+\\+', '\\1X', text)
-            while re.match(NOT_ESCAPED + '\\+\\+', text):
-                text = re.sub(NOT_ESCAPED + '\\+\\+', '\\1X', text)
+            text = Scanner(text).replace('+++', 'X')
+            text = Scanner(text).replace('++', 'X')
         elif fd == '<+':
-            while re.match(NOT_ESCAPED + '<<<', text):
-                text = re.sub(NOT_ESCAPED + '<<<', '\\1X', text)
-            while re.match(NOT_ESCAPED + '<<', text):
-                text = re.sub(NOT_ESCAPED + '<<', '\\1X', text)
+            text = Scanner(text).replace('<<<', 'X')
+            text = Scanner(text).replace('<<', 'X')
         return text
 
     @staticmethod
@@ -5741,36 +5921,63 @@ class Document:
         return None
 
     def get_document(self):
+        return ''.join(self.generate_document())
+
+    def generate_document(self):
+        paragraphs = self.paragraphs
         mcols = []
-        for p in self.paragraphs:
+        for p in paragraphs:
             if p.paragraph_class == 'multicolumns':
                 mcols.append(p.md_text)
-        dcmt = ''
+        # SINGLE COLUMN DOCUMENT
+        must_cut_head = False
+        if len(mcols) == 1:
+            if paragraphs[-1].paragraph_class == 'multicolumns':
+                must_cut_head = True
+        # "|-|" AND NEWLINES AT THE END ARE HELD UNTIL THE END
+        res_tail = '^(.*?)((?:\n|\\|(?:-+\\|)+)*(?:\\|(?:-+\\|)*-*)?)\\Z'
+        head = ''
+        tail = ''
+        for piece in self.__generate_pieces(mcols):
+            m = re.match(res_tail, tail + piece, re.DOTALL)
+            fixed, tail = m.group(1), m.group(2)
+            # THE HEAD IS HELD UNTIL IT IS FIXED
+            if must_cut_head:
+                head += fixed
+                if len(head) < 5:
+                    continue
+                if re.match('^\\|-\\|\n\n', head):
+                    head = re.sub('^\\|-\\|\n\n', '', head)
+                fixed, head, must_cut_head = head, '', False
+            if fixed != '':
+                yield fixed
+        dcmt = head + tail
+        res = '^((?:.|\n)*?\n\n\\|(?:-+\\|)+\n\n)((?:\\|(?:-+\\|)+\n\n)*)$'
+        if re.match(res, dcmt):
+            dcmt = re.sub(res, '\\1', dcmt)
+        dcmt = re.sub('\n+$', '\n', dcmt)
+        if must_cut_head:
+            if re.match('^\\|-\\|\n\n', dcmt):
+                dcmt = re.sub('^\\|-\\|\n\n', '', dcmt)
+        yield dcmt
+
+    def __generate_pieces(self, mcols):
         posi = 0
         if len(mcols) > 0:
             if self.paragraphs[0].paragraph_class != 'multicolumns':
                 # IF MULTICOLUMNS AT THE BEGINNIG OF THE DOCUMENT
-                dcmt += mcols[posi] + '\n\n'
+                yield mcols[posi] + '\n\n'
             posi += 1
         for p in self.paragraphs:
             if p.paragraph_class == 'multicolumns':
                 if posi < len(mcols):
-                    dcmt += mcols[posi] + '\n\n'
+                    yield mcols[posi] + '\n\n'
                     posi += 1
                 continue
-            dcmt += p.get_document()  # main process
+            dcmt = p.get_document()  # main process
             if p.paragraph_class != 'empty' and p.paragraph_class != 'remarks':
                 dcmt += '\n'
-        res = '^((?:.|\n)*?\n\n\\|(?:-+\\|)+\n\n)((?:\\|(?:-+\\|)+\n\n)*)$'
-        if re.match(res, dcmt):
-            dcmt = re.sub(res, '\\1', dcmt)
-        dcmt = re.sub('\n+$', '\n', dcmt)
-        # SINGLE COLUMN DOCUMENT
-        if len(mcols) == 1:
-            if self.paragraphs[-1].paragraph_class == 'multicolumns':
-                if re.match('^\\|-\\|\n\n', dcmt):
-                    dcmt = re.sub('^\\|-\\|\n\n', '', dcmt)
-        return dcmt
+            yield dcmt
 
     def get_images(self):
         return self.images
@@ -5988,20 +6195,27 @@ class RawParagraph:
         track_changes = ''  # ''|'del'|'ins'
         ruby = ''  # ''|'rub'|'bas'
         width = 100
+        math_data = None
         cd = CharsDatum([], '', [])
         for xl in xml_lines:
             # EMPTY
             if xl == '':
                 continue
+            # THE REGULAR EXPRESSIONS ARE TRIED ONLY FOR THE TAG NAME
+            tag = XML.get_tag_name(xl)
             # RPRCHANGE
-            if re.match('^<w:rPrChange( .*[^/])?>$', xl):
-                is_changed = True
-            if re.match('^</w:rPrChange( .*[^/])?>$', xl):
-                is_changed = False
+            if tag == 'w:rPrChange':
+                if re.match('^<w:rPrChange( .*[^/])?>$', xl):
+                    is_changed = True
+            elif tag == '/w:rPrChange':
+                if re.match('^</w:rPrChange( .*[^/])?>$', xl):
+                    is_changed = False
             if is_changed:
                 continue
             # FOR PAGE NUMBER
-            if re.match('^<w:fldChar w:fldCharType="begin"/?>$', xl):
+            if tag != 'w:fldChar':
+                pass
+            elif re.match('^<w:fldChar w:fldCharType="begin"/?>$', xl):
                 fldchar = 'begin'
             elif re.match('^<w:fldChar w:fldCharType="separate"/?>$', xl):
                 cd.reset_fds()
@@ -6011,18 +6225,20 @@ class RawParagraph:
             if fldchar == 'separate':
                 continue
             # MATH
-            if 'math_data' not in locals():
-                math_data = None
-            math_data, math_chars_datum \
-                = MathDatum.get_math_data(xl, math_data)
-            if math_chars_datum is not None:
-                chars_data.append(math_chars_datum)
-                math_chars_datum = None
-            if math_data is not None:
-                continue
+            if math_data is not None or tag == 'm:oMath' or \
+               tag == '/m:oMath':
+                math_data, math_chars_datum \
+                    = MathDatum.get_math_data(xl, math_data)
+                if math_chars_datum is not None:
+                    chars_data.append(math_chars_datum)
+                    math_chars_datum = None
+                if math_data is not None:
+                    continue
             # IMAGE
             must_continue = False
-            if re.match(RES_XML_IMG_MS, xl):
+            if tag not in ('v:imagedata', 'a:blip', 'pic:cNvPr', 'wp:extent'):
+                pass
+            elif re.match(RES_XML_IMG_MS, xl):
                 # IMAGE MS WORD
                 img_rel_name, img_file_name \
                     = cls.__get_img_file_names_ms(xl, img_rels)
@@ -6077,28 +6293,28 @@ class RawParagraph:
             if must_continue:
                 continue
             # TRACK CHANGES
-            if re.match('^<w:del( .*[^/])?>$', xl):
+            if tag == 'w:del' and re.match('^<w:del( .*[^/])?>$', xl):
                 track_changes = 'del'
                 continue
-            elif re.match('^</w:del( .*[^/])?>$', xl):
+            elif tag == '/w:del' and re.match('^</w:del( .*[^/])?>$', xl):
                 track_changes = ''
                 continue
-            elif re.match('^<w:ins( .*[^/])?>$', xl):
+            elif tag == 'w:ins' and re.match('^<w:ins( .*[^/])?>$', xl):
                 track_changes = 'ins'
                 continue
-            elif re.match('^</w:ins( .*[^/])?>$', xl):
+            elif tag == '/w:ins' and re.match('^</w:ins( .*[^/])?>$', xl):
                 track_changes = ''
                 continue
             # RUBY
-            if re.match('^<w:ruby>$', xl):
+            if xl == '<w:ruby>':
                 chars_data.append(CharsDatum([], '^<', []))
                 ruby = 'rub'
                 continue
-            elif re.match('^<w:rubyBase>$', xl):
+            elif xl == '<w:rubyBase>':
                 chars_data.append(CharsDatum([], '>/<', []))
                 ruby = 'bas'
                 continue
-            elif re.match('^</w:ruby>$', xl):
+            elif xl == '</w:ruby>':
                 chars_data.append(CharsDatum([], '>$', []))
                 ruby = ''
                 continue
@@ -6106,7 +6322,7 @@ class RawParagraph:
             if xl == '<w:rPr>':
                 cd.reset_fds()
             # FONT
-            if re.match('^<w:rFonts .*>$', xl):
+            if tag == 'w:rFonts' and re.match('^<w:rFonts .*>$', xl):
                 afnt = XML.get_value('w:rFonts', 'w:ascii', '', xl)
                 if re.match('^.* w:eastAsia=[\'"]([^\'"]*)[\'"].*$', xl):
                     jfnt = XML.get_value('w:rFonts', 'w:eastAsia', '', xl)
@@ -6140,8 +6356,11 @@ class RawParagraph:
                         cd.bk_fd_cls.font_name = '@' + font + '@'
                 continue
             # FONT SIZE AND SCALE
-            v = XML.get_value('w:sz', 'w:val', -1.0, xl)
-            v = XML.get_value('w:szCs', 'w:val', v, xl)  # (for complex script)
+            v = -1.0
+            if tag == 'w:sz' or tag == 'w:szCs':
+                v = XML.get_value('w:sz', 'w:val', v, xl)
+                # (FOR COMPLEX SCRIPT)
+                v = XML.get_value('w:szCs', 'w:val', v, xl)
             if v > 0:
                 s = round(v / 2, 1)
                 if s < Form.font_size * 0.4:     # changed from "0.5" to "0.4"
@@ -6170,7 +6389,9 @@ class RawParagraph:
                     cd.bk_fd_cls.font_scale = '@' + str(s) + '@'
                 continue
             # FONT WIDTH
-            w = XML.get_value('w:w', 'w:val', -1.0, xl)
+            w = -1.0
+            if tag == 'w:w':
+                w = XML.get_value('w:w', 'w:val', w, xl)
             if w > 0:
                 if w < 70:
                     cd.fr_fd_cls.font_width = '>>>'
@@ -6187,27 +6408,27 @@ class RawParagraph:
                 width = w
                 continue
             # ITALIC
-            if re.match('^<w:i/?>$', xl):
+            if xl == '<w:i>' or xl == '<w:i/>':
                 cd.fr_fd_cls.italic = '*'
                 cd.bk_fd_cls.italic = '*'
                 continue
             # BOLD
-            if re.match('^<w:b/?>$', xl):
+            if xl == '<w:b>' or xl == '<w:b/>':
                 cd.fr_fd_cls.bold = '**'
                 cd.bk_fd_cls.bold = '**'
                 continue
             # STRIKETHROUGH
-            if re.match('^<w:strike/?>$', xl):
+            if xl == '<w:strike>' or xl == '<w:strike/>':
                 cd.fr_fd_cls.strike = '~~'
                 cd.bk_fd_cls.strike = '~~'
                 continue
             # STRIKETHROUGH
-            if re.match('^<w:bdr( .*)?/?>$', xl):
+            if tag == 'w:bdr' and re.match('^<w:bdr( .*)?/?>$', xl):
                 cd.fr_fd_cls.strike = '[|'
                 cd.bk_fd_cls.strike = '|]'
                 continue
             # UNDERLINE
-            if re.match('^<w:u( .*)?>$', xl):
+            if tag == 'w:u' and re.match('^<w:u( .*)?>$', xl):
                 underline = ''
                 res = '^<.* w:val=[\'"]([a-zA-Z]+)[\'"].*>$'
                 if re.match(res, xl):
@@ -6218,7 +6439,8 @@ class RawParagraph:
                 cd.bk_fd_cls.underline = '_' + underline + '_'
                 continue
             # FONT COLOR
-            if re.match('^<w:color w:val="[0-9A-F]+"( .*)?/?>$', xl):
+            if tag == 'w:color' and \
+               re.match('^<w:color w:val="[0-9A-F]+"( .*)?/?>$', xl):
                 val = re.sub('^<.* w:val="([0-9A-F]+)".*>$', '\\1', xl, re.I)
                 val = val.upper()
                 if val == 'FFFFFF':
@@ -6232,7 +6454,8 @@ class RawParagraph:
                     cd.bk_fd_cls.font_color = '^' + font_color + '^'
                 continue
             # HIGHLIGHT COLOR
-            if re.match('^<w:highlight w:val="[a-zA-Z]+"( .*)?/?>$', xl):
+            if tag == 'w:highlight' and \
+               re.match('^<w:highlight w:val="[a-zA-Z]+"( .*)?/?>$', xl):
                 val = re.sub('^<.* w:val="([a-zA-Z]+)".*>$', '\\1', xl)
                 highlight = val
                 cd.fr_fd_cls.highlight_color = '_' + highlight + '_'
@@ -6254,13 +6477,13 @@ class RawParagraph:
             if xl == '<w:numPr>':
                 numid, ilvl = -1, -1
                 continue
-            elif re.match(res_number_ms, xl):
+            elif tag == 'w:numId' and re.match(res_number_ms, xl):
                 numid = re.sub(res_number_ms, '\\1', xl)
                 continue
-            elif re.match(res_number_lo, xl):
+            elif tag == 'w:pStyle' and re.match(res_number_lo, xl):
                 numid = re.sub(res_number_lo, '\\1', xl)
                 continue
-            elif re.match(res_ilvl, xl):
+            elif tag == 'w:ilvl' and re.match(res_ilvl, xl):
                 ilvl = re.sub(res_ilvl, '\\1', xl)
                 continue
             elif xl == '</w:numPr>':
@@ -6283,25 +6506,26 @@ class RawParagraph:
                     ans.state += 1
                 continue
             # FOOTNOTE
-            if re.match('^<w:footnoteReference( .*)>$', xl):
+            if tag == 'w:footnoteReference' and \
+               re.match('^<w:footnoteReference( .*)>$', xl):
                 _fnid = XML.get_value('w:footnoteReference', 'w:id', '', xl)
                 cd.chars += '[^' + _fnid + ']'
                 footnotes[_fnid] = Form.footnotes[_fnid]
             # TEXT
-            if not re.match('^<.*>$', xl):
+            if tag == '':
                 imm = CharsDatum.prepare_imm(fldchar, xl, type)
                 cd.chars = CharsDatum.concatenate_imm(cd.chars, imm)
                 continue
-            elif re.match('^<w:tab/?>$', xl):
+            elif xl == '<w:tab>' or xl == '<w:tab/>':
                 cd.chars += '\t'
                 continue
-            elif re.match('^<w:br/?>$', xl):
+            elif xl == '<w:br>' or xl == '<w:br/>':
                 cd.chars += '\n'
                 continue
             # RUN
-            if re.match('^<w:r( .*)?>$', xl):
+            if tag == 'w:r' and re.match('^<w:r( .*)?>$', xl):
                 continue
-            elif re.match('^</w:r>$', xl):
+            elif xl == '</w:r>':
                 if cd.chars != '':
                     if track_changes == 'del':
                         cd.fr_fd_cls.track_changes = '->'
@@ -6391,7 +6615,7 @@ class RawParagraph:
         img_id = re.sub(RES_XML_IMG_PY_ID, '\\1', xl)
         img_rel_name = img_rels[img_id]
         img_ext = re.sub('^.*\\.', '', img_rel_name)
-        img_base = re.sub('\\.' + img_ext + '$', '', img_py_name)
+        img_base = Re.sub('\\.' + img_ext + '$', '', img_py_name)
         img_base = re.sub('\\s', '_', img_base)
         i = 0
         while True:
@@ -6545,33 +6769,33 @@ class RawParagraph:
         raw_text = cls.__shrink_meaningless_font_decorations(raw_text)
         # RUBY
         res = '\\^<([^<>]{1,37})>/<([^<>]{1,37})>\\$'
-        raw_text = re.sub(res, '<\\2/\\1>', raw_text)
+        raw_text = Re.sub(res, '<\\2/\\1>', raw_text)
         # SPACE
         res = NOT_ESCAPED + '<((?:[0-9]*\\.)?[0-9]+)>' * 2 + '((?:.|\n)*)$'
-        while re.match(res, raw_text):
-            head_text = re.sub(res, '\\1', raw_text)
-            num1_text = re.sub(res, '\\2', raw_text)
-            num2_text = re.sub(res, '\\3', raw_text)
-            tail_text = re.sub(res, '\\4', raw_text)
+        while Re.match(res, raw_text):
+            head_text = Re.sub(res, '\\1', raw_text)
+            num1_text = Re.sub(res, '\\2', raw_text)
+            num2_text = Re.sub(res, '\\3', raw_text)
+            tail_text = Re.sub(res, '\\4', raw_text)
             numb_text = str(round(float(num1_text) + float(num2_text), 2))
             raw_text = head_text + '<' + numb_text + '>' + tail_text
         for i in range(1, 6):
             j = str(round(0.6 * i, 1))
             res = NOT_ESCAPED + '<<<<><' + j + '><>>>>' + '((?:.|\n)*)$'
-            while re.match(res, raw_text):
-                raw_text = re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
+            while Re.match(res, raw_text):
+                raw_text = Re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
             j = str(round(0.8 * i, 1))
             res = NOT_ESCAPED + '<<<><' + j + '><>>>' + '((?:.|\n)*)$'
-            while re.match(res, raw_text):
-                raw_text = re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
+            while Re.match(res, raw_text):
+                raw_text = Re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
             j = str(round(1.2 * i, 1))
             res = NOT_ESCAPED + '>><' + j + '><<' + '((?:.|\n)*)$'
-            while re.match(res, raw_text):
-                raw_text = re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
+            while Re.match(res, raw_text):
+                raw_text = Re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
             j = str(round(1.4 * i, 1))
             res = NOT_ESCAPED + '>>><' + j + '><<<' + '((?:.|\n)*)$'
-            while re.match(res, raw_text):
-                raw_text = re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
+            while Re.match(res, raw_text):
+                raw_text = Re.sub(res, '\\1' + '\u3000' * i + '\\2', raw_text)
         # self.raw_text = raw_text
         return raw_text
 
@@ -6600,16 +6824,16 @@ class RawParagraph:
         for c in raw_text:
             if in_to_erase:
                 raw_text_erase += c
-                if re.match(NOT_ESCAPED + end_erase + '$', raw_text_erase):
+                if Re.match(NOT_ESCAPED + end_erase + '$', raw_text_erase):
                     in_to_erase = False
-                raw_text_erase = re.sub(end_erase + '$', '', raw_text_erase)
+                raw_text_erase = Re.sub(end_erase + '$', '', raw_text_erase)
             else:
                 raw_text_leave += c
-                if re.match(NOT_ESCAPED + beg_erase + '$', raw_text_leave):
+                if Re.match(NOT_ESCAPED + beg_erase + '$', raw_text_leave):
                     in_to_erase = True
-                raw_text_leave = re.sub(beg_erase + '$', '', raw_text_leave)
-                raw_text_leave = re.sub(beg_leave + '$', '', raw_text_leave)
-                raw_text_leave = re.sub(end_leave + '$', '', raw_text_leave)
+                raw_text_leave = Re.sub(beg_erase + '$', '', raw_text_leave)
+                raw_text_leave = Re.sub(beg_leave + '$', '', raw_text_leave)
+                raw_text_leave = Re.sub(end_leave + '$', '', raw_text_leave)
         return raw_text_leave
 
     @classmethod
@@ -6658,10 +6882,12 @@ class RawParagraph:
         if re.match('^\\|((.|\n)*)\\|$', raw_text):
             raw_text = re.sub('^\\|((.|\n)*)\\|$', '\\\\|\\1\\\\|', raw_text)
         # IMAGE
-        if re.match('(.|\n)*(' + RES_IMAGE + ')', raw_text):
-            raw_text = re.sub('(' + RES_IMAGE + ')', '\\\\\\1', raw_text)
-        if re.match('(.|\n)*<>\\\\(' + RES_IMAGE + ')', raw_text):
-            raw_text = re.sub('<>\\\\(' + RES_IMAGE + ')', '\\1', raw_text)
+        if '!' in raw_text:
+            if re.match('(.|\n)*(' + RES_IMAGE + ')', raw_text):
+                raw_text = re.sub('(' + RES_IMAGE + ')', '\\\\\\1', raw_text)
+            if re.match('(.|\n)*<>\\\\(' + RES_IMAGE + ')', raw_text):
+                raw_text = re.sub('<>\\\\(' + RES_IMAGE + ')', '\\1',
+                                  raw_text)
         # ALIGNMENT
         res = '^:(\\s*(.|\n)*\\s*):$'
         if re.match(res, raw_text):
@@ -6687,26 +6913,26 @@ class RawParagraph:
     def __convert_ivs(raw_text):
         ivs_font = Form.ivs_font
         res = '^(.*[^\\\\0-9])([0-9]+);'
-        while re.match(res, raw_text, flags=re.DOTALL):
-            raw_text = re.sub(res, '\\1\\\\\\2;', raw_text, flags=re.DOTALL)
+        while Re.match(res, raw_text, flags=re.DOTALL):
+            raw_text = Re.sub(res, '\\1\\\\\\2;', raw_text, flags=re.DOTALL)
         ivs_beg = int('0xE0100', 16)
         ivs_end = int('0xE01EF', 16)
         #
         res = '^(.*)(@' + ivs_font + '@)' + \
             '(.[' + chr(ivs_beg) + '-' + chr(ivs_end) + '])' + \
             '(.*)$'
-        while re.match(res, raw_text):
-            raw_text = re.sub(res, '\\1\\3\\2\\4', raw_text)
+        while Re.match(res, raw_text):
+            raw_text = Re.sub(res, '\\1\\3\\2\\4', raw_text)
         #
         res = '@' + ivs_font + '@@' + ivs_font + '@'
-        raw_text = re.sub(res, '', raw_text)
+        raw_text = Re.sub(res, '', raw_text)
         #
         res = '^(.*)(.)([' + chr(ivs_beg) + '-' + chr(ivs_end) + '])(.*)$'
-        while re.match(res, raw_text, flags=re.DOTALL):
-            t1 = re.sub(res, '\\1', raw_text, flags=re.DOTALL)
-            t2 = re.sub(res, '\\2', raw_text, flags=re.DOTALL)
-            t3 = re.sub(res, '\\3', raw_text, flags=re.DOTALL)
-            t4 = re.sub(res, '\\4', raw_text, flags=re.DOTALL)
+        while Re.match(res, raw_text, flags=re.DOTALL):
+            t1 = Re.sub(res, '\\1', raw_text, flags=re.DOTALL)
+            t2 = Re.sub(res, '\\2', raw_text, flags=re.DOTALL)
+            t3 = Re.sub(res, '\\3', raw_text, flags=re.DOTALL)
+            t4 = Re.sub(res, '\\4', raw_text, flags=re.DOTALL)
             ivs_n = ord(t3) - ivs_beg
             raw_text = t1 + t2 + str(ivs_n) + ';' + t4
         return raw_text
@@ -6726,9 +6952,9 @@ class RawParagraph:
             tmp_text = raw_text
             for fd in FONT_DECORATORS_INVISIBLE:
                 res = '((?:\\s|' + '|'.join(FONT_DECORATORS_VISIBLE) + ')+)'
-                raw_text = re.sub(fd + res + fd, '\\1', raw_text)
-                raw_text = re.sub('^(' + fd + ')' + res, '\\2\\1', raw_text)
-                raw_text = re.sub(res + '(' + fd + ')$', '\\2\\1', raw_text)
+                raw_text = Re.sub(fd + res + fd, '\\1', raw_text)
+                raw_text = Re.sub('^(' + fd + ')' + res, '\\2\\1', raw_text)
+                raw_text = Re.sub(res + '(' + fd + ')$', '\\2\\1', raw_text)
         return raw_text
 
     @staticmethod
@@ -6751,17 +6977,17 @@ class RawParagraph:
                 else:
                     space += re.sub(res_sp, '\\1', right)
                 right = re.sub(res_sp, '\\2', right)
-            elif re.match(res_db, right):
-                left += re.sub(res_db, '\\1', right)
-                right = re.sub(res_db, '\\2', right)
+            elif Re.match(res_db, right):
+                left += Re.sub(res_db, '\\1', right)
+                right = Re.sub(res_db, '\\2', right)
                 is_in_comment = True
-            elif re.match(res_de, right):
-                left += re.sub(res_de, '\\1', right)
-                right = re.sub(res_de, '\\2', right)
+            elif Re.match(res_de, right):
+                left += Re.sub(res_de, '\\1', right)
+                right = Re.sub(res_de, '\\2', right)
                 is_in_comment = False
-            elif re.match(res_ix, right):
-                left += re.sub(res_ix, '\\1', right)
-                right = re.sub(res_ix, '\\2', right)
+            elif Re.match(res_ix, right):
+                left += Re.sub(res_ix, '\\1', right)
+                right = Re.sub(res_ix, '\\2', right)
             elif is_in_comment:
                 left += re.sub(res_ch, '\\1', right)
                 right = re.sub(res_ch, '\\2', right)
@@ -6771,8 +6997,8 @@ class RawParagraph:
             # JUST IN CASE
             if right == '':
                 level_to_break = 2
-        left = re.sub(del_beg + del_end, '', left)
-        left = re.sub(ins_beg + ins_end, '', left)
+        left = Re.sub(del_beg + del_end, '', left)
+        left = Re.sub(ins_beg + ins_end, '', left)
         return space, left + right
 
     @staticmethod
@@ -7039,9 +7265,9 @@ class Paragraph:
         while True:
             for fd in FONT_DECORATORS:
                 res = '^(' + fd + ')((?:.|\n)*)$'
-                if re.match(res, raw_text):
-                    t1 = re.sub(res, '\\1', raw_text)
-                    t2 = re.sub(res, '\\2', raw_text)
+                if Re.match(res, raw_text):
+                    t1 = Re.sub(res, '\\1', raw_text)
+                    t2 = Re.sub(res, '\\2', raw_text)
                     head_font_revisers.append(t1)
                     raw_text = t2
                     break
@@ -7050,9 +7276,9 @@ class Paragraph:
         while True:
             for fd in FONT_DECORATORS:
                 res = '^((?:.|\n)*)(' + fd + ')$'
-                if re.match(res, raw_text):
-                    t1 = re.sub(res, '\\1', raw_text)
-                    t2 = re.sub(res, '\\2', raw_text)
+                if Re.match(res, raw_text):
+                    t1 = Re.sub(res, '\\1', raw_text)
+                    t2 = Re.sub(res, '\\2', raw_text)
                     raw_text = t1
                     tail_font_revisers.append(t2)
                     break
@@ -7792,7 +8018,7 @@ class ParagraphChapter(Paragraph):
                 + RES_FONT_DECORATORS \
                 + cls.res_symbols[i] \
                 + cls.res_rest + '$'
-            if re.match(res, rp_rtx):
+            if Re.match(res, rp_rtx):
                 return True
         return False
 
@@ -7801,7 +8027,7 @@ class ParagraphChapter(Paragraph):
         rss = cls.res_symbols
         xdepth = 0
         for i, rs in enumerate(rss):
-            if re.match(rs, raw_text):
+            if Re.match(rs, raw_text):
                 xdepth = i
         proper_depth = xdepth + 1
         # self.proper_depth = proper_depth
@@ -7830,7 +8056,7 @@ class ParagraphChapter(Paragraph):
         head_symbol = ''
         for xdepth in range(len(rss)):
             res = '^' + rss[xdepth] + rre + '$'
-            if re.match(res, raw_text):
+            if Re.match(res, raw_text):
                 head_string, raw_text, state \
                     = self.__decompose_text(res, raw_text, -1, -1)
                 ydepth = len(state) - 1
@@ -7845,10 +8071,10 @@ class ParagraphChapter(Paragraph):
 
     @staticmethod
     def __decompose_text(res, raw_text, num1, num2):
-        hdstr = re.sub(res, '\\1', raw_text)
-        nmsym = re.sub(res, '\\2', raw_text)
-        branc = re.sub(res, '\\3', raw_text)
-        rtext = re.sub(res, '\\4', raw_text)
+        hdstr = Re.sub(res, '\\1', raw_text)
+        nmsym = Re.sub(res, '\\2', raw_text)
+        branc = Re.sub(res, '\\3', raw_text)
+        rtext = Re.sub(res, '\\4', raw_text)
         state = []
         for b in branc.split('の'):
             state.append(c2n_n_arab(b) - 1)
@@ -7928,13 +8154,13 @@ class ParagraphSection(Paragraph):
         tail_section_depth = 0
         for xdepth in range(1, len(rss)):
             res = '^(?:\\\\\\s+)?' + rfd + '\\s*' + rss[xdepth] + rre + '$'
-            if re.match(res, raw_text) and not re.match(rnm, raw_text):
+            if Re.match(res, raw_text) and not re.match(rnm, raw_text):
                 if head_section_depth == 0:
                     head_section_depth = xdepth + 1
                 tail_section_depth = xdepth + 1
         if head_section_depth == 0 and tail_section_depth == 0:
             res = '^(?:\\\\\\s+)?' + rfd + rss[0] + rfd + '$'
-            if re.match(res, raw_text):
+            if Re.match(res, raw_text):
                 head_section_depth = 1
                 tail_section_depth = 1
         if should_record:
@@ -7973,7 +8199,7 @@ class ParagraphSection(Paragraph):
                           '(\\1) ', raw_text)
         for xdepth in range(1, len(rss)):
             res = '^' + rss[xdepth] + rre + '$'
-            if re.match(res, raw_text) and not re.match(rnm, raw_text):
+            if Re.match(res, raw_text) and not re.match(rnm, raw_text):
                 if xdepth == 1:
                     beg_num = 1
                     end_num = 5
@@ -8027,10 +8253,10 @@ class ParagraphSection(Paragraph):
         nmsym_rep = '\\' + str(beg_num + 1)
         branc_rep = '\\' + str(beg_num + 2)
         rtext_rep = '\\' + str(beg_num + 3) + '\u3000\\' + str(end_num)
-        hdstr = re.sub(res, hdstr_rep, raw_text)
-        nmsym = re.sub(res, nmsym_rep, raw_text)
-        branc = re.sub(res, branc_rep, raw_text)
-        rtext = re.sub(res, rtext_rep, raw_text)
+        hdstr = Re.sub(res, hdstr_rep, raw_text)
+        nmsym = Re.sub(res, nmsym_rep, raw_text)
+        branc = Re.sub(res, branc_rep, raw_text)
+        rtext = Re.sub(res, rtext_rep, raw_text)
         # REVISE ⑴-⒇
         if re.match('^[⑴-⒇]', hdstr) and nmsym == '':
             nmsym = re.sub('^(.)(.|\n)*$', '\\1', hdstr)
@@ -8231,7 +8457,7 @@ class ParagraphList(Paragraph):
         proper_depth = 0
         for i in range(len(rss)):
             res = '^' + rfd + rss[i] + rre + '$'
-            if re.match(res, raw_text):
+            if Re.match(res, raw_text):
                 xdepth = i % 4
                 proper_depth = xdepth + 1
                 break
@@ -8248,11 +8474,11 @@ class ParagraphList(Paragraph):
         head_symbol = ''
         for i in range(len(rss)):
             res = '^' + rss[i] + rre + '$'
-            if re.match(res, raw_text):
+            if Re.match(res, raw_text):
                 xdepth = i % 4
                 if i < 4:
-                    head_string = re.sub(res, '\\1', raw_text)
-                    raw_text = re.sub(res, '\\4', raw_text)
+                    head_string = Re.sub(res, '\\1', raw_text)
+                    raw_text = Re.sub(res, '\\4', raw_text)
                     head_symbol = '  ' * xdepth + '- '
                 else:
                     head_string, raw_text, state \
@@ -8267,10 +8493,10 @@ class ParagraphList(Paragraph):
 
     @staticmethod
     def __decompose_text(res, raw_text, xdepth, num):
-        hdstr = re.sub(res, '\\1', raw_text)
-        nmsym = re.sub(res, '\\2', raw_text)
-        branc = re.sub(res, '\\3', raw_text)
-        rtext = re.sub(res, '\\4', raw_text)
+        hdstr = Re.sub(res, '\\1', raw_text)
+        nmsym = Re.sub(res, '\\2', raw_text)
+        branc = Re.sub(res, '\\3', raw_text)
+        rtext = Re.sub(res, '\\4', raw_text)
         if xdepth == 0:
             state = [c2n_c_arab(nmsym)]
         elif xdepth == 1:
@@ -8849,8 +9075,8 @@ class ParagraphTable(Paragraph):
             default_v_conf = ':' \
                 + '-' * round(BASIC_TABLE_CELL_HEIGHT - 0.5) \
                 + ':'
-            if re.match('^' + default_v_conf, v_conf_clm[i]):
-                v_conf_clm[i] = re.sub('^' + default_v_conf, '', v_conf_clm[i])
+            if Re.match('^' + default_v_conf, v_conf_clm[i]):
+                v_conf_clm[i] = Re.sub('^' + default_v_conf, '', v_conf_clm[i])
         # HORIZONTAL CONFIGURATIONS
         for j in range(num_clm):
             # ALIGNMENT AND LENGTH
@@ -9054,9 +9280,9 @@ class ParagraphMath(Paragraph):
         rp_rtx = rp.raw_text_doi
         rfd = RES_FONT_DECORATORS
         res = '^' + rfd + '\\\\\\[(.*)\\\\\\]' + rfd + '$'
-        if re.match('^' + rfd + '\\\\\\[.*$', rp_rtx):
-            if re.match(NOT_ESCAPED + '\\\\\\]' + rfd + '$', rp_rtx):
-                tmp = re.sub(res, '\\2', rp_rtx)
+        if Re.match('^' + rfd + '\\\\\\[.*$', rp_rtx):
+            if Re.match(NOT_ESCAPED + '\\\\\\]' + rfd + '$', rp_rtx):
+                tmp = Re.sub(res, '\\2', rp_rtx)
                 if not re.match(NOT_ESCAPED + '\\\\[\\[\\]].*$', tmp):
                     return True
         return False
@@ -9450,6 +9676,8 @@ class Docx2Md:
         comments_xml_lines = io.read_xml_file('/word/comments.xml')
         numbering_xml_lines = io.read_xml_file('/word/numbering.xml')
         footnotes_xml_lines = io.read_xml_file('/word/footnotes.xml')
+        document_xml_lines \
+            = Form.expand_compact_styles(document_xml_lines, styles_xml_lines)
         # CONFIGURE
         frm.document_xml_lines = document_xml_lines
         frm.core_xml_lines = core_xml_lines
@@ -9500,8 +9728,8 @@ class Docx2Md:
         io.open_md_file()
         cfgs = frm.get_configurations()
         io.write_md_file(cfgs)
-        dcmt = doc.get_document()
-        io.write_md_file(dcmt)
+        for dcmt in doc.generate_document():
+            io.write_md_file(dcmt)
         imgs = doc.get_images()
         io.save_images(imgs)
         io.close_md_file()
@@ -9674,6 +9902,14 @@ class Docx2Md:
     def get_has_completed():
         return Form.has_completed
 
+    @staticmethod
+    def set_jobs(value):
+        return Form.set_jobs(str(value))
+
+    @staticmethod
+    def get_jobs():
+        return Form.jobs
+
 
 ############################################################
 # MAIN
@@ -49,22 +49,20 @@ import shutil
 import argparse     # Python Software Foundation License
 import re
 import unicodedata
-import chardet      # GNU Lesser General Public License v2 or later (LGPLv2+)
 import datetime     # Zope Public License
 import zipfile
 import tempfile
+import hashlib
 import tkinter
-import tkinter.filedialog
-import tkinter.simpledialog
 import tkinter.messagebox
 import tkinter.font
 import importlib    # Python Software Foundation License
-import makdo.makdo_md2docx
-import makdo.makdo_docx2md
-import makdo.makdo_mddiff  # MDDIFF
-import openpyxl     # MIT License
+import importlib.util
+import makdo
 import webbrowser
 import threading
+import multiprocessing
+import time
 
 # To launch MS Word on Windows
 if sys.platform == 'win32':
@@ -73,6 +71,36 @@ if sys.platform == 'win32':
 if sys.platform != 'darwin':
     import tkinterdnd2  # MIT License
 
+
+def import_lazily(name):
+    # THE MODULE IS EXECUTED WHEN ITS ATTRIBUTE IS USED FOR THE FIRST TIME
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError('No module named \'' + name + '\'',
+                                  name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    if '.' in name:
+        parent, child = name.rsplit('.', 1)
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+openpyxl = import_lazily('openpyxl')  # MIT License
+import_lazily('tkinter.filedialog')
+import_lazily('tkinter.simpledialog')
+import_lazily('makdo.makdo_md2docx')
+import_lazily('makdo.makdo_docx2md')
+import_lazily('makdo.makdo_mddiff')  # MDDIFF
+from makdo.makdo_encoding import Encoding
+from makdo.makdo_scanner import Scanner
+from makdo.makdo_profile import StartupProfile
+
+
 if sys.platform == 'win32':
     CONFIG_DIR = os.getenv('APPDATA') + '\\makdo'
     CONFIG_FILE = CONFIG_DIR + '\\init.md'
@@ -5206,19 +5234,19 @@ class LineDatum:
                     beg = end                                           # 6.beg
                     continue
                 # PREFORMATTED
-                if c == '`' and re.match(NOT_ESCAPED + c + '$', s_lft):
+                if c == '`' and Scanner.endswith(s_lft, '`'):
                     iip = chars_state.is_in_preformatted
                     key = chars_state.get_key('')                       # 1.key
                     end = str(i + 1) + '.' + str(j)                     # 2.end
                     pane.tag_add(key, beg, end)                         # 3.tag
-                    if iip and not re.match(NOT_ESCAPED + '```$', s_lft):
+                    if iip and not Scanner.endswith(s_lft, '```'):
                         chars_state.toggle_is_in_preformatted()         # 4.set
                     # tmp = '`'                                         # 5.tmp
                     beg = end                                           # 6.beg
                     key = chars_state.get_key('font decorator')         # 1.key
                     end = str(i + 1) + '.' + str(j + 1)                 # 2.end
                     pane.tag_add(key, beg, end)                         # 3.tag
-                    if not iip and not re.match(NOT_ESCAPED + '```$', s_lft):
+                    if not iip and not Scanner.endswith(s_lft, '```'):
                         chars_state.toggle_is_in_preformatted()         # 4.set
                     tmp = ''                                            # 5.tmp
                     beg = end                                           # 6.beg
@@ -5226,29 +5254,29 @@ class LineDatum:
                 # SCRIPT PARENTHESIS (DISABLE ITALIC)
                 if c == '{':
                     if chars_state.script_parenthesis == '':
-                        if re.match(NOT_ESCAPED + '{[0-9]?{$', s_lft):
-                            par = re.sub('^(.*)({[0-9]?{)$', '\\2', s_lft)
+                        par = self._get_unescaped_tail(s_lft, '{[0-9]?{$')
+                        if par != '':
                             chars_state.set_or_unset_script_parenthesis(par)
                 elif c == '}':
                     if chars_state.script_parenthesis != '':
-                        if re.match(NOT_ESCAPED + '}[0-9]?}$', s_lft):
-                            par = re.sub('^(.*)(}[0-9]?})$', '\\2', s_lft)
+                        par = self._get_unescaped_tail(s_lft, '}[0-9]?}$')
+                        if par != '':
                             chars_state.set_or_unset_script_parenthesis(par)
                 # SCRIPT PARENTHESIS (DISABLE ITALIC AND PARENTHESIS)
                 if chars_state.script_parenthesis != '':
                     if c == '*' or c == '(' or c == ')':
                         continue
                 # ITALIC AND BOLD
-                if c == '*' and re.match(NOT_ESCAPED + '\\*$', s_lft) and \
-                   (c0 != '*' or re.match(NOT_ESCAPED + '\\*\\*\\*$', s_lft)):
+                if c == '*' and Scanner.endswith(s_lft, '*') and \
+                   (c0 != '*' or Scanner.endswith(s_lft, '***')):
                     # if chars_state.script_parenthesis == '':
                     iii = chars_state.is_in_italic
                     iib = chars_state.is_in_bold
-                    if re.match(NOT_ESCAPED + '\\*\\*\\*$', s_lft):
+                    if Scanner.endswith(s_lft, '***'):
                         n = 3
-                    elif re.match(NOT_ESCAPED + '\\*\\*$', s_lft):
+                    elif Scanner.endswith(s_lft, '**'):
                         n = 2
-                    elif re.match(NOT_ESCAPED + '\\*$', s_lft):
+                    elif Scanner.endswith(s_lft, '*'):
                         n = 1
                     key = chars_state.get_key('')                       # 1.key
                     end = str(i + 1) + '.' + str(j + 1 - n)             # 2.end
@@ -5563,7 +5591,7 @@ class LineDatum:
                 kws = []
                 kw = ''
                 for c in Makdo.keywords_to_paint + '|':
-                    if re.match(NOT_ESCAPED + '\\|$', kw + c):
+                    if Scanner.endswith(kw + c, '|'):
                         kws.append(kw)
                         kw = ''
                     else:
@@ -5612,6 +5640,18 @@ class LineDatum:
         self.end_chars_state = chars_state.copy()
         return
 
+    @staticmethod
+    def _get_unescaped_tail(s_lft, res_tail):
+        # SAME AS "re.sub('^(.*)(' + RES + ')$', '\\2', s_lft)"
+        # WHEN "re.match(NOT_ESCAPED + RES + '$', s_lft)" (3 CHARACTERS AT MOST)
+        tail = s_lft[-3:]
+        m = re.search(res_tail, tail)
+        if m is None:
+            return ''
+        if Scanner.is_escaped(s_lft, len(s_lft) - len(tail) + m.start()):
+            return ''
+        return m.group(0)
+
 
 ############################################################
 # MAKDO
@@ -5656,8 +5696,13 @@ class Makdo:
         self.file_path = self.args_input_file
         self.init_text = ''
         self.saved_text = ''
+        self.edit_count = 0
+        self.saved_edit_count = 0
+        self.saved_digest = hashlib.sha1(b'').hexdigest()
+        self.auto_saved = None  # (auto path, edit count)
         self.file_lines = []
         self.has_made_backup_file = False
+        self.docx_saving = None
         self.line_data = []
         self.clipboard_list = ['']
         self.key_history = ['' for i in range(21)]
@@ -6024,10 +6069,10 @@ class Makdo:
         return full
 
     @staticmethod
-    def _get_encoding(raw_data):
+    def _get_encoding(raw_data, file_path=None):
         encoding = 'SHIFT_JIS'
         if raw_data != '':
-            encoding = chardet.detect(raw_data)['encoding']
+            encoding = Encoding.detect(raw_data, file_path)
         if encoding is None:
             encoding = 'SHIFT_JIS'
         elif (re.match('^utf[-_]?.*$', encoding, re.I)) or \
@@ -6096,7 +6141,7 @@ class Makdo:
                 raw_data = f.read()
         except BaseException:
             return None
-        encoding = self._get_encoding(raw_data)
+        encoding = self._get_encoding(raw_data, file_path)
         try:
             document = self._decode_data(encoding, raw_data)
         except BaseException:
@@ -6773,7 +6818,7 @@ class Makdo:
         if self.exists_auto_file(file_path):
             self.file_path = ''
             self.init_text = ''
-            self.saved_text = ''
+            self._set_saved_text('')
             self.file_lines = []
             return
         if re.match('^(?:.|\n)+.docx$', file_path):
@@ -6785,10 +6830,11 @@ class Makdo:
             return
         self.file_path = file_path
         self.init_text = document
-        self.saved_text = document
         self.file_lines = document.split('\n')
         # self.txt.delete('1.0', 'end')
         self.txt.insert('1.0', document)
+        # AFTER "insert", WHICH COUNTS AS AN EDIT
+        self._set_saved_text(document)
         self.txt.focus_set()
         self.current_pane = 'txt'
         self.txt.mark_set('insert', '1.0')
@@ -6844,8 +6890,8 @@ class Makdo:
         self.remove_auto_file(self.file_path)
         self.file_path = None
         self.init_text = ''
-        self.saved_text = ''
         self.txt.delete('1.0', 'end')
+        self._set_saved_text('')
         self.win.title('MAKDO')
         self.set_file_name_on_status_bar('')
         # TABLE OF CONTENTS
@@ -6861,6 +6907,9 @@ class Makdo:
     # SAVE FILE
 
     def _has_edited(self, must_warn=True):
+        # NOT EDITED SINCE OPENED OR SAVED
+        if self._get_edit_count() == self.saved_edit_count:
+            return False
         file_text = self.txt.get('1.0', 'end-1c')
         file_text = self.get_fully_unfolded_document(file_text, must_warn)
         # REMOVED 24.11.13 >
@@ -6868,10 +6917,29 @@ class Makdo:
         #     if self.saved_text != file_text:
         #         return True
         # <
-        if file_text == self.saved_text:
+        # if file_text == self.saved_text:
+        #     return False
+        if hashlib.sha1(file_text.encode()).hexdigest() == self.saved_digest:
+            # EDITED BACK (UNDO, FOLDING AND SO ON)
+            self.saved_edit_count = self.edit_count
             return False
         return True
 
+    def _get_edit_count(self):
+        # THE FLAG IS SET AT ONCE, BUT "<<Modified>>" COMES LATER
+        if self.txt.edit_modified():
+            self.edit_count += 1
+            self.txt.edit_modified(False)
+        return self.edit_count
+
+    def _set_saved_text(self, saved_text, is_saved=True):
+        self.saved_text = saved_text
+        self.saved_digest = hashlib.sha1(saved_text.encode()).hexdigest()
+        if is_saved:
+            self.saved_edit_count = self._get_edit_count()
+        else:
+            self.saved_edit_count = None
+
     def _ask_to_save(self, message):
         tkinter.Tk().withdraw()
         n, m, d = '確認', message, 'yes'
@@ -6892,18 +6960,23 @@ class Makdo:
             #     file_path += '.md'
             self.file_path = file_path
             self._set_file_name(file_path)
-        # FILE
-        file_text = self.txt.get('1.0', 'end-1c')
-        if file_text != '' and file_text[-1] != '\n':
-            file_text += '\n'
-            self.txt.insert('end', '\n')
-            self._put_back_cursor_to_pane(self.txt)
+        # WAIT FOR THE CONVERSION OF ANOTHER FILE
+        if self.docx_saving is not None and \
+           self.docx_saving['docx_path'] != self.file_path:
+            self._wait_until_docx_file_is_saved()
+        # NOT EDITED (THE TEXT IS NOT COPIED)
         must_warn = True
         if re.match('^(.|\n)+.docx$', self.file_path):
             must_warn = False
         if not self._has_edited(must_warn):
             self.set_message_on_status_bar('保存済みです')
             return False
+        # FILE
+        file_text = self.txt.get('1.0', 'end-1c')
+        if file_text != '' and file_text[-1] != '\n':
+            file_text += '\n'
+            self.txt.insert('end', '\n')
+            self._put_back_cursor_to_pane(self.txt)
         self._stamp_config(file_text)
         file_text = self.txt.get('1.0', 'end-1c')
         file_text = self.get_fully_unfolded_document(file_text,
@@ -6923,9 +6996,12 @@ class Makdo:
                     r = tkinter.messagebox.askyesnocancel(n, m, default=d)
                     if (r is None) or (not r):
                         return False
+        # SUPERSEDE RUNNING CONVERSION
+        if self.docx_saving is not None:
+            self._cancel_saving_docx_file()
         # DOCX OR MD
         if re.match('^(?:.|\n)+.docx$', self.file_path):
-            md_path = self.temp_dir.name + '/doc.md'
+            md_path = self.temp_dir.name + '/save.md'
         else:
             md_path = self.file_path
         # SAVE MD FILE
@@ -6938,27 +7014,116 @@ class Makdo:
             return False
         # SAVE DOCX FILE
         if re.match('^(?:.|\n)+\\.docx$', self.file_path):
-            stderr = sys.stderr
-            sys.stderr = tempfile.TemporaryFile(mode='w+')
-            importlib.reload(makdo.makdo_md2docx)
-            try:
-                m2d = makdo.makdo_md2docx.Md2Docx(md_path)
-                m2d.save(self.file_path)
-            except BaseException:
-                pass
-            sys.stderr.seek(0)
-            msg = sys.stderr.read()
-            sys.stderr = stderr
-            if msg != '':
-                n = '警告'
-                tkinter.messagebox.showwarning(n, msg)
-                # return
+            self._start_saving_docx_file(md_path, self.file_path, file_text)
+            self.txt.edit_separator()
+            self._set_saved_text(file_text)
+            return True
         self.txt.edit_separator()
         self.set_message_on_status_bar('保存しました')
-        self.saved_text = file_text
+        self._set_saved_text(file_text)
         # RETURN
         return True
 
+    # SAVE DOCX FILE IN BACKGROUND
+
+    def _start_saving_docx_file(self, md_path, docx_path, file_text):
+        tmp_docx_path = self.temp_dir.name + '/save.docx'
+        if os.path.exists(tmp_docx_path):
+            os.remove(tmp_docx_path)
+        # A FRESH PROCESS INSTEAD OF "importlib.reload(makdo.makdo_md2docx)"
+        ctx = multiprocessing.get_context('spawn')
+        conn_r, conn_w = ctx.Pipe(False)
+        proc = ctx.Process(target=makdo.makdo_md2docx.save_in_worker,
+                           args=(md_path, tmp_docx_path, conn_w),
+                           daemon=True)
+        proc.start()
+        conn_w.close()
+        self.docx_saving = {'process': proc, 'conn': conn_r,
+                            'docx_path': docx_path,
+                            'tmp_docx_path': tmp_docx_path,
+                            'file_text': file_text,
+                            'start_time': time.time()}
+        self.set_message_on_status_bar('Wordファイルに変換しています')
+        self.win.after(100, self._check_saving_docx_file)
+
+    def _check_saving_docx_file(self):
+        ds = self.docx_saving
+        if ds is None:
+            return  # canceled
+        proc, conn = ds['process'], ds['conn']
+        if (not conn.poll()) and proc.is_alive():
+            sec = int(time.time() - ds['start_time'])
+            msg = 'Wordファイルに変換しています（' + str(sec) + '秒）'
+            self.set_message_on_status_bar(msg)
+            self.win.after(100, self._check_saving_docx_file)
+            return
+        try:
+            result = conn.recv()
+        except BaseException:
+            result = {'error': '変換処理が異常終了しました', 'warnings': []}
+        proc.join()
+        conn.close()
+        self.docx_saving = None
+        self._finish_saving_docx_file(ds, result)
+
+    def _finish_saving_docx_file(self, ds, result):
+        if result['error'] is None:
+            try:
+                shutil.move(ds['tmp_docx_path'], ds['docx_path'])
+            except BaseException as e:
+                result['error'] = str(e)
+        if result['error'] is not None:
+            if self.saved_text == ds['file_text']:
+                self._set_saved_text('', False)
+            self.set_message_on_status_bar('保存に失敗しました')
+            n = 'エラー'
+            m = 'ファイルの保存に失敗しました．\n\n' + result['error']
+            tkinter.messagebox.showerror(n, m)
+            return False
+        self.set_message_on_status_bar('保存しました')
+        msg = ''
+        for wm in result['warnings']:
+            msg += wm['message'] + '\n'
+            if wm['line_number'] is not None:
+                msg += '  (line ' + str(wm['line_number']) + ') ' \
+                    + wm['raw_text'] + '\n'
+            msg += '\n'
+        if msg != '':
+            n = '警告'
+            tkinter.messagebox.showwarning(n, msg)
+        return True
+
+    def _cancel_saving_docx_file(self):
+        ds = self.docx_saving
+        if ds is None:
+            return False
+        self.docx_saving = None
+        ds['process'].terminate()
+        ds['process'].join()
+        ds['conn'].close()
+        self.set_message_on_status_bar('変換を中止しました')
+        return True
+
+    def _wait_for_saving_docx_file(self, then=None):
+        # POLLS WITH "after" SO THAT THE WINDOW KEEPS RESPONDING
+        ds = self.docx_saving
+        if ds is not None and \
+           ds['process'].is_alive() and not ds['conn'].poll():
+            self.set_message_on_status_bar('Wordファイルへの変換を待っています')
+            self.win.after(100, self._wait_for_saving_docx_file, then)
+            return
+        if ds is not None:
+            self._check_saving_docx_file()
+        if then is not None:
+            then()
+
+    def _wait_until_docx_file_is_saved(self):
+        # "wait_variable" KEEPS THE WINDOW RESPONDING UNTIL IT IS SET
+        is_saved = tkinter.BooleanVar(self.win, False)
+        self._wait_for_saving_docx_file(lambda: is_saved.set(True))
+        if not is_saved.get():
+            self.win.wait_variable(is_saved)
+
     def _stamp_config(self, file_text):
         if not re.match('^\\s*<!--', file_text):
             return
@@ -7042,7 +7207,7 @@ class Makdo:
             file_path += extension
         self.remove_auto_file(self.file_path)
         self.file_path = file_path
-        self.saved_text = ''
+        self._set_saved_text('', False)
         self._set_file_name(file_path)
         self.save_file()
         return True
@@ -7099,19 +7264,26 @@ class Makdo:
 
     def save_auto_file(self, file_path):
         if file_path is not None and file_path != '':
-            new_text = self.txt.get('1.0', 'end-1c')
             auto_path = self.get_auto_path(file_path)
+            edit_count = self._get_edit_count()
+            # NOT EDITED SINCE THE LAST AUTO SAVE
+            if self.auto_saved == (auto_path, edit_count):
+                if os.path.exists(auto_path):
+                    return
+            new_text = self.txt.get('1.0', 'end-1c')
             if os.path.exists(auto_path):
                 with zipfile.ZipFile(auto_path, 'r') as old_zip:
                     with old_zip.open('doc.md', 'r') as f:
                         old_text = f.read()
                         if new_text == old_text.decode():
+                            self.auto_saved = (auto_path, edit_count)
                             return
             try:
                 with zipfile.ZipFile(auto_path, 'w',
                                      compression=zipfile.ZIP_DEFLATED,
                                      compresslevel=9) as new_zip:
                     new_zip.writestr('doc.md', new_text)
+                self.auto_saved = (auto_path, edit_count)
             except BaseException:
                 if 'must_show_auto_file_save_failed_message' not in vars(self):
                     n = 'エラー'
@@ -7454,6 +7626,9 @@ class Makdo:
         ans = self.close_file()
         if ans is None:
             return None
+        self._wait_for_saving_docx_file(self._exit_makdo)
+
+    def _exit_makdo(self):
         self.win.quit()
         self.win.destroy()
         sys.exit(0)
@@ -13815,7 +13990,7 @@ class Makdo:
             kws = []
             kw = ''
             for c in Makdo.keywords_to_paint + '|':
-                if re.match(NOT_ESCAPED + '\\|$', kw + c):
+                if Scanner.endswith(kw + c, '|'):
                     kw = kw.replace('\\|', '|')
                     kw = kw.replace('\\\\', '\\')
                     kws.append(kw)
@@ -14668,6 +14843,10 @@ class Makdo:
         self.txt.bind('<ButtonRelease-1>', self.txt_process_button1_release)
         self.txt.bind('<ButtonRelease-2>', self.txt_process_button2_release)
         self.txt.bind('<ButtonRelease-3>', self.txt_process_button3_release)
+        self.txt.bind('<<Modified>>', self.txt_process_modified)
+
+    def txt_process_modified(self, key):
+        self._get_edit_count()
 
     def _make_sub_key_configuration(self):
         self.sub.bind('<Key>', self.sub_process_key)
@@ -16265,6 +16444,8 @@ class Makdo:
             if 'keiji' not in vars(self):
                 import makdo.keiji  # keiji
                 self.keiji = makdo.keiji
+                # RECALCULATED FROM THE CHANGED ROW
+                self.keiji_history = self.keiji.TradeHistory()
 
         def insert_sample_trading_history(self) -> None:
             self._load_keiji()
@@ -16294,7 +16475,7 @@ class Makdo:
             end = '1.0+' + str(len(upper_text + lower_par)) + 'c'
             par = self.txt.get(beg, end)
             # CALCULATE
-            output = self.keiji.main(par)
+            output = self.keiji_history.calculate(par)
             # WRITE
             self.txt.edit_separator()
             self.txt.insert(end, '\n' + output)
@@ -16668,6 +16849,10 @@ class Makdo:
                 m = 'Llamaのモデルファイルが設定されていません．'
                 tkinter.messagebox.showerror(n, m)
                 return False
+            if 'llama_gpu_layers' not in vars(self):
+                self.llama_gpu_layers = 0
+            if 'llama_context_size' not in vars(self):
+                self.llama_context_size = 512
             # LOAD MODULE
             if 'llama_without_rag' in vars(self):
                 del self.llama_without_rag
@@ -16677,8 +16862,7 @@ class Makdo:
                     # pip install numpy
                     # pip install llama-index-llms-llama-cpp
                     from llama_index.llms.llama_cpp import LlamaCPP
-                    from llama_index.core \
-                        import SimpleDirectoryReader, VectorStoreIndex
+                    from llama_index.core import VectorStoreIndex
                     # pip install llama-index-embeddings-huggingface
                     from llama_index.embeddings.huggingface \
                         import HuggingFaceEmbedding
@@ -16691,27 +16875,17 @@ class Makdo:
                         + 'pip install llama_cpp_python'
                     tkinter.messagebox.showerror(n, m)
                     return False
-                if 'llama_cpp' not in vars(self):
-                    self.llama_cpp = LlamaCPP(
-                        model_path=self.llama_model_file,
-                        model_kwargs={
-                            'n_gpu_layers': self.llama_gpu_layers,
-                            'n_ctx': self.llama_context_size,
-                        }
-                    )
-                if 'llama_embed_model' not in vars(self):
-                    self.llama_embed_model = HuggingFaceEmbedding(
-                        model_name=self.embeded_model)
-                if 'llama_reader' not in vars(self):
-                    self.llama_reader = SimpleDirectoryReader(
-                        input_files=[self.llama_rag_file])
-                llama_rag_data = self.llama_reader.load_data()
-                index = VectorStoreIndex.from_documents(
-                    llama_rag_data, embed_model=self.llama_embed_model)
-                self.llama_with_rag \
-                    = index.as_query_engine(llm=self.llama_cpp,
-                                            streaming=False,
-                                            similarity_top_k=3)
+                if 'llama_rag_index' not in vars(self):
+                    from makdo.makdo_rag import RagIndex
+                    self.llama_rag_index \
+                        = RagIndex(self.llama_rag_file, self.embeded_model)
+                # THE INDEX IS LOADED (OR UPDATED) IN BACKGROUND
+                if 'llama_rag_thread' not in vars(self) or \
+                   not self.llama_rag_thread.is_alive():
+                    self.llama_rag_thread = threading.Thread(
+                        target=self._load_llama_rag_index, daemon=True)
+                    self.llama_rag_thread.start()
+                    self._set_message_llama_rag()
             mf = os.path.basename(self.llama_model_file)
             m = 'モデルファイルは"' + mf + '"が設定されています'
             self.set_message_on_status_bar(m)
@@ -16752,7 +16926,50 @@ class Makdo:
             self._write_answer('Llama', answer)
             self.llama_qanda = self.sub.get('1.0', 'end-1c')
 
+        def _load_llama_rag_index(self) -> bool:
+            # (RUNS IN A THREAD, SO IT DOES NOT TOUCH THE WIDGETS)
+            from llama_index.llms.llama_cpp import LlamaCPP
+            try:
+                if 'llama_cpp' not in vars(self):
+                    self.llama_cpp = LlamaCPP(
+                        model_path=self.llama_model_file,
+                        model_kwargs={
+                            'n_gpu_layers': self.llama_gpu_layers,
+                            'n_ctx': self.llama_context_size,
+                        }
+                    )
+                index = self.llama_rag_index.load()
+            except BaseException as e:
+                self.llama_rag_error = str(e)
+                return False
+            self.llama_with_rag \
+                = index.as_query_engine(llm=self.llama_cpp,
+                                        streaming=False,
+                                        similarity_top_k=3)
+            return True
+
+        def _set_message_llama_rag(self) -> bool:
+            if self.llama_rag_thread.is_alive():
+                message = 'RAG用のデータを読み込んでいます'
+                self.set_message_on_status_bar(message, True)
+                self.win.after(1_000, self._set_message_llama_rag)
+                return True
+            if 'llama_rag_error' in vars(self):
+                n = 'エラー'
+                m = 'RAG用のデータを読み込めませんでした．\n\n' \
+                    + self.llama_rag_error
+                del self.llama_rag_error
+                tkinter.messagebox.showerror(n, m)
+                self.set_message_on_status_bar('', True)
+                return False
+            self.set_message_on_status_bar('RAG用のデータを読み込みました', True)
+            return False
+
         def ask_llama_with_rag(self) -> None:
+            if 'llama_with_rag' not in vars(self):
+                m = 'RAG用のデータを読み込んでいますので、お待ちください'
+                self.set_message_on_status_bar(m, True)
+                return
             messages = self._get_message('Llama')
             self.set_message_on_status_bar('LlamaにRAGありで質問しています', True)
             q = ''
@@ -16779,7 +16996,8 @@ class Makdo:
         def close_llama_with_rag(self) -> None:
             del self._execute_sub_pane
             del self._close_sub_pane
-            del self.llama_with_rag
+            if 'llama_with_rag' in vars(self):
+                del self.llama_with_rag
             del self.llama_qanda
             self.set_message_on_status_bar('')
             self._close_sub_pane()
@@ -17103,6 +17321,10 @@ if __name__ == '__main__':
         '-b', '--make-backup-file',
         action='store_true',
         help='バックアップファイルを残します')
+    parser.add_argument(
+        '--profile-startup',
+        action=StartupProfile,
+        help='起動時間の内訳を表示します')
     parser.add_argument(
         'input_file',
         nargs='?',
@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+# Name:         encoding.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.18-22:40:00-JST>
+
+# encoding.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# from makdo_encoding import Encoding
+# Encoding.detect(raw_data)                 -> 'utf-8', 'CP932', None, ...
+# Encoding.detect(raw_data, 'xxx.md')       -> (cached by size and mtime)
+# Encoding.detect_file(open('xxx.md', 'rb'), 'xxx.md')
+#
+# Returns the same names as "chardet.detect(raw_data)['encoding']", but
+# checks a BOM and a strict UTF-8 decoding first, and gives chardet only
+# a part of the data beginning at the first non-ASCII byte (or "ESC"), so a
+# long ASCII head does not hide the rest.  If chardet still answers "ascii"
+# for data with non-ASCII bytes, the whole data is given to it.
+# "detect_file" reads the file in chunks and rewinds it.  Correcting the
+# result (to "SHIFT_JIS") and warning about it are left to the caller.
+
+
+__version__ = 'v08 Omachi'
+
+
+import os
+import re
+import codecs
+
+
+class Encoding:
+
+    """A class to detect the encoding of a text file"""
+
+    # THE NUMBER OF BYTES GIVEN TO CHARDET
+    sample_size = 65536
+
+    # THE NUMBER OF BYTES READ AT A TIME
+    chunk_size = 65536
+
+    # (PATH, SIZE, MTIME) -> ENCODING
+    cache = {}
+
+    boms = [(b'\xef\xbb\xbf', 'UTF-8-SIG'),
+            (b'\xff\xfe\x00\x00', 'UTF-32'),
+            (b'\x00\x00\xfe\xff', 'UTF-32'),
+            (b'\xff\xfe', 'UTF-16'),
+            (b'\xfe\xff', 'UTF-16')]
+
+    @classmethod
+    def detect(cls, raw_data, path=None):
+        key = cls._get_key(path)
+        if key is not None and key in cls.cache:
+            return cls.cache[key]
+        encoding = cls._detect(raw_data)
+        if key is not None:
+            cls.cache[key] = encoding
+        return encoding
+
+    @classmethod
+    def detect_file(cls, raw_file, path=None):
+        key = cls._get_key(path)
+        if key is not None and key in cls.cache:
+            return cls.cache[key]
+        pos = raw_file.tell()
+        chunks = iter(lambda: raw_file.read(cls.chunk_size), b'')
+        encoding, offset, is_ascii = cls._detect_chunks(chunks)
+        if encoding is None:
+            raw_file.seek(pos + offset)
+            sample = raw_file.read(cls.sample_size)
+            encoding = cls._detect_by_chardet(sample)
+            if encoding == 'ascii' and not is_ascii:
+                raw_file.seek(pos)
+                encoding = cls._detect_by_chardet(raw_file.read())
+        raw_file.seek(pos)
+        if key is not None:
+            cls.cache[key] = encoding
+        return encoding
+
+    @staticmethod
+    def _get_key(path):
+        if path is None or path == '-':
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    @classmethod
+    def _detect(cls, raw_data):
+        encoding, offset, is_ascii = cls._detect_chunks([raw_data])
+        if encoding is None:
+            sample = raw_data[offset:offset + cls.sample_size]
+            encoding = cls._detect_by_chardet(sample)
+            if encoding == 'ascii' and not is_ascii:
+                encoding = cls._detect_by_chardet(raw_data)
+        return encoding
+
+    @classmethod
+    def _detect_chunks(cls, chunks):
+        # RETURNS (ENCODING, OFFSET, IS_ASCII)
+        # (ENCODING IS NONE IF CHARDET IS NEEDED, AND THEN IT SHOULD READ
+        #  FROM OFFSET, WHERE THE FIRST NON-ASCII BYTE OR "ESC" IS)
+        decoder = codecs.getincrementaldecoder('utf-8')('strict')
+        is_ascii = True
+        esc_offset = None
+        offset = 0
+        is_first = True
+        for chunk in chunks:
+            # BOM
+            if is_first:
+                for bom, encoding in cls.boms:
+                    if chunk.startswith(bom):
+                        return encoding, 0, False
+                is_first = False
+            # ASCII ("ESC" MAY BE ISO-2022-JP)
+            if is_ascii and chunk.isascii():
+                if esc_offset is None and b'\x1b' in chunk:
+                    esc_offset = offset + chunk.index(b'\x1b')
+                offset += len(chunk)
+                continue
+            if is_ascii:
+                is_ascii = False
+                offset += cls._get_first_non_ascii(chunk)
+                if esc_offset is not None:
+                    offset = min(offset, esc_offset)
+            # UTF-8
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError:
+                return None, offset, False
+        if is_ascii:
+            if esc_offset is None:
+                return 'ascii', 0, True
+            return None, esc_offset, True
+        try:
+            decoder.decode(b'', True)
+        except UnicodeDecodeError:
+            return None, offset, False
+        return 'utf-8', 0, False
+
+    @staticmethod
+    def _get_first_non_ascii(chunk):
+        res = re.search(b'[\x80-\xff]', chunk)
+        if res is None:
+            return len(chunk)
+        return res.start()
+
+    @staticmethod
+    def _detect_by_chardet(sample):
+        import chardet  # GNU Lesser General Public License v2 or later
+        return chardet.detect(sample)['encoding']
@@ -56,6 +56,9 @@ __version__ = 'v08 Omachi'
 # m2d.set_version_number('rrr')
 # m2d.set_content_status('sss')
 # m2d.set_has_completed('ttt')
+# m2d.set_compact_styles('uuu')
+# m2d.set_image_dpi('vvv')
+# m2d.set_jobs('www')
 # m2d.save('xxx.docx')
 
 
@@ -93,26 +96,52 @@ import sys
 import os
 import argparse     # Python Software Foundation License
 import re
-import chardet      # GNU Lesser General Public License v2 or later (LGPLv2+)
 import unicodedata
 import datetime     # Zope Public License
-import docx         # MIT License
-from docx.shared import Cm, Pt
-# from docx.enum.text import WD_LINE_SPACING
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.enum.table import WD_ALIGN_VERTICAL
-# from docx.enum.table import WD_ROW_HEIGHT_RULE
-from docx.oxml import OxmlElement, ns
-# from docx.oxml.ns import qn
-from docx.enum.style import WD_STYLE_TYPE
-from docx.shared import RGBColor
-from docx.enum.text import WD_COLOR_INDEX
-# from docx.enum.text import WD_UNDERLINE
-from docx.enum.section import WD_SECTION
+import copy
+import hashlib
+import json
+import math
+import multiprocessing
+import io
+import contextlib
 import socket   # host
 import getpass  # user
+try:
+    from makdo_re import Re
+    from makdo_scanner import Scanner
+    from makdo_encoding import Encoding
+    from makdo_profile import StartupProfile
+except ImportError:
+    from makdo.makdo_re import Re
+    from makdo.makdo_scanner import Scanner
+    from makdo.makdo_encoding import Encoding
+    from makdo.makdo_profile import StartupProfile
+
+
+def import_dependencies():
+    # NOT NEEDED FOR "--help" AND "--version"
+    global docx, Cm, Pt, Emu, \
+        WD_ALIGN_PARAGRAPH, WD_PARAGRAPH_ALIGNMENT, \
+        WD_TABLE_ALIGNMENT, WD_ALIGN_VERTICAL, OxmlElement, ns, \
+        WD_STYLE_TYPE, RGBColor, WD_COLOR_INDEX, WD_SECTION, CT_Inline, etree
+    import docx         # MIT License
+    from docx.shared import Cm, Pt, Emu
+    # from docx.enum.text import WD_LINE_SPACING
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+    from docx.enum.table import WD_TABLE_ALIGNMENT
+    from docx.enum.table import WD_ALIGN_VERTICAL
+    # from docx.enum.table import WD_ROW_HEIGHT_RULE
+    from docx.oxml import OxmlElement, ns
+    # from docx.oxml.ns import qn
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.shared import RGBColor
+    from docx.enum.text import WD_COLOR_INDEX
+    # from docx.enum.text import WD_UNDERLINE
+    from docx.enum.section import WD_SECTION
+    from docx.oxml.shape import CT_Inline
+    from lxml import etree  # BSD License
 
 
 def get_arguments():
@@ -234,6 +263,24 @@ def get_arguments():
         '-c', '--has-completed',
         action='store_true',
         help='備考書（コメント）などを消して完成させます')
+    parser.add_argument(
+        '--compact-styles',
+        action='store_true',
+        help='繰り返される書式をスタイルにまとめます')
+    parser.add_argument(
+        '--image-dpi',
+        type=float,
+        metavar='NUMBER',
+        help='大きすぎる画像を指定の解像度（dpi）まで縮小します')
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        metavar='NUMBER',
+        help='段落の解析を並列に行うプロセスの数')
+    parser.add_argument(
+        '--profile-startup',
+        action=StartupProfile,
+        help='起動時間の内訳を表示します')
     parser.add_argument(
         'md_file',
         help='Markdownファイル')
@@ -400,6 +447,21 @@ DEFAULT_CONTENT_STATUS = ''
 
 DEFAULT_HAS_COMPLETED = False
 
+DEFAULT_COMPACT_STYLES = False
+COMPACT_STYLES_MIN_COUNT = 2
+
+DEFAULT_IMAGE_DPI = 0.0
+
+DEFAULT_JOBS = 1
+RAW_PARAGRAPHS_PER_JOB = 64
+
+if sys.platform == 'win32':
+    IMAGE_CACHE_DIR = str(os.getenv('LOCALAPPDATA')) + '\\makdo\\image'
+elif sys.platform == 'darwin':
+    IMAGE_CACHE_DIR = str(os.getenv('HOME')) + '/Library/Caches/makdo/image'
+else:
+    IMAGE_CACHE_DIR = str(os.getenv('HOME')) + '/.cache/makdo/image'
+
 BASIC_TABLE_CELL_HEIGHT = 1.5
 BASIC_TABLE_CELL_WIDTH = 1.5  # >= 1.1068
 
@@ -1178,8 +1240,21 @@ class IO:
         return True
 
     def get_ms_doc(self):
+        key = MsDocCache.get_key()
+        if key in MsDocCache.documents:
+            # HEADER AND FOOTER ARE NOT WRITTEN AGAIN
+            if Form.header_string != '' or Form.page_number != '':
+                Paragraph.bridge_chars_state.initialize()
+        else:
+            MsDocCache.add(key, self._make_ms_doc())
+        ImageCache.relations = {}
+        # A CLONE IS CHEAPER THAN A TEMPLATE PARSE PLUS STYLING
+        return copy.deepcopy(MsDocCache.documents[key])
+
+    def _make_ms_doc(self):
         f_size = Form.font_size
         ms_doc = docx.Document()
+        ImageCache.relations = {}
         ms_sec = ms_doc.sections[0]
         ms_sec.page_height = Cm(PAPER_HEIGHT[Form.paper_size])
         ms_sec.page_width = Cm(PAPER_WIDTH[Form.paper_size])
@@ -1375,6 +1450,83 @@ class IO:
             = Pt(- f_size)
         ms_doc.styles['makdo-f'].paragraph_format.left_indent = Pt(f_size * 7)
 
+    def make_compact_styles(self, ms_doc):
+        # RUN PROPERTIES -> CHARACTER STYLES
+        ms_runs = []
+        for ms_run in ms_doc.element.body.iter(ns.qn('w:r')):
+            ms_rpr = ms_run.find(ns.qn('w:rPr'))
+            if ms_rpr is None or ms_rpr.find(ns.qn('w:rStyle')) is not None:
+                continue
+            ms_runs.append(ms_rpr)
+        self.__replace_props_with_styles(ms_doc, ms_runs,
+                                         WD_STYLE_TYPE.CHARACTER, 'c',
+                                         ['w:rPrChange'])
+        # PARAGRAPH PROPERTIES -> PARAGRAPH STYLES
+        ms_pars = []
+        for ms_par in ms_doc.element.body.iter(ns.qn('w:p')):
+            ms_ppr = ms_par.find(ns.qn('w:pPr'))
+            if ms_ppr is None:
+                continue
+            ms_pars.append(ms_ppr)
+        self.__replace_props_with_styles(ms_doc, ms_pars,
+                                         WD_STYLE_TYPE.PARAGRAPH, 'p',
+                                         ['w:pStyle', 'w:numPr', 'w:rPr',
+                                          'w:sectPr', 'w:pPrChange'])
+
+    @staticmethod
+    def __replace_props_with_styles(ms_doc, ms_props, style_type, prefix,
+                                    fixed_tags):
+        fixed_tags = [ns.qn(t) for t in fixed_tags]
+        # COUNT
+        keys = []
+        counts = {}
+        for ms_prop in ms_props:
+            base = ''
+            if style_type == WD_STYLE_TYPE.PARAGRAPH:
+                ms_pstyle = ms_prop.find(ns.qn('w:pStyle'))
+                if ms_pstyle is not None:
+                    base = ms_pstyle.get(ns.qn('w:val'))
+            key = base
+            for oe in ms_prop:
+                if oe.tag not in fixed_tags:
+                    key += etree.tostring(oe, encoding='unicode')
+            keys.append((base, key))
+            if key == base:
+                continue
+            if key not in counts:
+                counts[key] = 0
+            counts[key] += 1
+        # REPLACE
+        names = {}
+        for ms_prop, (base, key) in zip(ms_props, keys):
+            if key == base or counts[key] < COMPACT_STYLES_MIN_COUNT:
+                continue
+            moved = [oe for oe in ms_prop if oe.tag not in fixed_tags]
+            if key not in names:
+                n = 'makdo-' + prefix + str(len(names) + 1)
+                ms_stl = ms_doc.styles.add_style(n, style_type)
+                if style_type == WD_STYLE_TYPE.PARAGRAPH:
+                    if base != '':
+                        ms_stl.element.basedOn_val = base
+                    oe0 = ms_stl.element.get_or_add_pPr()
+                else:
+                    oe0 = ms_stl.element.get_or_add_rPr()
+                for oe in moved:
+                    oe0.append(copy.deepcopy(oe))
+                names[key] = n
+            for oe in moved:
+                ms_prop.remove(oe)
+            if style_type == WD_STYLE_TYPE.PARAGRAPH:
+                ms_pstyle = ms_prop.find(ns.qn('w:pStyle'))
+                if ms_pstyle is None:
+                    ms_pstyle = OxmlElement('w:pStyle')
+                    ms_prop.insert(0, ms_pstyle)
+                ms_pstyle.set(ns.qn('w:val'), names[key])
+            else:
+                ms_rstyle = OxmlElement('w:rStyle')
+                ms_rstyle.set(ns.qn('w:val'), names[key])
+                ms_prop.insert(0, ms_rstyle)
+
 
 class MdFile:
 
@@ -1383,33 +1535,28 @@ class MdFile:
     def __init__(self, md_file):
         # DECLARE
         self.md_file = None
-        self.raw_data = None
+        self.raw_file = None
         self.encoding = None
-        self.decoded_data = None
-        self.cleansed_data = None
-        self.splited_data = None
         self.formal_md_lines = None
         # SUBSTITUTE
         self.md_file = md_file
-        self.raw_data = self._get_raw_data(self.md_file)
-        self.encoding = self._get_encoding(self.raw_data)
-        self.decoded_data = self._decode_data(self.encoding, self.raw_data)
-        self.cleansed_data = self._cleanse_data(self.decoded_data)
-        self.splited_data = self._split_data(self.cleansed_data)
-        self.formal_md_lines = self.splited_data
+        self.raw_file = self._open_raw_file(self.md_file)
+        self.encoding = self._get_encoding(self.raw_file, self.md_file)
+        self.formal_md_lines = self._read_lines(self.encoding, self.raw_file)
+        self.raw_file.close()
 
     def read_file(self):
         return self.formal_md_lines
 
     @staticmethod
-    def _get_raw_data(md_file):
+    def _open_raw_file(md_file):
         if md_file is None:
-            return ''
+            return io.BytesIO(b'')
         try:
             if md_file == '-':
-                raw_data = sys.stdin.buffer.read()
+                raw_file = io.BytesIO(sys.stdin.buffer.read())
             else:
-                raw_data = open(md_file, 'rb').read()
+                raw_file = open(md_file, 'rb')
         except BaseException:
             msg = '※ エラー: ' \
                 + '入力ファイル「' + md_file + '」の読込みに失敗しました'
@@ -1419,14 +1566,12 @@ class MdFile:
             raise BaseException('failed to read input file')
             if __name__ == '__main__':
                 sys.exit(104)
-            return ''
-        return raw_data
+            return io.BytesIO(b'')
+        return raw_file
 
     @staticmethod
-    def _get_encoding(raw_data):
-        encoding = 'SHIFT_JIS'
-        if raw_data != '':
-            encoding = chardet.detect(raw_data)['encoding']
+    def _get_encoding(raw_file, md_file=None):
+        encoding = Encoding.detect_file(raw_file, md_file)
         if encoding is None:
             encoding = 'SHIFT_JIS'
         elif (re.match('^utf[-_]?.*$', encoding, re.I)) or \
@@ -1448,13 +1593,16 @@ class MdFile:
             sys.stderr.write(msg + '\n\n')
         return encoding
 
-    @staticmethod
-    def _decode_data(encoding, raw_data):
+    @classmethod
+    def _read_lines(cls, encoding, raw_file):
+        # THE WHOLE FILE IS NEVER HELD AS BYTES OR AS ONE STRING
         try:
-            decoded_data = raw_data.decode(encoding)
+            return cls._split_data(cls._cleanse_data(
+                cls._decode_data(encoding, raw_file)))
         except BaseException:
             try:
-                decoded_data = raw_data.decode('utf-8')
+                return cls._split_data(cls._cleanse_data(
+                    cls._decode_data('utf-8', raw_file)))
             except BaseException:
                 msg = '※ エラー: ' \
                     + 'データを読みません（Markdownでないかも？）'
@@ -1464,25 +1612,58 @@ class MdFile:
                 raise BaseException('failed to read data')
                 if __name__ == '__main__':
                     sys.exit(105)
-                return ''
-        return decoded_data
+                return []
 
     @staticmethod
-    def _cleanse_data(decoded_data):
-        tmp_data = decoded_data
+    def _decode_data(encoding, raw_file):
+        # "\r\n" AND "\r" ARE TRANSLATED INTO "\n"
+        raw_file.seek(0)
+        text_file = io.TextIOWrapper(raw_file, encoding=encoding, newline=None)
+        try:
+            line = ''
+            for line in text_file:
+                yield line[:-1] if line.endswith('\n') else line
+            if line == '' or line.endswith('\n'):
+                yield ''
+        finally:
+            text_file.detach()
+
+    @staticmethod
+    def _cleanse_data(decoded_lines):
         bom = chr(65279)  # BOM (byte order mark)
-        tmp_data = re.sub('^' + bom, '', tmp_data)  # unnecessary?
-        tmp_data = re.sub('\r\n', '\n', tmp_data)  # unnecessary?
-        tmp_data = re.sub('\r', '\n', tmp_data)  # unnecessary?
         # ISOLATE CONFIGURATIONS
-        res = '^(<!--(?:.|\n)*?-->)\n*((?:.|\n)*)$'
-        tmp_data = re.sub(res, '\\1\n\n\\2', tmp_data)
-        cleansed_data = tmp_data
-        return cleansed_data
+        # ("^(<!--(?:.|\n)*?-->)\n*((?:.|\n)*)$" -> "\1\n\n\2")
+        is_in_configurations = None
+        for i, line in enumerate(decoded_lines):
+            if i == 0:
+                line = Re.sub('^' + bom, '', line)  # unnecessary?
+                if line.startswith('<!--'):
+                    is_in_configurations = True
+                    beg = 4
+            if is_in_configurations is None:
+                yield line
+            elif is_in_configurations:
+                end = line.find('-->', beg)
+                beg = 0
+                if end < 0:
+                    yield line
+                    continue
+                yield line[:end + 3]
+                yield ''
+                is_in_configurations = False
+                if line[end + 3:] != '':
+                    yield line[end + 3:]
+                    is_in_configurations = None
+            elif line != '':
+                # THE FIRST LINE AFTER EMPTY LINES
+                yield line
+                is_in_configurations = None
+        if is_in_configurations is False:
+            yield ''
 
     @staticmethod
-    def _split_data(cleansed_data):
-        splited_data = cleansed_data.split('\n')
+    def _split_data(cleansed_lines):
+        splited_data = list(cleansed_lines)
         splited_data.append('')
         return splited_data
 
@@ -1560,6 +1741,175 @@ class DocxFile:
         return True
 
 
+class MsDocCache:
+
+    """A class to cache styled base documents"""
+
+    # THE FORM ATTRIBUTES WHICH "IO._make_ms_doc" DEPENDS ON
+    form_keys = ['document_style', 'paper_size',
+                 'top_margin', 'bottom_margin', 'left_margin', 'right_margin',
+                 'header_string', 'page_number', 'line_number',
+                 'mincho_font', 'gothic_font', 'ivs_font',
+                 'font_size', 'line_spacing', 'space_before', 'space_after',
+                 'auto_space']
+    max_documents = 16
+    documents = {}  # config hash -> ms_doc
+
+    @classmethod
+    def get_key(cls):
+        values = [repr(getattr(Form, k)) for k in cls.form_keys]
+        # THE IMAGES IN THE HEADER AND THE FOOTER ARE READ FROM THE FILES
+        for hf in [Form.header_string, Form.page_number]:
+            for m in re.compile(RES_IMAGE).finditer(hf):
+                path = re.sub('^(.*) "(.*)"$', '\\1', m.group(2))
+                values.append(repr(cls._get_file_state(path)))
+                values.append(repr(Form.image_dpi))
+        return hashlib.sha1('\n'.join(values).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _get_file_state(path):
+        # RELATIVE TO THE CURRENT DIRECTORY
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            return (path, None, None)
+        st = os.stat(path)
+        return (path, st.st_size, st.st_mtime)
+
+    @classmethod
+    def add(cls, key, ms_doc):
+        while len(cls.documents) >= cls.max_documents:
+            del cls.documents[next(iter(cls.documents))]
+        cls.documents[key] = ms_doc
+
+
+class MathCache:
+
+    """A class to cache written math expressions"""
+
+    # THE CHARS STATE ATTRIBUTES ARE ALL IMMUTABLE
+    max_expressions = 256
+    expressions = {}  # (chars, chars state) -> (oMath, chars state after)
+
+    @staticmethod
+    def get_key(chars, chars_state):
+        return (chars, tuple(sorted(vars(chars_state).items())))
+
+    @classmethod
+    def add(cls, key, oe, chars_state):
+        while len(cls.expressions) >= cls.max_expressions:
+            del cls.expressions[next(iter(cls.expressions))]
+        cls.expressions[key] = (copy.deepcopy(oe), dict(vars(chars_state)))
+
+
+class ImageCache:
+
+    """A class to cache images to embed"""
+
+    digests = {}     # (path, size, mtime) -> sha1
+    relations = {}   # (part, sha1) -> (rId, image)
+    dimensions = None  # sha1 -> [px_width, px_height, horz_dpi, vert_dpi]
+    has_pillow = None
+
+    @classmethod
+    def add_picture(cls, ms_run, path, width, height):
+        if Form.image_dpi > 0:
+            path, width, height = cls._get_resampled(path, width, height)
+        ms_part = ms_run.part
+        key = (id(ms_part), cls._get_digest(path))
+        if key not in cls.relations:
+            cls.relations[key] = ms_part.get_or_add_image(path)
+        rid, image = cls.relations[key]
+        cx, cy = image.scaled_dimensions(width, height)
+        oe = CT_Inline.new_pic_inline(ms_part.next_id, rid, image.filename,
+                                      cx, cy)
+        ms_run._r.add_drawing(oe)
+
+    @classmethod
+    def _get_digest(cls, path):
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_size, st.st_mtime)
+        if key not in cls.digests:
+            with open(path, 'rb') as f:
+                cls.digests[key] = hashlib.sha1(f.read()).hexdigest()
+        return cls.digests[key]
+
+    @classmethod
+    def _get_resampled(cls, path, width, height):
+        if cls.has_pillow is None:
+            try:
+                import PIL.Image  # HPND License (pip install pillow)
+                cls.has_pillow = True
+            except ImportError:
+                msg = '※ 警告: ' \
+                    + '"pillow"がないため、画像を縮小できません'
+                # msg = 'warning: ' \
+                #     + 'can\'t downsample images without "pillow"'
+                sys.stderr.write(msg + '\n\n')
+                cls.has_pillow = False
+        if not cls.has_pillow:
+            return path, width, height
+        import PIL.Image  # HPND License (pip install pillow)
+        sha1 = cls._get_digest(path)
+        dims = cls._get_dimensions(sha1, path)
+        px_w, px_h, dpi_h, dpi_v = dims
+        # SAME AS "docx.image.image.Image.scaled_dimensions"
+        nat_w = int(px_w / dpi_h * 914400)
+        nat_h = int(px_h / dpi_v * 914400)
+        if width is None and height is None:
+            width, height = nat_w, nat_h
+        elif width is None:
+            width = round(nat_w * float(height) / float(nat_h))
+        elif height is None:
+            height = round(nat_h * float(width) / float(nat_w))
+        width, height = Emu(width), Emu(height)
+        new_w = math.ceil(width / 914400 * Form.image_dpi)
+        new_h = math.ceil(height / 914400 * Form.image_dpi)
+        if px_w <= new_w or px_h <= new_h:
+            return path, width, height
+        ext = re.sub('^.*(\\.[^\\.]*)$', '\\1', path).lower()
+        if ext not in ('.jpg', '.jpeg', '.png'):
+            ext = '.png'
+        new_path = IMAGE_CACHE_DIR + '/' + sha1 \
+            + '-' + str(new_w) + 'x' + str(new_h) + ext
+        if not os.path.exists(new_path):
+            os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+            with PIL.Image.open(path) as img:
+                img = img.resize((new_w, new_h), PIL.Image.LANCZOS)
+                tmp_path = new_path + '.' + str(os.getpid()) + '.tmp'
+                if ext == '.png':
+                    img.save(tmp_path, 'PNG', dpi=(Form.image_dpi,) * 2)
+                else:
+                    img.convert('RGB').save(tmp_path, 'JPEG', quality=90,
+                                            dpi=(Form.image_dpi,) * 2)
+                os.replace(tmp_path, new_path)
+        return new_path, width, height
+
+    @classmethod
+    def _get_dimensions(cls, sha1, path):
+        index_file = IMAGE_CACHE_DIR + '/index.json'
+        if cls.dimensions is None:
+            cls.dimensions = {}
+            if os.path.exists(index_file):
+                try:
+                    with open(index_file, 'r', encoding='utf-8') as f:
+                        cls.dimensions = json.load(f)
+                except BaseException:
+                    cls.dimensions = {}
+        if sha1 not in cls.dimensions:
+            img = docx.image.image.Image.from_file(path)
+            cls.dimensions[sha1] \
+                = [img.px_width, img.px_height, img.horz_dpi, img.vert_dpi]
+            try:
+                os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+                tmp_file = index_file + '.' + str(os.getpid()) + '.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(cls.dimensions, f)
+                os.replace(tmp_file, index_file)
+            except BaseException:
+                pass
+        return cls.dimensions[sha1]
+
+
 class Form:
 
     """A class to handle form"""
@@ -1585,6 +1935,9 @@ class Form:
     version_number = DEFAULT_VERSION_NUMBER
     content_status = DEFAULT_CONTENT_STATUS
     has_completed = DEFAULT_HAS_COMPLETED
+    compact_styles = DEFAULT_COMPACT_STYLES
+    image_dpi = DEFAULT_IMAGE_DPI
+    jobs = DEFAULT_JOBS
     created_time = ''
     modified_time = ''
 
@@ -1757,6 +2110,12 @@ class Form:
                 Form.set_content_status(args.content_status)
             if args.has_completed:
                 Form.set_has_completed(str(args.has_completed))
+            if args.compact_styles:
+                Form.set_compact_styles(str(args.compact_styles))
+            if args.image_dpi is not None:
+                Form.set_image_dpi(str(args.image_dpi))
+            if args.jobs is not None:
+                Form.set_jobs(str(args.jobs))
 
     @staticmethod
     def set_document_title(value, item='document_title'):
@@ -2041,6 +2400,59 @@ class Form:
         #     + '"' + item + '" must be "True" or "False"'
         sys.stderr.write(msg + '\n\n')
 
+    @staticmethod
+    def set_compact_styles(value, item='compact_styles'):
+        if value is None:
+            return False
+        value = unicodedata.normalize('NFKC', value)
+        if value == 'True' or value == '真':
+            Form.compact_styles = True
+            return True
+        elif value == 'False' or value == '偽':
+            Form.compact_styles = False
+            return True
+        msg = '※ 警告: ' \
+            + '「' + item + '」の値は' \
+            + '"真"又は"偽"でなければなりません'
+        # msg = 'warning: ' \
+        #     + '"' + item + '" must be "True" or "False"'
+        sys.stderr.write(msg + '\n\n')
+
+    @staticmethod
+    def set_image_dpi(value, item='image_dpi'):
+        if value is None:
+            return False
+        value = unicodedata.normalize('NFKC', value)
+        value = re.sub('\\s*dpi$', '', value)
+        if re.match('^' + RES_NUMBER + '$', value) and float(value) >= 0:
+            Form.image_dpi = float(value)
+            return True
+        msg = '※ 警告: ' \
+            + '「' + item + '」の値は' \
+            + '0以上の整数又は小数でなければなりません'
+        # msg = 'warning: ' \
+        #     + '"' + item + '" must be a non-negative integer or decimal'
+        sys.stderr.write(msg + '\n\n')
+        return False
+
+    @staticmethod
+    def set_jobs(value, item='jobs'):
+        if value is None:
+            return False
+        value = unicodedata.normalize('NFKC', value)
+        if re.match('^[0-9]+$', value):
+            Form.jobs = int(value)
+            if Form.jobs == 0:
+                Form.jobs = os.cpu_count() or 1
+            return True
+        msg = '※ 警告: ' \
+            + '「' + item + '」の値は' \
+            + '0以上の整数でなければなりません'
+        # msg = 'warning: ' \
+        #     + '"' + item + '" must be a non-negative integer'
+        sys.stderr.write(msg + '\n\n')
+        return False
+
     @staticmethod
     def set_created_time(value, item='created_time'):
         if value is None:
@@ -2491,6 +2903,13 @@ class Math:
         # ADD VARIABLES
         chars_state.is_italic = True
         chars_state.must_break_line = False
+        # REUSE
+        key = MathCache.get_key(chars, chars_state)
+        if key in MathCache.expressions:
+            oe1, state = MathCache.expressions[key]
+            oe0.append(copy.deepcopy(oe1))
+            vars(chars_state).update(state)
+            return ''
         # ADD MATH TAG
         oe1 = XML.add_tag(oe0, 'm:oMath')
         # PREPARE
@@ -2500,6 +2919,8 @@ class Math:
         chars_state.is_italic = True
         chars = cls._write_math_exp(oe1, chars_state, chars)
         chars_state.is_italic = is_italic
+        # CACHE
+        MathCache.add(key, oe1, chars_state)
         # RETURN
         return chars
 
@@ -2522,13 +2943,13 @@ class Math:
     def _envelop_command(chars):
         # TEX COMMAND
         imm = ''
-        res1 = NOT_ESCAPED + '(\\\\[A-Za-z]+)$'
         res9 = '^[^A-Za-z]$'
         for c in chars + '\0':
             # ALPHABET COMMAND
             if re.match(res9, c):
-                imm = re.sub(res1, '\\1{\\2}', imm)
-            imm = re.sub(NOT_ESCAPED + '(\\\\\\\\)$', '\\1{\\2}', imm)
+                imm = Math._envelop_alphabet_command(imm)
+            if Scanner.endswith(imm, '\\\\'):
+                imm = re.sub('(\\\\\\\\)$', '{\\1}', imm)
             # FONT SIZE
             # imm = re.sub('{{\\\\tiny}$', '{\\\\tiny}{', imm)
             # imm = re.sub('{{\\\\scriptsize}$', '{\\\\scriptsize}{', imm)
@@ -2544,41 +2965,46 @@ class Math:
             # imm = re.sub('{{\\\\scalebox}$', '{\\\\scalebox}{', imm)
             # SPACE
             imm = re.sub('\\\\%$', '%0', imm)                   # "%"  -> "%0"
-            imm = re.sub(NOT_ESCAPED + '\\\\,$', '\\1%1', imm)  # "\," -> "%1"
-            imm = re.sub(NOT_ESCAPED + '\\\\:$', '\\1%2', imm)  # "\:" -> "%2"
-            imm = re.sub(NOT_ESCAPED + '\\\\;$', '\\1%3', imm)  # "\;" -> "%3"
-            imm = re.sub(NOT_ESCAPED + '\\\\ $', '\\1%4', imm)  # "\ " -> "%4"
-            imm = re.sub(NOT_ESCAPED + '\\\\!$', '\\1%5', imm)  # "\!" -> "%5"
+            for i, sp in enumerate([',', ':', ';', ' ', '!']):
+                # "\," -> "%1", "\:" -> "%2", "\;" -> "%3", "\ " -> "%4", ...
+                if Scanner.endswith(imm, '\\' + sp):
+                    imm = Re.sub('\\\\' + sp + '$', '%' + str(i + 1), imm)
             # PARENTHESES
             imm = re.sub('{\\\\[Bb]igg?}', '', imm)
             imm = re.sub('{\\\\(?:left|right)}', '', imm)
             imm = re.sub('\\($', '{(-}', imm)      # "("  -> "{(-}"
             imm = re.sub('\\)$', '{-)}', imm)      # ")"  -> "{-)}"
-            imm = re.sub(NOT_ESCAPED + '\\\\{$',
-                         '\\1{(=}', imm)           # "\{" -> "{(=}"
-            imm = re.sub(NOT_ESCAPED + '\\\\}$',
-                         '\\1{=)}', imm)           # "\}" -> "{=)}"
+            if Scanner.endswith(imm, '\\{'):
+                imm = re.sub('\\\\{$', '{(=}', imm)  # "\{" -> "{(=}"
+            if Scanner.endswith(imm, '\\}'):
+                imm = re.sub('\\\\}$', '{=)}', imm)  # "\}" -> "{=)}"
             imm = re.sub('\\[$', '{[}', imm)       # "["  -> "{[}"
             imm = re.sub('\\]$', '{]}', imm)       # "]"  -> "{]}"
             # TEX COMMAND OPTION
             sqrt = '{\\\\sqrt}' + '{\\[}([^\\[\\]]*' \
                 + ('(?:\\[[^\\[\\]]*' * 3) + ('\\][^\\[\\]]*)*' * 3) \
                 + '){\\]}$'
-            imm = re.sub(NOT_ESCAPED + sqrt, '\\1{\\\\sqrt}{[\\2]}', imm)
+            if imm.endswith('{]}') or imm.endswith('{]}\n'):
+                imm = Re.sub(NOT_ESCAPED + sqrt, '\\1{\\\\sqrt}{[\\2]}', imm)
             # DEL AND INS
-            imm = re.sub(NOT_ESCAPED + '\\->$', '\\1{{->}{', imm)
-            imm = re.sub(NOT_ESCAPED + '<\\-$', '\\1}{<-}}', imm)
-            imm = re.sub(NOT_ESCAPED + '\\+>$', '\\1{{+>}{', imm)
-            imm = re.sub(NOT_ESCAPED + '<\\+$', '\\1}{<+}}', imm)
+            if Scanner.endswith(imm, '->'):
+                imm = re.sub('\\->$', '{{->}{', imm)
+            if Scanner.endswith(imm, '<-'):
+                imm = re.sub('<\\-$', '}{<-}}', imm)
+            if Scanner.endswith(imm, '+>'):
+                imm = re.sub('\\+>$', '{{+>}{', imm)
+            if Scanner.endswith(imm, '<+'):
+                imm = re.sub('<\\+$', '}{<+}}', imm)
             # SUB, SUP (NO PARENTHESES)
             oc = '^([^ \\\\_\\^\\(\\){}\\[\\]\0])$'
-            if re.match(NOT_ESCAPED + '(_|\\^)$', imm + c):
+            if Scanner.endswith(imm + c, '_') or \
+               Scanner.endswith(imm + c, '^'):
                 if imm[-1] != '}':
                     if re.match(oc, imm[-1]):
                         imm = re.sub('(.)$', '{\\1}', imm)
                     else:
                         imm += '{}'
-            if re.match(NOT_ESCAPED + '(_|\\^)$', imm):
+            if Scanner.endswith(imm, '_') or Scanner.endswith(imm, '^'):
                 if c != '{':
                     if re.match(oc, c):
                         imm += '{' + c + '}'
@@ -2591,10 +3017,24 @@ class Math:
         chars = imm
         return chars
 
+    @staticmethod
+    def _envelop_alphabet_command(imm):
+        # "...\abc" -> "...{\abc}"
+        tail = ''
+        if imm.endswith('\n'):
+            imm, tail = imm[:-1], '\n'
+        i = len(imm)
+        while i > 0 and re.match('^[A-Za-z]$', imm[i - 1]):
+            i -= 1
+        if i < len(imm) and i > 0 and imm[i - 1] == '\\':
+            if not Scanner.is_escaped(imm, i - 1):
+                return imm[:i - 1] + '{' + imm[i - 1:] + '}' + tail
+        return imm + tail
+
     @staticmethod
     def _replace_symbol(chars):
         for com in Math.symbols:
-            chars = re.sub('{\\' + com + '}', Math.symbols[com], chars)
+            chars = Re.sub('{\\' + com + '}', Math.symbols[com], chars)
         chars = re.sub('(?:^| )(.)/(.)(?: |$)', '{\\\\frac}{\\1}{\\2}', chars)
         chars = re.sub('(\\{[^\\{\\}]*\\})/(\\{\\{[^\\{\\}]*\\})',
                        '{\\\\frac}\\1\\2', chars)
@@ -2825,19 +3265,25 @@ class Math:
     @staticmethod
     def _close_paren(chars):
         d = 0
-        imm = ''
-        for c in chars:
-            imm += c
-            if re.match(NOT_ESCAPED + '{$', imm):
-                d += 1
-            if re.match(NOT_ESCAPED + '}$', imm):
-                d -= 1
+        for i, c in Math.__get_unescaped_braces(chars):
+            d += 1 if c == '{' else -1
         if d > 0:
             chars = chars + ('}' * d)
         if d < 0:
             chars = ('{' * (d * -1)) + chars
         return chars
 
+    @staticmethod
+    def __get_unescaped_braces(chars):
+        # SAME AS TESTING "NOT_ESCAPED + '{$'" AT EVERY CHARACTER
+        # ("$" ALSO MATCHES BEFORE A NEWLINE AT THE END)
+        escaped = Scanner.get_escaped(chars)
+        for i, c in enumerate(chars):
+            if c == '\n' and i > 0:
+                i, c = i - 1, chars[i - 1]
+            if (c == '{' or c == '}') and not escaped[i]:
+                yield i, c
+
     @staticmethod
     def _envelop_all(chars):
         tmp = ''
@@ -2885,14 +3331,9 @@ class Math:
         # REMOVE ENCLOSING PARENTHESIS
         if re.match('^{(.*)}$', chars):
             ers = re.sub('^{(.*)}$', '\\1', chars)
-            imm = ''
             dep = 0
-            for c in ers:
-                imm += c
-                if re.match(NOT_ESCAPED + '{$', imm):
-                    dep += 1
-                if re.match(NOT_ESCAPED + '}$', imm):
-                    dep -= 1
+            for i, c in cls.__get_unescaped_braces(ers):
+                dep += 1 if c == '{' else -1
                 if dep < 0:
                     break
             else:
@@ -3551,8 +3992,12 @@ class Document:
         return md_lines
 
     def get_raw_paragraphs(self, md_lines):
-        raw_paragraphs = []
+        blocks = []
         block = []
+        res_symbols = []
+        for pc in [ParagraphChapter, ParagraphSection, ParagraphList,
+                   ParagraphFootnotes]:
+            res_symbols.append('^\\s*' + pc.res_symbol + '\\s+\\S+.*$')
         for ml in md_lines:
             # ISOLATE CONFIGURATIONS
             if 'is_in_configurations' not in locals():
@@ -3569,10 +4014,8 @@ class Document:
             if len(block) > 0:
                 pre_text = block[-1].raw_text
                 cur_text = ml.raw_text
-                for pc in [ParagraphChapter, ParagraphSection, ParagraphList,
-                           ParagraphFootnotes]:
-                    res = '^\\s*' + pc.res_symbol + '\\s+\\S+.*$'
-                    if re.match(res, pre_text) and re.match(res, cur_text):
+                for res in res_symbols:
+                    if Re.match(res, pre_text) and Re.match(res, cur_text):
                         is_block_end = True
                     # REMOVED 23.10.23 >
                     # res_r = '^\\s*' + pc.res_reviser + '(\\s.*)?$'
@@ -3581,8 +4024,8 @@ class Document:
                     #     if re.match(res_r + '|' + res_s, cur_text):
                     #         is_block_end = True
                     # <
-                if re.match(ParagraphRemarks.res_feature, pre_text) and \
-                   not re.match(ParagraphRemarks.res_feature, cur_text):
+                if Re.match(ParagraphRemarks.res_feature, pre_text) and \
+                   not Re.match(ParagraphRemarks.res_feature, cur_text):
                     is_block_end = True
             # RECORD
             if is_block_end:
@@ -3597,20 +4040,34 @@ class Document:
                     elif not re.match('^.*```$', block[-1].raw_text):
                         block.append(ml)
                         continue
-                rp = RawParagraph(block)
-                raw_paragraphs.append(rp)
+                blocks.append(block)
                 block = []
             if ml.raw_text != '':
                 block.append(ml)
         if len(block) > 0:
-            rp = RawParagraph(block)
-            raw_paragraphs.append(rp)
+            blocks.append(block)
             block = []
+        # PARSE (IN PARALLEL)
+        raw_paragraphs = self._parse_blocks(blocks)
         # TRACK CHANGES
         raw_paragraphs = self._prepare_track_changes(raw_paragraphs)
         # self.raw_paragraphs = raw_paragraphs
         return raw_paragraphs
 
+    @staticmethod
+    def _parse_blocks(blocks):
+        jobs = Form.jobs
+        if jobs <= 1 or len(blocks) < jobs * RAW_PARAGRAPHS_PER_JOB:
+            return [RawParagraph(b) for b in blocks]
+        # RAW PARAGRAPHS ONLY DEPEND ON THEIR OWN MD LINES
+        chunksize = max(1, len(blocks) // (jobs * 4))
+        with multiprocessing.Pool(jobs) as pool:
+            raw_paragraphs = pool.map(RawParagraph, blocks, chunksize)
+        for rp in raw_paragraphs:
+            RawParagraph.raw_paragraph_number += 1
+            rp.raw_paragraph_number = RawParagraph.raw_paragraph_number
+        return raw_paragraphs
+
     def _prepare_track_changes(self, raw_paragraphs):
         tc = ''
         for rp in raw_paragraphs:
@@ -3917,6 +4374,12 @@ class Document:
         for p in self.paragraphs:
             p.print_warning_messages()
 
+    def get_warning_messages(self):
+        warning_messages = []
+        for p in self.paragraphs:
+            warning_messages += p.get_warning_messages()
+        return warning_messages
+
     # UNFOLD
     @staticmethod
     def unfold(old_md_lines):
@@ -3972,7 +4435,7 @@ class Document:
                     if not remain_md_lines[j]:
                         continue
                     res = '^\\.\\.\\.\\[' + folding_number + '\\]'
-                    if re.match(res, ml.text):
+                    if Re.match(res, ml.text):
                         line_numbers.append(j)
                         # JUMP TO "TO LINE"
                         # new_md_lines.append(old_md_lines[j])
@@ -4074,38 +4537,38 @@ class RawParagraph:
         res_hl = '^' + ParagraphHorizontalLine.res_feature + '$'
         # HEAD REVISERS
         for ml in md_lines:
-            if re.match('^' + res_lr, ml.text):
+            if Re.match('^' + res_lr, ml.text):
                 ml.text = ml.beg_space + ml.text
             if re.match('^.*(  |\t|\u3000)$', ml.spaced_text):
                 ml.text = re.sub('<br>$', '  ', ml.text)
             while True:
                 if re.match('^-{5,}', ml.text):
                     break  # horizontalline
-                elif re.match(res_cr, ml.text):
-                    reviser = re.sub(res_cr, '\\1', ml.text)
-                    ml.text = re.sub(res_cr, '\\5', ml.text)
+                elif Re.match(res_cr, ml.text):
+                    reviser = Re.sub(res_cr, '\\1', ml.text)
+                    ml.text = Re.sub(res_cr, '\\5', ml.text)
                     chapter_revisers.append(reviser)
-                elif re.match(res_sr, ml.text):
-                    reviser = re.sub(res_sr, '\\1', ml.text)
-                    ml.text = re.sub(res_sr, '\\5', ml.text)
+                elif Re.match(res_sr, ml.text):
+                    reviser = Re.sub(res_sr, '\\1', ml.text)
+                    ml.text = Re.sub(res_sr, '\\5', ml.text)
                     section_revisers.append(reviser)
-                elif re.match(res_lr, ml.text):
-                    reviser = re.sub(res_lr, '\\1', ml.text)
-                    ml.text = re.sub(res_lr, '\\3', ml.text)
+                elif Re.match(res_lr, ml.text):
+                    reviser = Re.sub(res_lr, '\\1', ml.text)
+                    ml.text = Re.sub(res_lr, '\\3', ml.text)
                     list_revisers.append(reviser)
                 elif re.match(res_er, ml.text):
                     reviser = re.sub(res_er, '\\1', ml.text)
                     ml.text = re.sub(res_er, '\\2', ml.text)
                     length_revisers.append(reviser)
-                elif (re.match(res_fr, ml.text) and
-                      not re.match(res_hl, ml.text)):
-                    reviser = re.sub(res_fr, '\\1', ml.text)
-                    ml.text = re.sub(res_fr, '\\2', ml.text)
+                elif (Re.match(res_fr, ml.text) and
+                      not Re.match(res_hl, ml.text)):
+                    reviser = Re.sub(res_fr, '\\1', ml.text)
+                    ml.text = Re.sub(res_fr, '\\2', ml.text)
                     head_font_revisers.append(reviser)
-                elif (re.match(res_tb[0], ml.text) and
-                      re.match(res_tb[1], ml.text)):
-                    reviser = re.sub(res_tb[0], '\\1', ml.text)
-                    ml.text = re.sub(res_tb[0], '\\2', ml.text)
+                elif (Re.match(res_tb[0], ml.text) and
+                      Re.match(res_tb[1], ml.text)):
+                    reviser = Re.sub(res_tb[0], '\\1', ml.text)
+                    ml.text = Re.sub(res_tb[0], '\\2', ml.text)
                     revisers = reviser.split('/')
                     revisers.pop(0)
                     for i in range(len(revisers)):
@@ -4124,9 +4587,9 @@ class RawParagraph:
             while True:
                 if re.match(NOT_ESCAPED + '\\|:-+$', ml.text):
                     break  # table vertical configuration
-                if re.match(res_tr, ml.text) and not re.match(res_hl, ml.text):
-                    reviser = re.sub(res_tr, '\\2', ml.text)
-                    ml.text = re.sub(res_tr, '\\1', ml.text)
+                if Re.match(res_tr, ml.text) and not Re.match(res_hl, ml.text):
+                    reviser = Re.sub(res_tr, '\\2', ml.text)
+                    ml.text = Re.sub(res_tr, '\\1', ml.text)
                     tail_font_revisers.insert(0, reviser)
                 else:
                     break
@@ -4142,9 +4605,9 @@ class RawParagraph:
             '(' + ParagraphSection.res_symbol + ')' + \
             '((\\s+' + ParagraphSection.res_reviser + ')+)' + \
             '\\s*$'
-        if re.match(res, full_text):
-            symbol = re.sub(res, '\\1', full_text)
-            revisers = re.sub(res, '\\4', full_text)
+        if Re.match(res, full_text):
+            symbol = Re.sub(res, '\\1', full_text)
+            revisers = Re.sub(res, '\\4', full_text)
             for ml in md_lines:
                 ml.text = ''
             md_lines[0].text = symbol
@@ -4206,16 +4669,16 @@ class RawParagraph:
         for c in full_text:
             if in_to_erase:
                 full_text_erase += c
-                if re.match(NOT_ESCAPED + end_erase + '$', full_text_erase):
+                if Re.match(NOT_ESCAPED + end_erase + '$', full_text_erase):
                     in_to_erase = False
-                full_text_erase = re.sub(end_erase + '$', '', full_text_erase)
+                full_text_erase = Re.sub(end_erase + '$', '', full_text_erase)
             else:
                 full_text_leave += c
-                if re.match(NOT_ESCAPED + beg_erase + '$', full_text_leave):
+                if Re.match(NOT_ESCAPED + beg_erase + '$', full_text_leave):
                     in_to_erase = True
-                full_text_leave = re.sub(beg_erase + '$', '', full_text_leave)
-                full_text_leave = re.sub(beg_leave + '$', '', full_text_leave)
-                full_text_leave = re.sub(end_leave + '$', '', full_text_leave)
+                full_text_leave = Re.sub(beg_erase + '$', '', full_text_leave)
+                full_text_leave = Re.sub(beg_leave + '$', '', full_text_leave)
+                full_text_leave = Re.sub(end_leave + '$', '', full_text_leave)
         return full_text_leave
 
     @staticmethod
@@ -4246,7 +4709,7 @@ class RawParagraph:
         max_depth = len(ParagraphSection.states)
         section_depth_setters = []
         res = '^#{1,' + str(max_depth) + '}$'
-        if re.match(res, full_text):
+        if Re.match(res, full_text):
             section_depth_setters = [full_text]
             full_text = ''
         # self.section_depth_setters = depth_setters
@@ -4354,7 +4817,7 @@ class Paragraph:
     @classmethod
     def is_this_class(cls, full_text,
                       head_font_revisers=[], tail_font_revisers=[]):
-        if re.match(cls.res_feature, full_text):
+        if Re.match(cls.res_feature, full_text):
             return True
         return False
 
@@ -4481,13 +4944,13 @@ class Paragraph:
                 + rev.replace(char, '\\' + char) \
                 + '(\\s.*)?$'
             for ml in md_lines:
-                if re.match(res_line, ml.raw_text):
+                if Re.match(res_line, ml.raw_text):
                     md_line = ml
                     break
-            if re.match(res, rev):
-                trunk = re.sub(res, '\\1', rev)
-                branc = re.sub(res, '\\2', rev)
-                chval = re.sub(res, '\\3', rev)
+            if Re.match(res, rev):
+                trunk = Re.sub(res, '\\1', rev)
+                branc = Re.sub(res, '\\2', rev)
+                chval = Re.sub(res, '\\3', rev)
                 xdepth = len(trunk) - 1
                 ydepth = len(branc.replace(char, ''))
                 value = int(chval) - 1
@@ -4741,10 +5204,10 @@ class Paragraph:
         for ml in md_lines:
             mlt = ml.text
             if not is_in_body:
-                while re.match(res, mlt):
-                    trunk = re.sub(res, '\\1', mlt)
-                    branc = re.sub(res, '\\2', mlt)
-                    mlt = re.sub(res, '\\3', mlt)
+                while Re.match(res, mlt):
+                    trunk = Re.sub(res, '\\1', mlt)
+                    branc = Re.sub(res, '\\2', mlt)
+                    mlt = Re.sub(res, '\\3', mlt)
                     mlt = re.sub('\\\\$', '', mlt)  # remove a escape symbol
                     xdepth = len(trunk) - 1
                     ydepth = len(branc.replace(char, ''))
@@ -4943,48 +5406,50 @@ class Paragraph:
     @staticmethod
     def __must_continue(tex, c):
         # RELAX
-        if re.match(NOT_ESCAPED + RELAX_SYMBOL + '$', tex):
+        if Scanner.endswith(tex, RELAX_SYMBOL):
             return True      # "...<>"
         # MATH
         if re.match('^\\\\\\[', tex):
-            if not re.match(NOT_ESCAPED + '\\\\\\]$', tex):
+            if not Scanner.endswith(tex, '\\]'):
                 return True  # "\[..."
         # SUB OR SUP
         if re.match('^(_|\\^){', tex):
-            if not re.match(NOT_ESCAPED + '}$', tex):
+            if not Scanner.endswith(tex, '}'):
                 return True  # "_{..."|"^{..."
-            t, d = '', 0
-            for c in tex:
-                t += c
-                d += 1 if re.match(NOT_ESCAPED + '{$', t) else 0
-                d -= 1 if re.match(NOT_ESCAPED + '}$', t) else 0
+            scn, d = Scanner(tex), 0
+            for i, c in enumerate(tex):
+                # AS "{$", "}$" DID, A BRACE BEFORE A NEWLINE COUNTS AGAIN
+                if c == '\n' and i > 0:
+                    i, c = i - 1, tex[i - 1]
+                d += 1 if c == '{' and not scn.escaped[i] else 0
+                d -= 1 if c == '}' and not scn.escaped[i] else 0
             if d != 0:
                 return True  # "_{...{...}..."|"^{...{...}..."
         # ITALIC AND BOLD
-        if re.match(NOT_ESCAPED + '\\*$', tex):
-            if not re.match(NOT_ESCAPED + '\\*\\*\\*$', tex) and c == '*':
+        if Scanner.endswith(tex, '*'):
+            if not Scanner.endswith(tex, '***') and c == '*':
                 return True  # "...*" + "*"
         # SMALL
-        if re.match(NOT_ESCAPED + '\\-$', tex):
-            if not re.match(NOT_ESCAPED + '\\-\\-\\-$', tex) and c == '-':
+        if Scanner.endswith(tex, '-'):
+            if not Scanner.endswith(tex, '---') and c == '-':
                 return True  # "...-" + "-"
         # LARGE
-        if re.match(NOT_ESCAPED + '\\+$', tex):
-            if not re.match(NOT_ESCAPED + '\\+\\+\\+$', tex) and c == '+':
+        if Scanner.endswith(tex, '+'):
+            if not Scanner.endswith(tex, '+++') and c == '+':
                 return True  # "...+" + "+"
         # RELAX AND NARROW
-        if re.match(NOT_ESCAPED + '>$', tex):
-            if re.match(NOT_ESCAPED + RELAX_SYMBOL + '>$', tex):
+        if Scanner.endswith(tex, '>'):
+            if Scanner.endswith(tex, RELAX_SYMBOL + '>'):
                 return True  # "...<>>"
-            if re.match(NOT_ESCAPED + RELAX_SYMBOL + '>>$', tex) and c == '>':
+            if Scanner.endswith(tex, RELAX_SYMBOL + '>>') and c == '>':
                 return True  # "...<>>>" + '>'
         # NARROW
-        if re.match(NOT_ESCAPED + '>$', tex):
-            if not re.match(NOT_ESCAPED + '>>>$', tex) and c == '>':
+        if Scanner.endswith(tex, '>'):
+            if not Scanner.endswith(tex, '>>>') and c == '>':
                 return True  # "...>" + '>'
         # WIDE
-        if re.match(NOT_ESCAPED + '<$', tex):
-            if not re.match(NOT_ESCAPED + '<<<$', tex) and c == '<':
+        if Scanner.endswith(tex, '<'):
+            if not Scanner.endswith(tex, '<<<') and c == '<':
                 return True  # "...<" + '<'
         # ELSE
         return False
@@ -5348,13 +5813,13 @@ class Paragraph:
             alte = re.sub(res, '\\1', alte)
         try:
             if cm_w > 0 and cm_h > 0:
-                ms_run.add_picture(path, width=Cm(cm_w), height=Cm(cm_h))
+                ImageCache.add_picture(ms_run, path, Cm(cm_w), Cm(cm_h))
             elif cm_w > 0:
-                ms_run.add_picture(path, width=Cm(cm_w))
+                ImageCache.add_picture(ms_run, path, Cm(cm_w), None)
             elif cm_h > 0:
-                ms_run.add_picture(path, height=Cm(cm_h))
+                ImageCache.add_picture(ms_run, path, None, Cm(cm_h))
             else:
-                ms_run.add_picture(path, height=Pt(c_size))
+                ImageCache.add_picture(ms_run, path, None, Pt(c_size))
         except BaseException:
             ms_run.text = '![' + alte + '](' + path + ')'
             msg = '※ 警告: ' \
@@ -5362,7 +5827,7 @@ class Paragraph:
             # msg = 'warning: can\'t open "' + path + '"'
             r = '^.*! *\\[.*\\] *\\(' + path + '\\).*$'
             for ml in self.md_lines:
-                if re.match(r, ml.text):
+                if Re.match(r, ml.text):
                     if msg not in ml.warning_messages:
                         ml.append_warning_message(msg)
                         break
@@ -5373,6 +5838,12 @@ class Paragraph:
         for ml in self.md_lines:
             ml.print_warning_messages()
 
+    def get_warning_messages(self):
+        warning_messages = []
+        for ml in self.md_lines:
+            warning_messages += ml.get_warning_messages()
+        return warning_messages
+
 
 class ParagraphEmpty(Paragraph):
 
@@ -5410,9 +5881,9 @@ class ParagraphChapter(Paragraph):
 
     @classmethod
     def _get_proper_depth(cls, full_text):
-        if not re.match(cls.res_feature, full_text):
+        if not Re.match(cls.res_feature, full_text):
             return 0
-        trunk = re.sub(cls.res_feature, '\\1', full_text)
+        trunk = Re.sub(cls.res_feature, '\\1', full_text)
         proper_depth = len(trunk)
         # self.proper_depth = proper_depth
         return proper_depth
@@ -5468,7 +5939,7 @@ class ParagraphSection(Paragraph):
     @classmethod
     def is_this_class(cls, full_text,
                       head_font_revisers=[], tail_font_revisers=[]):
-        if re.match(cls.res_feature, full_text):
+        if Re.match(cls.res_feature, full_text):
             if not re.match('^#{15,}', full_text):
                 return True
         return False
@@ -5478,13 +5949,13 @@ class ParagraphSection(Paragraph):
         ft = full_text
         head_section_depth = 0
         tail_section_depth = 0
-        while re.match(cls.res_feature, ft):
-            trunk = re.sub(cls.res_feature, '\\1', ft)
+        while Re.match(cls.res_feature, ft):
+            trunk = Re.sub(cls.res_feature, '\\1', ft)
             depth = len(trunk)
             if head_section_depth == 0:
                 head_section_depth = depth
             tail_section_depth = depth
-            ft = re.sub(cls.res_feature, '\\3', ft)
+            ft = Re.sub(cls.res_feature, '\\3', ft)
         # self.head_section_depth = head_section_depth
         # self.head_section_depth = tail_section_depth
         return head_section_depth, tail_section_depth
@@ -5654,7 +6125,7 @@ class ParagraphTable(Paragraph):
                       head_font_revisers=[], tail_font_revisers=[]):
         if ParagraphMultiColumns.is_this_class(full_text):
             return False
-        if re.match(cls.res_feature, full_text):
+        if Re.match(cls.res_feature, full_text):
             return True
         return False
 
@@ -5973,8 +6444,8 @@ class ParagraphTable(Paragraph):
                         line = re.sub('^\\s*:\\s(.*)$', '\\1', line)
                         line = re.sub(NOT_ESCAPED + '\\s:\\s*$', '\\1', line)
                         for fd in FONT_DECORATORS + [RELAX_SYMBOL]:
-                            while re.match(NOT_ESCAPED + fd, line):
-                                line = re.sub(NOT_ESCAPED + fd, '\\1', line)
+                            while Re.match(NOT_ESCAPED + fd, line):
+                                line = Re.sub(NOT_ESCAPED + fd, '\\1', line)
                         w = get_real_width(line) / 2
                         if max_width[j] < w:
                             max_width[j] = w
@@ -6104,14 +6575,15 @@ class ParagraphImage(Paragraph):
                         cm_h = text_height * (-1 * cm_h)
                 alte = re.sub(res, '\\1', alte)
             try:
+                ms_run = ms_doc.add_paragraph().add_run()
                 if cm_w > 0 and cm_h > 0:
-                    ms_doc.add_picture(path, width=Cm(cm_w), height=Cm(cm_h))
+                    ImageCache.add_picture(ms_run, path, Cm(cm_w), Cm(cm_h))
                 elif cm_w > 0:
-                    ms_doc.add_picture(path, width=Cm(cm_w))
+                    ImageCache.add_picture(ms_run, path, Cm(cm_w), None)
                 elif cm_h > 0:
-                    ms_doc.add_picture(path, height=Cm(cm_h))
+                    ImageCache.add_picture(ms_run, path, None, Cm(cm_h))
                 else:
-                    ms_doc.add_picture(path)
+                    ImageCache.add_picture(ms_run, path, None, None)
                 ms_doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
                 # CAPTION
                 if capt != '':
@@ -6129,7 +6601,7 @@ class ParagraphImage(Paragraph):
                 # msg = 'warning: can\'t open "' + path + '"'
                 r = '^.*! *\\[.*\\] *\\(' + path + '\\).*$'
                 for ml in self.md_lines:
-                    if re.match(r, ml.text):
+                    if Re.match(r, ml.text):
                         if msg not in ml.warning_messages:
                             ml.append_warning_message(msg)
                             break
@@ -6147,16 +6619,16 @@ class ParagraphMath(Paragraph):
     @classmethod
     def is_this_class(cls, full_text,
                       head_font_revisers=[], tail_font_revisers=[]):
-        if re.match(cls.res_feature, full_text):
+        if Re.match(cls.res_feature, full_text):
             if re.match('^\\\\\\[.*$', full_text):
                 if re.match(NOT_ESCAPED + '\\\\\\]$', full_text):
-                    tmp = re.sub(cls.res_feature, '\\1', full_text)
+                    tmp = Re.sub(cls.res_feature, '\\1', full_text)
                     if not re.match(NOT_ESCAPED + '\\\\[\\[\\]].*$', tmp):
                         return True
         return False
 
     def _get_alignment(self):
-        text = re.sub(self.res_feature, '\\1', self.full_text)
+        text = Re.sub(self.res_feature, '\\1', self.full_text)
         alignment = 'center'
         if re.match('^:\\s.*\\s:$', text):
             alignment = 'center'
@@ -6714,13 +7186,13 @@ class MdLine:
         for i, c in enumerate(raw_text):
             tmp += c
             if not MdLine.is_in_comment:
-                if re.match(NOT_ESCAPED + '<!--$', tmp):
+                if Scanner.endswith(tmp, '<!--'):
                     tmp = re.sub('<!--$', '', tmp)
                     spaced_text += tmp
                     tmp = ''
                     MdLine.is_in_comment = True
             else:
-                if re.match(NOT_ESCAPED + '-->$', tmp):
+                if Scanner.endswith(tmp, '-->'):
                     tmp = re.sub('-->$', '', tmp)
                     comment += tmp + com_sep
                     tmp = ''
@@ -6771,6 +7243,14 @@ class MdLine:
                 + '  (line ' + str(self.line_number) + ') ' + self.raw_text
             sys.stderr.write(msg + '\n\n')
 
+    def get_warning_messages(self):
+        warning_messages = []
+        for wm in self.warning_messages:
+            warning_messages.append({'line_number': self.line_number,
+                                     'raw_text': self.raw_text,
+                                     'message': wm})
+        return warning_messages
+
 
 class SubstitutePhrase:
 
@@ -6779,6 +7259,10 @@ class SubstitutePhrase:
         self.final_document = []
 
     def assign(self):
+        # NO NEED TO JOIN THE LINES INTO ONE STRING
+        if not any('%[' in line for line in self.initial_md_lines):
+            self.final_document = self.initial_md_lines
+            return self.final_document
         doc = '\n'.join(self.initial_md_lines)
         substitute_phrases = {}
         res = '^((?:.|\n)*\n)?' \
@@ -6799,8 +7283,8 @@ class SubstitutePhrase:
                 tmp2 = None
                 while tmp2 != doc:
                     tmp2 = doc
-                    if re.match(res_fr, doc):
-                        doc = re.sub(res_fr, res_to, doc)
+                    if Re.match(res_fr, doc):
+                        doc = Re.sub(res_fr, res_to, doc)
         final_document = doc.split('\n')
         for i, fd in enumerate(final_document):
             res = NOT_ESCAPED + '%\\[.+\\]%(.*)$'
@@ -6834,6 +7318,7 @@ class Script:
         is_in_script = False
         tc_state = ''  # track changes
         tmp_text = ''
+        has_math_beg, has_math_end = False, False
         for ml in md_lines:
             tc_tmp = ''  # track changes
             old_text = ml.text
@@ -6844,26 +7329,31 @@ class Script:
                     = Document._change_track_change_state(tc_state, tc_tmp + c)
                 # SCRIPT
                 tmp_text += c
-                if re.match(NOT_ESCAPED + '\\\\\\[', tmp_text):
+                # "tmp_text" ONLY GROWS, SO ONLY ITS END NEEDS TO BE CHECKED
+                if Scanner.endswith(tmp_text, '\\['):
+                    has_math_beg = True
+                if Scanner.endswith(tmp_text, '\\]'):
+                    has_math_end = True
+                if has_math_beg:
                     is_in_math = True
-                if re.match(NOT_ESCAPED + '\\\\\\]', tmp_text):
+                if has_math_end:
                     is_in_math = False
                 if not is_in_script:
                     if self.__is_script_beginning(tmp_text, n):
-                        if (not is_in_math) or \
-                           (not re.match('^(.|\n)*{{', tmp_text)):
+                        if (not is_in_math) or ('{{' not in tmp_text):
                             tmp_text = re.sub('{.?{$', '', tmp_text)
                             new_text += tmp_text
                             tmp_text = ''
+                            has_math_beg, has_math_end = False, False
                             is_in_script = True
                 else:
                     if self.__is_script_end(tmp_text, n):
-                        if (not is_in_math) or \
-                           (not re.match('^(.|\n)*}}', tmp_text)):
+                        if (not is_in_math) or ('}}' not in tmp_text):
                             tmp_text = re.sub('}.?}$', '', tmp_text)
                             new_text += self.__execute_script(tmp_text, ml,
                                                               tc_state)
                             tmp_text = ''
+                            has_math_beg, has_math_end = False, False
                             is_in_script = False
             else:
                 if tmp_text != '':
@@ -6874,26 +7364,27 @@ class Script:
                         new_text += self.__execute_script(tmp_text, ml,
                                                           tc_state)
                         tmp_text = ''
+                has_math_beg, has_math_end = False, False
             ml.text = new_text
         return md_lines
 
     @staticmethod
     def __is_script_beginning(text, n):
         if n == 1:
-            if re.match(NOT_ESCAPED + '{1?{$', text):
+            if Scanner.endswith(text, '{{') or Scanner.endswith(text, '{1{'):
                 return True
         else:
-            if re.match(NOT_ESCAPED + '{' + str(n) + '{$', text):
+            if Scanner.endswith(text, '{' + str(n) + '{'):
                 return True
         return False
 
     @staticmethod
     def __is_script_end(text, n):
         if n == 1:
-            if re.match(NOT_ESCAPED + '}1?}$', text):
+            if Scanner.endswith(text, '}}') or Scanner.endswith(text, '}1}'):
                 return True
         else:
-            if re.match(NOT_ESCAPED + '}' + str(n) + '}$', text):
+            if Scanner.endswith(text, '}' + str(n) + '}'):
                 return True
         return False
 
@@ -6999,24 +7490,24 @@ class Script:
         for c in val + '\0':
             res = '^(.*?)([京兆億万0-9]*)$'
             if par == '':
-                if re.match(res, tmp) and re.match('^[^京兆億万0-9]$', c):
-                    new += re.sub(res, '\\1', tmp)
-                    val = re.sub(res, '\\2', tmp)
+                if Re.match(res, tmp) and re.match('^[^京兆億万0-9]$', c):
+                    new += Re.sub(res, '\\1', tmp)
+                    val = Re.sub(res, '\\2', tmp)
                     for u in [['京', '兆'], ['兆', '億'],
                               ['億', '万'], ['万', '']]:
                         # "1京" -> "1京0000兆"
-                        if re.match('^.*' + u[0] + '$', val):
+                        if Re.match('^.*' + u[0] + '$', val):
                             val += '0000' + u[1]
                         res = '(.*' + u[0] + ')([0-9]+)(' + u[1] + '.*)$'
                         # '1京23兆' -> '1京0023兆'
-                        if re.match(res, val):
-                            v1 = re.sub(res, '\\1', val)
-                            v2 = re.sub(res, '\\2', val)
-                            v3 = re.sub(res, '\\3', val)
+                        if Re.match(res, val):
+                            v1 = Re.sub(res, '\\1', val)
+                            v2 = Re.sub(res, '\\2', val)
+                            v3 = Re.sub(res, '\\3', val)
                             val = v1 + '0 ' * (4 - len(v2)) + v2 + v3
                         # '1京23456兆' -> warning
                         res = '(.*' + u[0] + ')([0-9]{5,})(' + u[1] + '.*)$'
-                        if re.match(res, val):
+                        if Re.match(res, val):
                             msg = '※ 警告: ' \
                                 + '「' + val + '」は異常な数字です'
                             # msg = 'warning: ' \
@@ -7079,10 +7570,10 @@ class Script:
         for c in val + '\0':
             res = '(.*?)([_a-zA-Z][_a-zA-Z0-9]*)$'
             if par == '':
-                if re.match(res, tmp) and re.match('^[^_a-zA-Z0-9]$', c):
-                    var = re.sub(res, '\\2', tmp)
+                if Re.match(res, tmp) and re.match('^[^_a-zA-Z0-9]$', c):
+                    var = Re.sub(res, '\\2', tmp)
                     if var in self.constant:
-                        tmp = re.sub(res, '\\g<1>' + self.constant[var], tmp)
+                        tmp = Re.sub(res, '\\g<1>' + self.constant[var], tmp)
                     else:
                         msg = '※ 警告: ' \
                             + '「' + var + '」という変数は未定義です'
@@ -7104,17 +7595,17 @@ class Script:
         val = tmp
         # STRING AND STRING
         res = '^\\s*\'((?:.|\n)*?)\'\\s*\\+\\s*\'((?:.|\n)*)\'\\s*$'
-        while re.match(res, val):
-            val = re.sub(res, "'\\1\\2'", val)
+        while Re.match(res, val):
+            val = Re.sub(res, "'\\1\\2'", val)
         res = '^\\s*\'((?:.|\n)*?)\'\\s*\\+\\s*"((?:.|\n)*)"\\s*$'
-        while re.match(res, val):
-            val = re.sub(res, "'\\1\\2'", val)
+        while Re.match(res, val):
+            val = Re.sub(res, "'\\1\\2'", val)
         res = '^\\s*"((?:.|\n)*?)"\\s*\\+\\s*\'((?:.|\n)*)\'\\s*$'
-        while re.match(res, val):
-            val = re.sub(res, "'\\1\\2'", val)
+        while Re.match(res, val):
+            val = Re.sub(res, "'\\1\\2'", val)
         res = '^\\s*"((?:.|\n)*?)"\\s*\\+\\s*"((?:.|\n)*)"\\s*$'
-        while re.match(res, val):
-            val = re.sub(res, "'\\1\\2'", val)
+        while Re.match(res, val):
+            val = Re.sub(res, "'\\1\\2'", val)
         if re.match('^"[^"]*"$', val) or re.match("^'[^']*'$", val):
             return val  # string
         # BINARY OPERATE (x^y, x**y, x/y, x//y, x%y, x*y, x-y, x+y)
@@ -7130,11 +7621,11 @@ class Script:
             '\\s*(' + res_ope + ')\\s*' + \
             '(-?(?:[0-9,]*\\.)?[0-9,]+|〓)' + \
             '((?:\\s*.*)?)$'
-        while re.match(res, val):
-            s1 = re.sub(res, '\\2', val)
+        while Re.match(res, val):
+            s1 = Re.sub(res, '\\2', val)
             s1 = s1.replace(',', '')
-            op = re.sub(res, '\\3', val)
-            s2 = re.sub(res, '\\4', val)
+            op = Re.sub(res, '\\3', val)
+            s2 = Re.sub(res, '\\4', val)
             s2 = s2.replace(',', '')
             if s1 == '〓' or s2 == '〓':
                 return '〓'
@@ -7199,7 +7690,7 @@ class Script:
                 cal = str(v1 - v2)
             elif op == '+':
                 cal = str(v1 + v2)
-            val = re.sub(res, '\\g<1>' + cal + '\\g<5>', val)
+            val = Re.sub(res, '\\g<1>' + cal + '\\g<5>', val)
         return val
 
 
@@ -7238,7 +7729,7 @@ class Md2Docx:
         doc.paragraphs = doc.get_paragraphs(doc.raw_paragraphs)
         doc.paragraphs = doc.modify_paragraphs(doc.paragraphs)
 
-    def save(self, inputed_docx_file):
+    def save(self, inputed_docx_file, must_print_warnings=True):
         io = self.io
         doc = self.doc
         # MAKE DOCX
@@ -7247,11 +7738,18 @@ class Md2Docx:
         io.ms_doc = io.get_ms_doc()
         doc.write_property(io.ms_doc)
         doc.write_document(io.ms_doc)
+        # COMPACT STYLES
+        if Form.compact_styles:
+            io.make_compact_styles(io.ms_doc)
         # SAVE MS WORD FILE
         io.set_docx_file(inputed_docx_file)
         io.save_docx_file()
         # PRINT WARNING MESSAGES
-        doc.print_warning_messages()
+        if must_print_warnings:
+            doc.print_warning_messages()
+
+    def get_warning_messages(self):
+        return self.doc.get_warning_messages()
 
     @staticmethod
     def set_document_title(value):
@@ -7421,6 +7919,57 @@ class Md2Docx:
     def get_has_completed():
         return Form.has_completed
 
+    @staticmethod
+    def set_compact_styles(value):
+        return Form.set_compact_styles(str(value))
+
+    @staticmethod
+    def get_compact_styles():
+        return Form.compact_styles
+
+    @staticmethod
+    def set_image_dpi(value):
+        return Form.set_image_dpi(str(value))
+
+    @staticmethod
+    def get_image_dpi():
+        return Form.image_dpi
+
+    @staticmethod
+    def set_jobs(value):
+        return Form.set_jobs(str(value))
+
+    @staticmethod
+    def get_jobs():
+        return Form.jobs
+
+
+############################################################
+# WORKER
+
+
+def save_in_worker(md_file, docx_file, conn):
+    # RUNS IN A FRESH PROCESS AND SENDS THE RESULT THROUGH "conn"
+    result = {'docx_file': docx_file, 'error': None, 'warnings': []}
+    # WARNINGS NOT BOUND TO A LINE ARE WRITTEN TO STDERR
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        try:
+            m2d = Md2Docx(md_file)
+            m2d.save(docx_file, False)
+            result['warnings'] += m2d.get_warning_messages()
+        except BaseException as e:
+            result['error'] = str(e)
+    warnings = []
+    for msg in stderr.getvalue().split('\n\n'):
+        if msg.strip() != '':
+            warnings.append({'line_number': None,
+                             'raw_text': None,
+                             'message': msg.strip()})
+    result['warnings'] = warnings + result['warnings']
+    conn.send(result)
+    conn.close()
+
 
 ############################################################
 # MAIN
@@ -7428,6 +7977,7 @@ class Md2Docx:
 
 def main():
     args = get_arguments()
+    import_dependencies()
     m2d = Md2Docx(args.md_file, args)
     m2d.save(args.docx_file)
     sys.exit(0)
@@ -7435,3 +7985,5 @@ def main():
 
 if __name__ == '__main__':
     main()
+else:
+    import_dependencies()
@@ -33,11 +33,19 @@ __version__ = 'v08 Omachi'
 
 
 import sys
+import os
 import argparse     # Python Software Foundation License
 import re
-import chardet      # GNU Lesser General Public License v2 or later (LGPLv2+)
 import Levenshtein  # GNU General Public License v2 or later (GPLv2+)
 import hashlib
+try:
+    from makdo_encoding import Encoding
+    from makdo_profile import StartupProfile
+    from makdo_scanner import Scanner
+except ImportError:
+    from makdo.makdo_encoding import Encoding
+    from makdo.makdo_profile import StartupProfile
+    from makdo.makdo_scanner import Scanner
 
 
 def get_arguments():
@@ -76,6 +84,10 @@ def get_arguments():
         '-V', '--verbose',
         action='store_true',
         help='違いがない段落も表示します')
+    parser.add_argument(
+        '--profile-startup',
+        action=StartupProfile,
+        help='起動時間の内訳を表示します')
     parser.add_argument(
         'main_md_file',
         help='主Markdownファイル')
@@ -108,7 +120,7 @@ class File:
     def set_up_from_file(self, file_name):
         self.file_name = file_name
         raw_data = self.get_raw_data(self.file_name)
-        encoding = self._get_encoding(raw_data)
+        encoding = self._get_encoding(raw_data, self.file_name)
         file_text = self._decode_data(encoding, raw_data)
         self.set_up_from_text(file_text)
 
@@ -130,10 +142,10 @@ class File:
             sys.exit(1)
 
     @staticmethod
-    def _get_encoding(raw_data):
+    def _get_encoding(raw_data, file_name=None):
         encoding = 'SHIFT_JIS'
         if raw_data != '':
-            encoding = chardet.detect(raw_data)['encoding']
+            encoding = Encoding.detect(raw_data, file_name)
         if encoding is None:
             encoding = 'SHIFT_JIS'
         elif (re.match('^utf[-_]?.*$', encoding, re.I)) or \
@@ -693,11 +705,11 @@ class TrackChange:
         beg_del, end_del, beg_ins, end_ins = -1, -1, -1, -1
         for i, c in enumerate(text):
             tmp += c
-            # COMMENT
-            if re.match('^(.|\n)*<!--$', tmp) and not is_in_comment:
+            # COMMENT ("$" ALSO MATCHES BEFORE A NEWLINE AT THE END)
+            if tmp.endswith(('<!--', '<!--\n')) and not is_in_comment:
                 tmp, is_in_comment = '', True
                 continue
-            elif re.match('^(.|\n)*-->$', tmp) and is_in_comment:
+            elif tmp.endswith(('-->', '-->\n')) and is_in_comment:
                 tmp, is_in_comment = '', False
                 continue
             if is_in_comment:
@@ -706,25 +718,25 @@ class TrackChange:
             if tmp == '---' or tmp == '+++' or tmp == '>>>' or tmp == '<<<':
                 tmp = ''
                 continue
-            elif (re.match(NOT_ESCAPED + '\\-\\-$', tmp) or
-                  re.match(NOT_ESCAPED + '\\+\\+$', tmp) or
-                  re.match(NOT_ESCAPED + '>>$', tmp) or
-                  re.match(NOT_ESCAPED + '<<$', tmp)):
+            elif (Scanner.endswith(tmp, '--') or
+                  Scanner.endswith(tmp, '++') or
+                  Scanner.endswith(tmp, '>>') or
+                  Scanner.endswith(tmp, '<<')):
                 tmp = tmp[-2:]
                 continue
             # DELETE AND INSERT
             if beg_del < 0 and beg_ins < 0:
-                if re.match(NOT_ESCAPED + '\\->$', tmp):
+                if Scanner.endswith(tmp, '->'):
                     beg_del = i - 1
-                elif re.match(NOT_ESCAPED + '\\+>$', tmp):
+                elif Scanner.endswith(tmp, '+>'):
                     beg_ins = i - 1
             elif beg_del >= 0:
-                if re.match(NOT_ESCAPED + '<\\-$', tmp):
+                if Scanner.endswith(tmp, '<-'):
                     end_del = i + 1
                     track_change_list.append(['del', beg_del, end_del])
                     beg_del, end_del = -1, -1
             elif beg_ins >= 0:
-                if re.match(NOT_ESCAPED + '<\\+$', tmp):
+                if Scanner.endswith(tmp, '<+'):
                     end_ins = i + 1
                     track_change_list.append(['ins', beg_ins, end_ins])
                     beg_ins, end_ins = -1, -1
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+# Name:         profile.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.19-00:10:00-JST>
+
+# profile.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# from makdo_profile import StartupProfile
+# parser.add_argument('--profile-startup', action=StartupProfile, help=...)
+#
+# The option runs the same script again with "--help" in a new process
+# with "-X importtime", and prints the import times summed up by package,
+# so what is measured is the startup of the command line, which imports
+# only what "--help" needs.
+
+
+__version__ = 'v08 Omachi'
+
+
+import sys
+import os
+import argparse     # Python Software Foundation License
+import re
+
+
+class StartupProfile(argparse.Action):
+
+    """An action to print the startup time by module"""
+
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        import subprocess
+        import time
+        script = os.path.abspath(sys.argv[0])
+        t = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime',
+                               script, '--help'],
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, encoding='utf-8')
+        wall = time.perf_counter() - t
+        # SELF TIMES SUMMED UP BY PACKAGE
+        times = {}
+        res = '^import time:\\s+([0-9]+) \\|\\s+[0-9]+ \\| *(\\S+)$'
+        for line in proc.stderr.split('\n'):
+            if not re.match(res, line):
+                if line != '' and not re.match('^import time:', line):
+                    sys.stderr.write(line + '\n')
+                continue
+            us = int(re.sub(res, '\\1', line))
+            name = re.sub(res, '\\2', line)
+            if not re.match('^makdo', name):
+                name = re.sub('\\..*$', '', name)
+            if name not in times:
+                times[name] = 0
+            times[name] += us
+        names = sorted(times, key=lambda n: -times[n])
+        for name in names[:20]:
+            sys.stdout.write('%9.1f ms  %s\n' % (times[name] / 1000, name))
+        others = sum([times[n] for n in names[20:]])
+        sys.stdout.write('%9.1f ms  %s\n' % (others / 1000, '（その他）'))
+        sys.stdout.write('%9.1f ms  %s\n'
+                         % (sum(times.values()) / 1000, '（インポート）'))
+        sys.stdout.write('%9.1f ms  %s\n' % (wall * 1000, '（起動全体）'))
+        parser.exit(proc.returncode)
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+# Name:         rag.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.18-23:50:00-JST>
+
+# rag.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# from makdo_rag import RagIndex
+# ri = RagIndex('~/.config/makdo/rag.md', 'intfloat/multilingual-e5-large')
+# index = ri.load()       -> llama_index.core.VectorStoreIndex
+# engine = index.as_query_engine(llm=..., similarity_top_k=3)
+#
+# The index is saved in "rag.md.index/<EMBEDDING MODEL>/" next to the RAG
+# file.  The RAG file is split into chunks at headings (and at blank lines
+# when a chunk gets long), and each chunk is a document whose id is the hash
+# of its text, so after an edit only the new chunks are embedded and the
+# removed ones are deleted.  "load" returns the index in memory as long as
+# the RAG file has the same hash.  It takes time, so the editor calls it in
+# a thread.
+
+
+__version__ = 'v08 Omachi'
+
+
+import os
+import re
+import json
+import hashlib
+
+
+class RagIndex:
+
+    """A class of a vector index of a RAG file saved next to it"""
+
+    # A CHUNK IS CUT AT A BLANK LINE AFTER THIS NUMBER OF CHARACTERS
+    max_chunk_size = 2000
+
+    manifest_file_name = 'makdo_rag.json'
+
+    def __init__(self, rag_file, embed_model_name):
+        self.rag_file = rag_file
+        self.embed_model_name = embed_model_name
+        self.persist_dir = self.get_persist_dir(rag_file, embed_model_name)
+        self.embed_model = None
+        self.index = None
+        self.file_hash = None
+
+    @staticmethod
+    def get_persist_dir(rag_file, embed_model_name):
+        name = re.sub('[^0-9A-Za-z\\.\\-]+', '_', embed_model_name)
+        name += '-' + RagIndex.get_hash(embed_model_name)[:8]
+        return os.path.join(rag_file + '.index', name)
+
+    @staticmethod
+    def get_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def split_into_chunks(cls, text):
+        chunks = []
+        chunk = ''
+        for paragraph in re.split('\n\\s*\n', text):
+            paragraph = paragraph.strip('\n').rstrip()
+            if paragraph == '':
+                continue
+            if chunk != '' and \
+               (re.match('^#+ ', paragraph) or
+                len(chunk) >= cls.max_chunk_size):
+                chunks.append(chunk)
+                chunk = ''
+            if chunk != '':
+                chunk += '\n\n'
+            chunk += paragraph
+        if chunk != '':
+            chunks.append(chunk)
+        return chunks
+
+    def load(self):
+        with open(self.rag_file, 'r') as f:
+            rag_data = f.read()
+        file_hash = self.get_hash(rag_data)
+        if self.index is not None and file_hash == self.file_hash:
+            return self.index
+        if self.embed_model is None:
+            # pip install llama-index-embeddings-huggingface
+            from llama_index.embeddings.huggingface \
+                import HuggingFaceEmbedding
+            self.embed_model = HuggingFaceEmbedding(
+                model_name=self.embed_model_name)
+        if self.index is None:
+            self.index = self._load_from_disk()
+        if self.index is None:
+            self._build(rag_data)
+        elif file_hash != self._read_manifest().get('file_hash'):
+            self._refresh(rag_data)
+        self.file_hash = file_hash
+        self._write_manifest(file_hash)
+        return self.index
+
+    def _get_documents(self, rag_data):
+        from llama_index.core import Document
+        file_name = os.path.basename(self.rag_file)
+        documents = {}
+        for chunk in self.split_into_chunks(rag_data):
+            doc_id = self.get_hash(chunk)
+            if doc_id not in documents:
+                documents[doc_id] = Document(
+                    text=chunk, id_=doc_id,
+                    metadata={'file_name': file_name})
+        return documents
+
+    def _build(self, rag_data):
+        from llama_index.core import VectorStoreIndex
+        documents = self._get_documents(rag_data)
+        self.index = VectorStoreIndex.from_documents(
+            list(documents.values()), embed_model=self.embed_model)
+        self._persist()
+
+    def _refresh(self, rag_data):
+        documents = self._get_documents(rag_data)
+        old_ids = set(self.index.ref_doc_info.keys())
+        for doc_id in old_ids:
+            if doc_id not in documents:
+                self.index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        for doc_id in documents:
+            if doc_id not in old_ids:
+                self.index.insert(documents[doc_id])
+        self._persist()
+
+    def _load_from_disk(self):
+        manifest = self._read_manifest()
+        if manifest.get('embed_model') != self.embed_model_name:
+            return None
+        from llama_index.core import StorageContext, load_index_from_storage
+        try:
+            sc = StorageContext.from_defaults(persist_dir=self.persist_dir)
+            return load_index_from_storage(sc, embed_model=self.embed_model)
+        except Exception:
+            return None
+
+    def _persist(self):
+        os.makedirs(self.persist_dir, mode=0o700, exist_ok=True)
+        self.index.storage_context.persist(persist_dir=self.persist_dir)
+
+    def _read_manifest(self):
+        path = os.path.join(self.persist_dir, self.manifest_file_name)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, file_hash):
+        path = os.path.join(self.persist_dir, self.manifest_file_name)
+        manifest = {'embed_model': self.embed_model_name,
+                    'file_hash': file_hash}
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
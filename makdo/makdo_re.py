@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# Name:         re.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.19-00:30:00-JST>
+
+# re.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# from makdo_re import Re
+# Re.match('^a', 'abc')                     -> <re.Match object ...>
+# Re.sub('b', 'X', 'abc')                   -> 'aXc'
+# Re.compile('^a').finditer('abc')          -> <callable_iterator ...>
+#
+# The compiled patterns are kept in "Re.patterns", whose key is
+# (pattern, flags).  The converters use it only for the patterns built
+# at run time (from the document, the options or in loops); the fixed
+# patterns are left to "re" and its own cache.  As with "re", its size is
+# limited; the least recently used pattern is removed.
+
+
+__version__ = 'v08 Omachi'
+
+
+import re
+
+
+class Re:
+
+    """A class to share compiled regular expressions like "re" does"""
+
+    # THE DICTIONARY KEEPS THE ORDER OF USE (THE LAST IS THE LATEST)
+    patterns = {}
+
+    max_patterns = 512
+
+    @classmethod
+    def compile(cls, res, flags=0):
+        key = (res, flags)
+        pattern = cls.patterns.pop(key, None)
+        if pattern is None:
+            pattern = re.compile(res, flags)
+            if len(cls.patterns) >= cls.max_patterns:
+                del cls.patterns[next(iter(cls.patterns))]
+        cls.patterns[key] = pattern
+        return pattern
+
+    @staticmethod
+    def match(res, string, flags=0):
+        key = (res, flags)
+        try:
+            pattern = Re.patterns.pop(key)
+        except KeyError:
+            return Re.compile(res, flags).match(string)
+        Re.patterns[key] = pattern
+        return pattern.match(string)
+
+    @staticmethod
+    def sub(res, repl, string, count=0, flags=0):
+        key = (res, flags)
+        try:
+            pattern = Re.patterns.pop(key)
+        except KeyError:
+            return Re.compile(res, flags).sub(repl, string, count)
+        Re.patterns[key] = pattern
+        return pattern.sub(repl, string, count)
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# Name:         scanner.py
+# Version:      v08 Omachi
+# Time-stamp:   <2026.10.18-12:00:00-JST>
+
+# scanner.py
+# Copyright (C) 2022-2026  Seiichiro HATA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# USAGE
+# from makdo_scanner import Scanner
+# Scanner.endswith('abc\\<!--', '<!--')      -> False
+# Scanner.endswith('abc\\\\<!--', '<!--')    -> True
+# scn = Scanner('a**b\\**c**')
+# scn.find('**')                            -> 1
+# scn.find('**', 2)                         -> 8
+# scn.replace('**', 'X')                    -> 'aXb\\**cX'
+#
+# A token is "not escaped" when it is preceded by an even number of
+# backslashes, which is what "NOT_ESCAPED + token" matches.  As with "$",
+# "endswith" also accepts the token followed by a final newline.  Unlike the
+# regular expression, the scanner does not read the string from its
+# beginning at every match, so a loop over the characters stays linear.
+
+
+__version__ = 'v08 Omachi'
+
+
+class Scanner:
+
+    """A class to find tokens which are not escaped by backslashes"""
+
+    def __init__(self, text):
+        self.text = text
+        self.escaped = self.get_escaped(text)
+
+    @staticmethod
+    def get_escaped(text):
+        # 1 IF THE CHARACTER IS PRECEDED BY AN ODD NUMBER OF BACKSLASHES
+        escaped = bytearray(len(text))
+        is_odd = False
+        for i, c in enumerate(text):
+            if is_odd:
+                escaped[i] = 1
+            if c == '\\':
+                is_odd = not is_odd
+            else:
+                is_odd = False
+        return escaped
+
+    @staticmethod
+    def is_escaped(text, position):
+        n = 0
+        while position - n > 0 and text[position - n - 1] == '\\':
+            n += 1
+        return n % 2 == 1
+
+    @staticmethod
+    def endswith(text, token):
+        # SAME AS "Re.match(NOT_ESCAPED + re.escape(token) + '$', text)"
+        # ("$" ALSO MATCHES BEFORE A NEWLINE AT THE END)
+        n = len(token)
+        if text.endswith(token):
+            if not Scanner.is_escaped(text, len(text) - n):
+                return True
+        if text.endswith(token + '\n'):
+            if not Scanner.is_escaped(text, len(text) - n - 1):
+                return True
+        return False
+
+    def find(self, token, start=0):
+        # SAME AS THE FIRST MATCH OF "NOT_ESCAPED + re.escape(token)"
+        text, escaped = self.text, self.escaped
+        i = text.find(token, start)
+        while i >= 0 and escaped[i]:
+            i = text.find(token, i + 1)
+        return i
+
+    def replace(self, token, new):
+        # SAME AS REPEATING "Re.sub(NOT_ESCAPED + token, '\\1' + new, text)"
+        # WHILE THE TOKEN AND "new" DO NOT CONTAIN BACKSLASHES
+        text = self.text
+        pieces = []
+        beg = 0
+        i = self.find(token)
+        while i >= 0:
+            pieces.append(text[beg:i] + new)
+            beg = i + len(token)
+            i = self.find(token, beg)
+        pieces.append(text[beg:])
+        return ''.join(pieces)